@@ -1,10 +1,13 @@
 import asyncio
+import functools
 import json
+import logging
 import os
 import time
 import random
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Tuple
 from playwright.async_api import async_playwright, Page, Browser
 from dotenv import load_dotenv
 import pandas as pd
@@ -16,10 +19,22 @@ import requests
 import aiohttp
 import ssl
 import certifi
+import dom_extract
+import html_parser
+from selector_cache import SelectorCache
+from snowflake import DedupeWindow, message_snowflake, message_timestamp_ms, message_created_at
+from message_log import MessageLog, convert_json_array
+from webhook_client import WebhookClient, is_retryable
+from pipeline import Stage
+from outbox import Outbox
+from metrics import Metrics
+from log_setup import setup_logging
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger('monitor')
+
 class DiscordMonitor:
     def __init__(self):
         self.browser: Optional[Browser] = None
@@ -36,12 +51,53 @@ class DiscordMonitor:
         self.max_messages_per_batch = int(os.getenv('MAX_MESSAGES_PER_BATCH', '10'))
         self.enable_auto_migration = os.getenv('ENABLE_AUTO_MIGRATION', 'true').lower() == 'true'
         self.max_message_age_seconds = int(os.getenv('MAX_MESSAGE_AGE_SECONDS', '10'))
+        # 'batch' serialises all messages in one evaluate call, 'element' walks element handles,
+        # 'html' captures raw outerHTML in one call and parses it with lxml in worker processes
+        self.extraction_mode = os.getenv('EXTRACTION_MODE', 'batch').lower()
+        self.parse_workers = int(os.getenv('PARSE_WORKERS', '2'))
+        self.parse_pool: Optional[ProcessPoolExecutor] = None
+        # Optional archive of the captured HTML, for re-parsing later with html_parser.py
+        self.raw_html_log = MessageLog('monitor_raw_html.jsonl') if os.getenv('ARCHIVE_RAW_HTML', 'false').lower() == 'true' else None
+        # 'push' reacts to an in-page MutationObserver, 'poll' re-reads the DOM every CHECK_INTERVAL
+        self.detection_mode = os.getenv('DETECTION_MODE', 'push').lower()
+        self.watchdog_interval = float(os.getenv('WATCHDOG_INTERVAL', '10'))
+        # Per-role selector order (message, content, author, input), last success first
+        self.selectors = SelectorCache()
+        # Server/channel names, read once and dropped when the main frame navigates
+        self._location: Optional[Dict[str, str]] = None
+        self._location_page: Optional[Page] = None
         
         # State tracking
         self.last_message_id: Optional[str] = None
-        self.processed_messages: Set[str] = set()
+        # Per-channel snowflake watermark + bounded window of recent ids (constant size)
+        self.dedupe_window_size = int(os.getenv('DEDUPE_WINDOW_SIZE', '256'))
+        self.processed_messages = DedupeWindow(self.dedupe_window_size)
+        # Rows pushed by the in-page observer, drained by monitor_loop
+        self._pushed_messages: List[Dict[str, Any]] = []
+        self._push_event: Optional[asyncio.Event] = None
+        # Pooled webhook session, opened in run() and closed in close_browser()
+        self.webhook_client: Optional[WebhookClient] = None
+        # Archiver and deliverer stages fed by monitor_loop, each behind a bounded queue
+        self.pipeline_queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE', '100'))
+        self.archiver: Optional[Stage] = None
+        self.deliverer: Optional[Stage] = None
+        # Messages stay pending in the outbox until the webhook returns 204
+        self.outbox = Outbox('monitor_outbox.db')
+        self.delivery_max_attempts = int(os.getenv('DELIVERY_MAX_ATTEMPTS', '5'))
+        self.delivery_retry_base = float(os.getenv('DELIVERY_RETRY_BASE', '1'))
+        self.delivery_retry_max = 60
+        # Rolling per-stage latency histograms, dumped to JSON and optionally served on /metrics
+        self.metrics = Metrics()
+        self.metrics_file = 'monitor_metrics.json'
+        self.metrics_interval = float(os.getenv('METRICS_INTERVAL', '60'))
+        self.metrics_port = int(os.getenv('METRICS_PORT', '0'))
+        self._metrics_task: Optional[asyncio.Task] = None
+        self._metrics_runner = None
         self.state_file = 'monitor_state.json'
-        self.messages_log_file = 'monitored_messages.json'
+        self.messages_log_file = 'monitored_messages.jsonl'
+        # Pre-JSONL archive, converted once on startup if the JSONL log is missing
+        self.legacy_messages_log_file = 'monitored_messages.json'
+        self.message_log = MessageLog(self.messages_log_file)
         
         if not self.email or not self.password:
             raise ValueError("Please set DISCORD_EMAIL and DISCORD_PASSWORD in your .env file")
@@ -163,6 +219,21 @@ class DiscordMonitor:
             return True
 
     async def _get_current_location(self) -> Dict[str, str]:
+        """Current server and channel names, cached until the page navigates"""
+        if self._location_page is not self.page:
+            self.page.on('framenavigated', self._on_frame_navigated)
+            self._location_page = self.page
+            self._location = None
+        if self._location is None:
+            self._location = await self._read_current_location()
+        return self._location
+
+    def _on_frame_navigated(self, frame):
+        """Drop the cached location when the watched page's main frame changes URL"""
+        if self._location_page is not None and frame == self._location_page.main_frame:
+            self._location = None
+
+    async def _read_current_location(self) -> Dict[str, str]:
         """Best-effort read of current server and channel names for debug logs."""
         server_name = ''
         channel_name = ''
@@ -190,184 +261,307 @@ class DiscordMonitor:
 
     async def get_new_messages(self) -> List[Dict[str, Any]]:
         """Get new messages since last check with per-second retry and detailed logs"""
-        loc = await self._get_current_location()
-        print(f"\n📥 Fetching from: {loc['server']} > {loc['channel']}")
+        with self.metrics.timer('poll.location'):
+            loc = await self._get_current_location()
+        logger.debug("📥 Fetching from: %s > %s", loc['server'], loc['channel'])
         
         try:
             # Retry up to 10 seconds for messages container
             found = False
-            for i in range(1, 11):
-                try:
-                    await self.page.wait_for_selector('[data-list-id="chat-messages"]', timeout=1000)
-                    found = True
-                    print(f"  ⏳ trying {i}s: messages container visible")
-                    break
-                except Exception:
-                    print(f"  ⏳ trying {i}s: waiting for messages container...")
+            with self.metrics.timer('poll.container_wait'):
+                for i in range(1, 11):
+                    try:
+                        await self.page.wait_for_selector('[data-list-id="chat-messages"]', timeout=1000)
+                        found = True
+                        logger.debug("  ⏳ trying %ss: messages container visible", i)
+                        break
+                    except Exception:
+                        logger.info("  ⏳ trying %ss: waiting for messages container...", i)
             if not found:
-                print("✗ Messages container not found after 10s")
+                logger.warning("✗ Messages container not found after 10s")
                 return []
             
             # Light auto-scroll to ensure messages render (Discord virtualizes)
-            try:
-                await self.page.mouse.wheel(0, -800)
-                await asyncio.sleep(0.1)
-                await self.page.mouse.wheel(0, 800)
-                await asyncio.sleep(0.1)
-            except Exception:
-                pass
+            with self.metrics.timer('poll.scroll'):
+                try:
+                    await self.page.mouse.wheel(0, -800)
+                    await asyncio.sleep(0.1)
+                    await self.page.mouse.wheel(0, 800)
+                    await asyncio.sleep(0.1)
+                except Exception:
+                    pass
 
-            # Try multiple selectors for message elements
-            print("⏳ Extracting message elements...")
-            selectors = [
-                '[data-list-id="chat-messages"] [id^="chat-messages-"]',
-                '[id^="chat-messages-"]',
-                '[data-list-id="chat-messages"] article',
-                'li[id^="chat-messages-"]'
-            ]
-            message_elements: List[Any] = []
-            for sel in selectors:
-                message_elements = await self.page.query_selector_all(sel)
-                print(f"  • selector '{sel}' -> {len(message_elements)} elements")
-                if message_elements:
-                    break
-            if not message_elements:
-                print("✗ No message elements found with known selectors")
+            logger.debug("⏳ Extracting message elements...")
+            # Read only the rendered ids first; full extraction runs just for unseen ones
+            with self.metrics.timer('poll.element_query'):
+                message_strategy = self.selectors.get('message')
+                selector, rendered_ids = await dom_extract.find_message_ids(self.page, message_strategy.candidates)
+                message_strategy.record(selector)
+            if not rendered_ids:
+                logger.warning("✗ No message elements found with known selectors")
+                return []
+            fresh_ids = self.filter_unseen_ids(rendered_ids)
+            logger.debug("✓ Found %d message elements, %d not seen before", len(rendered_ids), len(fresh_ids))
+            if not fresh_ids:
                 return []
-            print(f"✓ Found {len(message_elements)} message elements")
 
-            # Debug: print id, timestamp and a text preview for the last 10 message elements
-            try:
-                print("🔎 Debug: dumping last 10 message elements (id | timestamp | preview)")
-                last_items = message_elements[-10:]
-                start_idx = max(0, len(message_elements) - len(last_items))
-                for i, el in enumerate(last_items, start=start_idx + 1):
-                    try:
-                        mid = await el.get_attribute('id')
-                    except Exception:
-                        mid = None
-                    try:
-                        ts_el = await el.query_selector('[class*="timestamp_"], time')
-                        ts = (await ts_el.inner_text()).strip() if ts_el else ''
-                    except Exception:
-                        ts = ''
-                    try:
-                        raw_text = await el.evaluate('node => node.innerText || node.textContent || ""')
-                        preview = raw_text.strip().replace('\n', ' ')[:300]
-                    except Exception as e:
-                        preview = f"<error reading text: {e}>"
-                    print(f"  • [{i}] id={mid} | ts='{ts}' | preview='{preview}'")
-            except Exception as e:
-                print(f"🔎 Debug dump failed: {e}")
+            if self.extraction_mode in ('batch', 'html'):
+                with self.metrics.timer('poll.extract'):
+                    if self.extraction_mode == 'html':
+                        extracted = await self.extract_messages_html(ids=fresh_ids)
+                    else:
+                        extracted = await self.extract_visible_messages(ids=fresh_ids)
+                logger.debug("✓ Extracted %d messages in one round-trip", len(extracted))
+
+                # Debug: id, timestamp and a text preview for the last 10 messages
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("🔎 Debug: dumping last 10 message elements (id | timestamp | preview)")
+                    start_idx = max(0, len(extracted) - 10)
+                    for i, m in enumerate(extracted[start_idx:], start=start_idx + 1):
+                        ts = (m.get('timestamp') or '').strip()
+                        preview = (m.get('content') or '').strip().replace('\n', ' ')[:300]
+                        logger.debug("  • [%d] id=%s | ts='%s' | preview='%s'", i, m.get('message_id'), ts, preview)
+            else:
+                with self.metrics.timer('poll.extract'):
+                    extracted = await self.extract_message_elements(ids=fresh_ids)
+                if extracted is None:
+                    return []
             
-            new_messages = []
-            current_time = datetime.now()
-            max_age_seconds = self.max_message_age_seconds
+            with self.metrics.timer('poll.select'):
+                return self.select_new_messages(extracted)
             
-            for idx, message_element in enumerate(message_elements):
-                try:
-                    message_data = await self.extract_message_data(message_element)
-                    if not message_data:
-                        print(f"  ℹ️  Skipping element #{idx+1}: no message_data extracted")
-                        continue
+        except Exception as e:
+            logger.error("✗ Error getting messages: %s", e)
+            return []
 
-                    mid = message_data.get('message_id')
-                    if mid in self.processed_messages:
-                        print(f"  ℹ️  Skipping {mid}: already processed")
-                        continue
+    def select_new_messages(self, extracted: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Dedupe and filter extracted messages, returning the new ones oldest first"""
+        new_messages = []
+        current_time = datetime.now()
+        max_age_seconds = self.max_message_age_seconds
 
-                    # Check if message has substantial content
-                    content = (message_data.get('content') or '').strip()
-                    if not content or len(content) < 20:
-                        preview = (content or '').replace('\n', ' ')[:120]
-                        print(f"  ℹ️  Skipping {mid}: content too short ({len(content)}) preview='{preview}'")
-                        continue
+        for idx, message_data in enumerate(extracted):
+            try:
+                if not message_data:
+                    logger.debug("  ℹ️  Skipping element #%d: no message_data extracted", idx + 1)
+                    continue
+
+                mid = message_data.get('message_id')
+                if mid in self.processed_messages:
+                    logger.debug("  ℹ️  Skipping %s: already processed", mid)
+                    continue
+                # Record as seen up front so filtered-out messages are not re-extracted
+                self.processed_messages.add(mid)
 
-                    # Only process messages that look like trading signals
-                    # Accept several common variants/casing of the markers
+                # Check if message has substantial content
+                content = (message_data.get('content') or '').strip()
+                if not content or len(content) < 20:
+                    preview = (content or '').replace('\n', ' ')[:120]
+                    logger.debug("  ℹ️  Skipping %s: content too short (%d) preview='%s'", mid, len(content), preview)
+                    continue
+
+                # Only process messages that look like trading signals
+                # Accept several common variants/casing of the markers
+                signal_found = False
+                try:
+                    if 'oculus trading signal' in content.lower():
+                        signal_found = True
+                    if 'ticker' in content.lower() and (':' in content):
+                        signal_found = True
+                except Exception:
                     signal_found = False
-                    try:
-                        if 'oculus trading signal' in content.lower():
-                            signal_found = True
-                        if 'ticker' in content.lower() and (':' in content):
-                            signal_found = True
-                    except Exception:
-                        signal_found = False
 
-                    if not signal_found:
-                        preview = content.replace('\n', ' ')[:120]
-                        print(f"  ℹ️  Skipping {mid}: no signal keywords found preview='{preview}'")
-                        continue
+                if not signal_found:
+                    preview = content.replace('\n', ' ')[:120]
+                    logger.debug("  ℹ️  Skipping %s: no signal keywords found preview='%s'", mid, preview)
+                    continue
 
-                    # Check if message is recent (within the specified time window)
-                    is_recent = False
-                    try:
-                        timestamp_str = (message_data.get('timestamp') or '').strip()
-                        if timestamp_str:
-                            # Fast checks
-                            if 'Just now' in timestamp_str or 'Today at' in timestamp_str:
-                                is_recent = True
-                            else:
-                                # Try to parse a full datetime first (handles formats like "Wednesday, 26 November 2025 at 13:34")
-                                try:
-                                    parsed_dt = parser.parse(timestamp_str, fuzzy=True)
-                                    delta_secs = abs((datetime.now() - parsed_dt).total_seconds())
-                                    if delta_secs <= self.max_message_age_seconds:
-                                        is_recent = True
-                                except Exception:
-                                    # Fallback: look for HH:MM (24h or 12h) and compare to today
-                                    m = re.search(r"(\d{1,2}:\d{2})", timestamp_str)
-                                    if m:
-                                        time_part = m.group(1)
-                                        try:
-                                            msg_time = datetime.strptime(time_part, '%H:%M').time()
-                                        except Exception:
-                                            try:
-                                                msg_time = datetime.strptime(time_part, '%I:%M').time()
-                                            except Exception:
-                                                msg_time = None
-                                        if msg_time:
-                                            now = datetime.now()
-                                            msg_dt = datetime.combine(now.date(), msg_time)
-                                            # If message time looks like it's in the future (cross-midnight), adjust backwards one day
-                                            if msg_dt > now:
-                                                msg_dt = msg_dt - timedelta(days=1)
-                                            delta = abs((now - msg_dt).total_seconds())
-                                            if delta <= self.max_message_age_seconds:
-                                                is_recent = True
-                    except Exception:
-                        # If we can't parse timestamp, skip this message
-                        continue
+                # Check if message is recent, using the exact creation time in its snowflake
+                created_ms = message_timestamp_ms(mid)
+                if created_ms is None:
+                    logger.debug("  ℹ️  Skipping %s: no snowflake in message id", mid)
+                    continue
+                age_seconds = time.time() - created_ms / 1000
+                if age_seconds > self.max_message_age_seconds:
+                    continue
 
-                    if not is_recent:
-                        continue
+                new_messages.append(message_data)
 
-                    new_messages.append(message_data)
-                    self.processed_messages.add(message_data['message_id'])
+                # Update last message ID
+                if not self.last_message_id:
+                    self.last_message_id = message_data['message_id']
 
-                    # Update last message ID
-                    if not self.last_message_id:
-                        self.last_message_id = message_data['message_id']
+                preview = content.replace('\n', ' ')
+                if len(preview) > 120:
+                    preview = preview[:117] + '...'
+                logger.debug("  ✓ fetched #%d: '%s'", idx + 1, preview)
 
-                    preview = content.replace('\n', ' ')
-                    if len(preview) > 120:
-                        preview = preview[:117] + '...'
-                    print(f"  ✓ fetched #{idx+1}: '{preview}'")
+            except Exception as e:
+                logger.warning("  ✗ Error extracting message %d: %s", idx + 1, e)
+                continue
 
-                except Exception as e:
-                    print(f"  ✗ Error extracting message {idx+1}: {e}")
-                    continue
-            
-            # Sort by timestamp (oldest first)
-            new_messages.sort(key=lambda x: x.get('timestamp', ''))
-            
-            print(f"✓ Fetch successful! {len(new_messages)} new trading signal messages")
-            return new_messages
-            
+        # Sort by snowflake creation time (oldest first)
+        new_messages.sort(key=lambda x: message_snowflake(x.get('message_id')) or 0)
+
+        logger.debug("✓ Fetch successful! %d new trading signal messages", len(new_messages))
+        return new_messages
+
+    def filter_unseen_ids(self, message_ids: List[str]) -> List[str]:
+        """Drop ids the dedupe window has already seen (integer snowflake checks)"""
+        return [mid for mid in message_ids if mid not in self.processed_messages]
+
+    async def extract_visible_messages(self, ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Extract every rendered message (or only ``ids``) in a single evaluate call"""
+        try:
+            raw_messages = await dom_extract.extract_messages(self.page, ids=ids, selectors=self.selectors.order())
+        except Exception as e:
+            logger.error("Error extracting messages in batch: %s", e)
+            return []
+        
+        return [self.build_message_data(raw) for raw in raw_messages]
+
+    async def extract_messages_html(self, ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Capture the rows' outerHTML in one call, then parse it off the event loop"""
+        try:
+            captured = await dom_extract.capture_message_html(self.page, ids=ids, selectors=self.selectors.order())
         except Exception as e:
-            print(f"✗ Error getting messages: {e}")
+            logger.error("Error capturing message HTML: %s", e)
+            return []
+        if not captured:
             return []
 
+        if self.parse_pool is None:
+            self.parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+        loop = asyncio.get_event_loop()
+        parse = functools.partial(html_parser.parse_messages,
+                                  content_selectors=list(self.selectors.get('content').candidates), clean=False)
+        try:
+            raw_messages = await loop.run_in_executor(self.parse_pool, parse, captured)
+        except Exception as e:
+            logger.error("Error parsing message HTML: %s", e)
+            return []
+        if self.raw_html_log is not None:
+            captured_at = datetime.now().isoformat()
+            await loop.run_in_executor(None, self.raw_html_log.append,
+                                       [dict(item, captured_at=captured_at) for item in captured])
+        return [self.build_message_data(raw) for raw in raw_messages]
+
+    def build_message_data(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn a dict serialised in the page into the monitor's message record"""
+        content = raw.get('content') or ''
+        self.selectors.record('content', raw.get('content_selector'))
+        if not content:
+            logger.debug("    ⚠️  Empty content extracted for %s", raw.get('message_id'))
+        return {
+            'message_id': raw.get('message_id'),
+            'content': content,
+            'author': raw.get('author') or '',
+            'timestamp': raw.get('timestamp') or '',
+            'created_at': message_created_at(raw.get('message_id')),
+            'attachments': raw.get('attachments') or [],
+            'embeds': raw.get('embeds') or [],
+            'scraped_at': datetime.now().isoformat(),
+            'source_server': self.source_server,
+            'source_channel': self.source_channel
+        }
+
+    async def extract_message_elements(self, ids: Optional[List[str]] = None) -> Optional[List[Optional[Dict[str, Any]]]]:
+        """Extract messages one element handle at a time (EXTRACTION_MODE=element)"""
+        message_elements: List[Any] = []
+        if ids is not None:
+            for mid in ids:
+                el = await self.page.query_selector(f'[id="{mid}"]')
+                if el:
+                    message_elements.append(el)
+        else:
+            # Try the message selector that matched last time, then the others
+            strategy = self.selectors.get('message')
+            message_elements = await strategy.query_all(self.page)
+            logger.debug("  • selector '%s' -> %d elements", strategy.preferred, len(message_elements))
+        if not message_elements:
+            logger.warning("✗ No message elements found with known selectors")
+            return None
+        logger.debug("✓ Found %d message elements", len(message_elements))
+
+        # Debug: id, timestamp and a text preview for the last 10 message elements.
+        # Each row costs three extra CDP round-trips, so it only runs at DEBUG.
+        if logger.isEnabledFor(logging.DEBUG):
+            await self.dump_message_elements(message_elements)
+
+        extracted = []
+        for idx, message_element in enumerate(message_elements):
+            try:
+                extracted.append(await self.extract_message_data(message_element))
+            except Exception as e:
+                logger.warning("  ✗ Error extracting message %d: %s", idx + 1, e)
+                extracted.append(None)
+        return extracted
+
+    async def dump_message_elements(self, message_elements: List[Any]):
+        """Log id, timestamp and text preview of the last 10 element handles"""
+        try:
+            logger.debug("🔎 Debug: dumping last 10 message elements (id | timestamp | preview)")
+            last_items = message_elements[-10:]
+            start_idx = max(0, len(message_elements) - len(last_items))
+            for i, el in enumerate(last_items, start=start_idx + 1):
+                try:
+                    mid = await el.get_attribute('id')
+                except Exception:
+                    mid = None
+                try:
+                    ts_el = await el.query_selector('[class*="timestamp_"], time')
+                    ts = (await ts_el.inner_text()).strip() if ts_el else ''
+                except Exception:
+                    ts = ''
+                try:
+                    raw_text = await el.evaluate('node => node.innerText || node.textContent || ""')
+                    preview = raw_text.strip().replace('\n', ' ')[:300]
+                except Exception as e:
+                    preview = f"<error reading text: {e}>"
+                logger.debug("  • [%d] id=%s | ts='%s' | preview='%s'", i, mid, ts, preview)
+        except Exception as e:
+            logger.debug("🔎 Debug dump failed: %s", e)
+
+    async def enable_push_detection(self) -> bool:
+        """Expose the push callback to the page and attach the chat-list observer"""
+        try:
+            if self._push_event is None:
+                await self.page.expose_function(dom_extract.PUSH_BINDING_NAME, self._on_pushed_messages)
+                self._push_event = asyncio.Event()
+        except Exception as e:
+            logger.warning("⚠️  Push detection unavailable, falling back to polling: %s", e)
+            return False
+        await self.attach_message_observer()
+        return True
+
+    async def attach_message_observer(self):
+        """(Re-)attach the MutationObserver; a no-op while it is still attached"""
+        try:
+            if not await dom_extract.observe_messages(self.page, self.selectors.order()):
+                logger.warning("⚠️  Messages container not mounted yet; observer will be retried by the watchdog")
+        except Exception as e:
+            logger.warning("⚠️  Could not attach message observer: %s", e)
+
+    def _on_pushed_messages(self, raw_messages: List[Dict[str, Any]]):
+        """Called from the page as soon as Discord renders new message rows"""
+        self._pushed_messages.extend(raw_messages)
+        self._push_event.set()
+
+    async def wait_for_pushed_messages(self, timeout: float) -> Optional[List[Dict[str, Any]]]:
+        """Wait for the observer to push rows; returns None if the watchdog timeout expires"""
+        try:
+            await asyncio.wait_for(self._push_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._push_event.clear()
+        raw_messages, self._pushed_messages = self._pushed_messages, []
+        with self.metrics.timer('push.select'):
+            fresh_ids = set(self.filter_unseen_ids([raw.get('message_id') for raw in raw_messages]))
+            logger.debug("⚡ Observer pushed %d messages, %d not seen before", len(raw_messages), len(fresh_ids))
+            return self.select_new_messages([
+                self.build_message_data(raw) for raw in raw_messages if raw.get('message_id') in fresh_ids
+            ])
+
     async def extract_message_data(self, message_element) -> Optional[Dict[str, Any]]:
         """Extract data from a single message element"""
         try:
@@ -377,41 +571,19 @@ class DiscordMonitor:
                 return None
             
             # Extract message content from current Discord DOM
-            content = ""
-            # 1) Direct message content div
-            content_el = await message_element.query_selector('[id^="message-content-"]')
-            if content_el:
-                try:
-                    content = (await content_el.inner_text()).strip()
-                except Exception:
-                    pass
-            # 2) Fallback: common class prefixes (obfuscated suffixes)
-            if not content:
-                for sel in [
-                    '[class^="messageContent_"]',
-                    '[class^="markup__"]',
-                    'div[role="document"]',
-                    'div[role="textbox"]',
-                ]:
-                    el = await message_element.query_selector(sel)
-                    if el:
-                        try:
-                            content = (await el.inner_text()).strip()
-                            if content:
-                                break
-                        except Exception:
-                            pass
-            # 3) Last resort: grab textContent of the whole message node
+            # 1) Content div or class-prefix fallbacks, the last selector that worked first
+            content = await self.selectors.get('content').query_text(message_element)
+            # 2) Last resort: grab textContent of the whole message node
             if not content:
                 try:
                     content = (await message_element.evaluate('el => el.textContent || ""')).strip()
                 except Exception:
                     pass
             if not content:
-                print("    ⚠️  Empty content extracted for", message_id)
+                logger.debug("    ⚠️  Empty content extracted for %s", message_id)
             
             # Extract author name
-            author_element = await message_element.query_selector('[class*="username_"], [class*="headerText_"] [class*="username_"], [class*="headerText-"] [class*="username-"], h3[role="heading"]')
+            author_element = await self.selectors.get('author').query(message_element)
             author = ""
             if author_element:
                 author = await author_element.inner_text()
@@ -443,6 +615,7 @@ class DiscordMonitor:
                 'content': content,
                 'author': author,
                 'timestamp': timestamp,
+                'created_at': message_created_at(message_id),
                 'attachments': attachments,
                 'embeds': embeds,
                 'scraped_at': datetime.now().isoformat(),
@@ -451,7 +624,7 @@ class DiscordMonitor:
             }
             
         except Exception as e:
-            print(f"Error extracting message data: {e}")
+            logger.warning("⚠️  Error extracting message data: %s", e)
             return None
 
     async def extract_attachment_data(self, attachment_element) -> Optional[Dict[str, Any]]:
@@ -472,7 +645,7 @@ class DiscordMonitor:
                 'name': name
             }
         except Exception as e:
-            print(f"Error extracting attachment data: {e}")
+            logger.warning("⚠️  Error extracting attachment data: %s", e)
             return None
 
     async def extract_embed_data(self, embed_element) -> Optional[Dict[str, Any]]:
@@ -499,7 +672,7 @@ class DiscordMonitor:
                 'url': url
             }
         except Exception as e:
-            print(f"Error extracting embed data: {e}")
+            logger.warning("⚠️  Error extracting embed data: %s", e)
             return None
 
     def convert_message_structure(self, message_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -565,45 +738,40 @@ class DiscordMonitor:
         return converted_message
 
     async def save_messages(self, messages: List[Dict[str, Any]]):
-        """Save messages to log file"""
+        """Append new messages to the JSONL log"""
         if not messages:
             return
         
         try:
-            # Load existing messages
-            existing_messages = []
-            existing_ids: Set[str] = set()
-            if os.path.exists(self.messages_log_file):
-                async with aiofiles.open(self.messages_log_file, 'r', encoding='utf-8') as f:
-                    content = await f.read()
-                    if content.strip():
-                        existing_messages = json.loads(content)
-                        for m in existing_messages:
-                            mid = m.get('message_id')
-                            if mid:
-                                existing_ids.add(mid)
-            
-            # Add new messages
-            new_unique_messages = [m for m in messages if m.get('message_id') not in existing_ids]
+            # File append + fsync runs off the event loop
+            loop = asyncio.get_event_loop()
+            new_unique_messages = await loop.run_in_executor(None, self.message_log.append, messages)
             if not new_unique_messages:
-                print("ℹ️  No new unique messages to save")
+                logger.debug("ℹ️  No new unique messages to save")
                 return
-            existing_messages.extend(new_unique_messages)
-            
-            # Save updated messages
-            async with aiofiles.open(self.messages_log_file, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(existing_messages, indent=2, ensure_ascii=False))
             
-            print(f"Saved {len(new_unique_messages)} new messages to {self.messages_log_file}")
+            logger.info("💾 Saved %d new messages to %s", len(new_unique_messages), self.messages_log_file)
             
         except Exception as e:
-            print(f"Error saving messages: {e}")
+            logger.error("✗ Error saving messages: %s", e)
+
+    async def load_processed_from_log(self):
+        """Build the archived-id index once and fold it into the dedupe state"""
+        if not os.path.exists(self.messages_log_file) and os.path.exists(self.legacy_messages_log_file):
+            count = convert_json_array(self.legacy_messages_log_file, self.messages_log_file)
+            print(f"Converted {count} messages from {self.legacy_messages_log_file} to {self.messages_log_file}")
+        
+        loop = asyncio.get_event_loop()
+        archived_ids = await loop.run_in_executor(None, self.message_log.load_ids)
+        for mid in archived_ids:
+            self.processed_messages.add(mid)
+        print(f"Indexed {len(archived_ids)} archived messages from {self.messages_log_file}")
 
     async def save_state(self):
         """Save monitoring state"""
         state = {
             'last_message_id': self.last_message_id,
-            'processed_messages': list(self.processed_messages),
+            'dedupe': self.processed_messages.to_dict(),
             'last_check': datetime.now().isoformat()
         }
         
@@ -611,20 +779,23 @@ class DiscordMonitor:
             async with aiofiles.open(self.state_file, 'w', encoding='utf-8') as f:
                 await f.write(json.dumps(state, indent=2, ensure_ascii=False))
         except Exception as e:
-            print(f"Error saving state: {e}")
+            logger.error("✗ Error saving state: %s", e)
 
     async def load_state(self):
         """Load monitoring state"""
-        if not os.path.exists(self.state_file):
-            return
-        
         try:
-            async with aiofiles.open(self.state_file, 'r', encoding='utf-8') as f:
-                content = await f.read()
+            if os.path.exists(self.state_file):
+                async with aiofiles.open(self.state_file, 'r', encoding='utf-8') as f:
+                    content = await f.read()
                 if content.strip():
                     state = json.loads(content)
                     self.last_message_id = state.get('last_message_id')
-                    self.processed_messages = set(state.get('processed_messages', []))
+                    self.processed_messages = DedupeWindow.from_dict(state.get('dedupe') or {}, self.dedupe_window_size)
+                    # Older state files carried the full processed id list
+                    for mid in state.get('processed_messages', []):
+                        self.processed_messages.add(mid)
+                    for channel, mark in (state.get('high_water_marks') or {}).items():
+                        self.processed_messages.raise_floor(channel, int(mark))
                     print(f"Loaded state: {len(self.processed_messages)} processed messages")
             # Also load processed IDs from existing log for dedupe across runs
             await self.load_processed_from_log()
@@ -634,57 +805,46 @@ class DiscordMonitor:
     async def migrate_messages(self, messages: List[Dict[str, Any]]):
         """Migrate messages to destination server"""
         if not self.enable_auto_migration:
-            print("⚠️  Auto-migration disabled")
+            logger.warning("⚠️  Auto-migration disabled")
             return
         
         # Check if we have destination URL (preferred) or server name
         if not self.dest_channel_url.strip() and not self.dest_server:
-            print("⚠️  No destination configured. Set DEST_CHANNEL_URL or DEST_SERVER_NAME in .env")
+            logger.warning("⚠️  No destination configured. Set DEST_CHANNEL_URL or DEST_SERVER_NAME in .env")
             return
         
         dest_name = self.dest_channel_url.strip() or f"{self.dest_server} > {self.dest_channel}"
-        print(f"\n📤 Starting migration of {len(messages)} messages to {dest_name}")
+        logger.info("📤 Starting migration of %d messages to %s", len(messages), dest_name)
         
-        # If we have a direct channel URL, skip server/channel finding
-        if self.dest_channel_url.strip():
-            print(f"↪️  Using direct channel URL: {self.dest_channel_url.strip()}")
-        else:
-            # Navigate to destination server using traditional method
-            if not await self.find_dest_server():
-                print("✗ Failed to find destination server. Migration aborted.")
-                return
-            
-            if not await self.find_dest_channel():
-                print("✗ Failed to find destination channel. Migration aborted.")
-                return
+        # Delivery goes through the webhook, so the page is left on the source
+        # channel: the detector keeps reading it while this stage runs
         
         successful_migrations = 0
         
         for i, message_data in enumerate(messages):
             try:
-                print(f"\n📝 Migrating message {i+1}/{len(messages)}...")
-                converted_message = self.convert_message_structure(message_data)
+                logger.debug("📝 Migrating message %d/%d...", i + 1, len(messages))
+                with self.metrics.timer('message.convert'):
+                    converted_message = self.convert_message_structure(message_data)
                 preview = (converted_message.get('formatted_content') or converted_message.get('content') or '').strip().replace('\n', ' ')
                 if len(preview) > 120:
                     preview = preview[:117] + '...'
-                print(f"   ✍️  rewrite preview: '{preview}'")
+                logger.debug("   ✍️  rewrite preview: '%s'", preview)
                 
-                if await self.post_message(converted_message):
+                if await self.deliver_message(converted_message, message_data.get('message_id')):
                     successful_migrations += 1
                     dest_display = self.dest_channel_url.strip() or f"{self.dest_server} > {self.dest_channel}"
-                    print(f"✓ Posted to '{dest_display}' (#{i+1})")
+                    logger.info("✓ Posted to '%s' (#%d)", dest_display, i + 1)
                 else:
-                    print(f"✗ Failed to migrate message {i+1}/{len(messages)}")
+                    logger.warning("✗ Failed to migrate message %d/%d", i + 1, len(messages))
                 
                 # Rate limiting
                 
             except Exception as e:
-                print(f"✗ Error migrating message {i+1}: {e}")
+                logger.error("✗ Error migrating message %d: %s", i + 1, e)
                 continue
         
-        print(f"\n{'='*60}")
-        print(f"✓ Migration completed: {successful_migrations}/{len(messages)} messages migrated successfully")
-        print(f"{'='*60}\n")
+        logger.info("✓ Migration completed: %d/%d messages migrated successfully", successful_migrations, len(messages))
 
     async def find_dest_server(self):
         """Find and navigate to destination server"""
@@ -720,22 +880,26 @@ class DiscordMonitor:
             print(f"✗ Could not find destination channel '{self.dest_channel}': {e}")
             return False
 
-    async def post_message(self, message_data: Dict[str, Any]):
-        """Post a message to destination Discord channel using webhook"""
+    async def post_message(self, message_data: Dict[str, Any]) -> Tuple[bool, bool]:
+        """Post a message to destination Discord channel using webhook
+
+        Returns (delivered, retryable): a failure is retryable only if trying
+        again could succeed (network error, 5xx, 429).
+        """
         try:
             # Get webhook URL from environment variable
             webhook_url = os.getenv('DISCORD_WEBHOOK_URL')
             if not webhook_url:
-                print("❌ No webhook URL configured. Set DISCORD_WEBHOOK_URL in your .env file")
-                return False
+                logger.error("❌ No webhook URL configured. Set DISCORD_WEBHOOK_URL in your .env file")
+                return False, False
 
             # Extract the message content
             content = message_data.get('formatted_content', message_data.get('content', ''))
             if not content.strip():
-                print("⚠️ No message content to send.")
-                return False
+                logger.warning("⚠️ No message content to send.")
+                return False, False
 
-            print(f"� Sending message via webhook: {content[:100]}...")
+            logger.debug("📨 Sending message via webhook: %s...", content[:100])
             
             # Prepare the webhook payload
             payload = {
@@ -744,29 +908,54 @@ class DiscordMonitor:
                 'avatar_url': None  # Optional: customize the webhook bot avatar
             }
 
-            message_input = None
-            # Configure SSL context with system certificates
-            import ssl
-            import certifi
-            ssl_context = ssl.create_default_context(cafile=certifi.where())
+            if self.webhook_client is None:
+                self.webhook_client = WebhookClient()
             
-            # Send the webhook request with configured SSL context
-            async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=ssl_context)) as session:
-                async with session.post(webhook_url, json=payload) as response:
-                    if response.status == 204:  # Discord returns 204 on successful webhook
-                        print("✅ Message sent successfully via webhook!")
-                        return True
-                    else:
-                        error_text = await response.text()
-                        print(f"❌ Failed to send webhook. Status: {response.status}, Error: {error_text}")
-                        return False
-
-            return True
+            # Pooled keep-alive connection; waits for the route's rate-limit budget, 429s are retried
+            started = time.perf_counter()
+            status, _, error_text = await self.webhook_client.send(webhook_url, payload)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if status == 204:  # Discord returns 204 on successful webhook
+                logger.debug("✅ Message sent successfully via webhook! (%.0f ms)", elapsed_ms)
+                return True, False
+            else:
+                logger.warning("❌ Failed to send webhook. Status: %s, Error: %s", status, error_text)
+                return False, is_retryable(status)
 
         except Exception as e:
-            print(f"❌ Error posting message: {e}")
-            return False
+            logger.error("❌ Error posting message: %s", e)
+            return False, True
+
 
+    async def deliver_message(self, message_data: Dict[str, Any], message_id: Optional[str]) -> bool:
+        """Post with exponential backoff and record the outcome in the outbox"""
+        loop = asyncio.get_event_loop()
+        delay = self.delivery_retry_base
+        for attempt in range(1, self.delivery_max_attempts + 1):
+            with self.metrics.timer('message.deliver'):
+                delivered, retryable = await self.post_message(message_data)
+            if delivered:
+                created_ms = message_timestamp_ms(message_id)
+                if created_ms is not None:
+                    # Snowflake creation time -> webhook 204
+                    self.metrics.observe('lag.end_to_end', time.time() * 1000 - created_ms)
+                if message_id:
+                    await loop.run_in_executor(None, self.outbox.mark_delivered, message_id)
+                return True
+            if not retryable:
+                # Retrying cannot fix this; do not hold up the deliverer stage
+                logger.warning("🚫 Not retrying: the webhook cannot accept this message")
+                if message_id:
+                    await loop.run_in_executor(None, self.outbox.mark_rejected, message_id, f"attempt {attempt} rejected")
+                return False
+            if message_id:
+                await loop.run_in_executor(None, self.outbox.mark_failed, message_id, f"attempt {attempt} failed")
+            if attempt < self.delivery_max_attempts:
+                logger.warning("🔁 Retrying in %.0fs (attempt %d/%d)", delay, attempt + 1, self.delivery_max_attempts)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.delivery_retry_max)
+        logger.warning("📮 Left pending in the outbox, will be replayed on next start")
+        return False
 
     async def random_delay(self, min_seconds: float = 1, max_seconds: float = 3):
         """Add random delay to mimic human behavior"""
@@ -774,9 +963,79 @@ class DiscordMonitor:
         await asyncio.sleep(delay)
 
     async def close_browser(self):
-        """Close the browser"""
+        """Close the browser and the webhook session"""
+        if self.webhook_client:
+            await self.webhook_client.close()
         if self.browser:
             await self.browser.close()
+            self.browser = None
+        if self.parse_pool is not None:
+            self.parse_pool.shutdown(wait=False, cancel_futures=True)
+            self.parse_pool = None
+        self.outbox.close()
+
+    def start_pipeline(self):
+        """Start the archiver and deliverer stages that monitor_loop feeds"""
+        self.archiver = Stage('archive', self.archive_messages, self.pipeline_queue_size, self.max_messages_per_batch)
+        self.deliverer = Stage('deliver', self.migrate_messages, self.pipeline_queue_size, self.max_messages_per_batch)
+        self.archiver.start()
+        self.deliverer.start()
+
+    async def archive_messages(self, messages: List[Dict[str, Any]]):
+        """Archiver stage: append to the log, then persist the dedupe state"""
+        with self.metrics.timer('stage.save'):
+            await self.save_messages(messages)
+        with self.metrics.timer('stage.state_save'):
+            await self.save_state()
+
+    async def replay_outbox(self):
+        """Queue messages a previous run left undelivered"""
+        loop = asyncio.get_event_loop()
+        pending = await loop.run_in_executor(None, self.outbox.pending)
+        if not pending:
+            return
+        print(f"📮 Replaying {len(pending)} undelivered messages from the outbox")
+        for message_data in pending:
+            await self.deliverer.put(message_data)
+
+    async def stop_pipeline(self):
+        """Drain queued messages and stop both stages"""
+        for stage in (self.archiver, self.deliverer):
+            if stage:
+                await stage.stop()
+                print(f"📊 {stage.describe()}")
+
+    async def start_metrics(self):
+        """Dump metrics every METRICS_INTERVAL seconds; serve /metrics when METRICS_PORT is set"""
+        if self.metrics_port:
+            try:
+                self._metrics_runner = await self.metrics.serve(self.metrics_port)
+                print(f"📈 Metrics at http://127.0.0.1:{self.metrics_port}/metrics")
+            except Exception as e:
+                print(f"⚠️  Could not start metrics endpoint: {e}")
+        self._metrics_task = asyncio.ensure_future(self._dump_metrics_periodically())
+
+    async def _dump_metrics_periodically(self):
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            self.dump_metrics()
+
+    def dump_metrics(self):
+        """Write the current histogram snapshot to the metrics file"""
+        try:
+            self.metrics.dump(self.metrics_file)
+        except Exception as e:
+            logger.warning("⚠️  Error saving metrics: %s", e)
+
+    async def stop_metrics(self):
+        """Stop the dump task and endpoint, writing one final snapshot"""
+        if self._metrics_task:
+            self._metrics_task.cancel()
+            self._metrics_task = None
+        if self._metrics_runner:
+            await self._metrics_runner.cleanup()
+            self._metrics_runner = None
+        self.dump_metrics()
 
     async def monitor_loop(self):
         """Main monitoring loop"""
@@ -790,48 +1049,73 @@ class DiscordMonitor:
         print(f"{'='*60}\n")
         
         await self.load_state()
+        self.start_pipeline()
+        await self.start_metrics()
+        if self.enable_auto_migration:
+            await self.replay_outbox()
+        
+        push_active = self.detection_mode == 'push' and await self.enable_push_detection()
+        if push_active:
+            print(f"⚡ Push detection active (watchdog poll every {self.watchdog_interval} seconds)")
+        poll_due = True
         
         try:
             while True:
-                print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔄 Checking for new messages...")
-                
-                # Get new messages (we're already on the correct server/channel)
-                new_messages = await self.get_new_messages()
+                if push_active and not poll_due:
+                    new_messages = await self.wait_for_pushed_messages(self.watchdog_interval)
+                    if new_messages is None:
+                        # Watchdog: nothing pushed for a while, re-attach the observer and poll
+                        poll_due = True
+                        continue
+                else:
+                    logger.debug("🔄 Checking for new messages...")
+                    if push_active:
+                        await self.attach_message_observer()
+                    
+                    # Get new messages (we're already on the correct server/channel)
+                    with self.metrics.timer('poll.total'):
+                        new_messages = await self.get_new_messages()
+                    poll_due = False
                 
                 if new_messages:
-                    print(f"✓ Found {len(new_messages)} new messages")
-                    
-                    # Save messages
-                    print("💾 Saving messages...")
-                    await self.save_messages(new_messages)
-                    print("✓ Messages saved")
+                    logger.info("[%s] ✓ Found %d new messages", datetime.now().strftime('%Y-%m-%d %H:%M:%S'), len(new_messages))
                     
-                    # Migrate messages if enabled
+                    # Recorded as pending before the archiver can save them as seen,
+                    # so a crash before the 204 cannot lose them
+                    pending = []
                     if self.enable_auto_migration:
-                        await self.migrate_messages(new_messages)
-                    
-                    # Save state
-                    await self.save_state()
+                        loop = asyncio.get_event_loop()
+                        pending = await loop.run_in_executor(None, self.outbox.enqueue, new_messages)
+                    # Hand off to the archiver/deliverer stages; detection resumes right away
+                    for message_data in new_messages:
+                        await self.archiver.put(message_data)
+                    for message_data in pending:
+                        await self.deliverer.put(message_data)
+                    logger.info("📊 %s | %s", self.archiver.describe(), self.deliverer.describe())
                 else:
-                    print("ℹ️  No new messages found")
+                    logger.debug("ℹ️  No new messages found")
                 
-                # Wait before next check
-                print(f"⏳ Waiting {self.check_interval} seconds before next check...")
-                await asyncio.sleep(self.check_interval)
+                # Wait before next check (push mode waits on the observer instead)
+                if not push_active:
+                    logger.debug("⏳ Waiting %s seconds before next check...", self.check_interval)
+                    await asyncio.sleep(self.check_interval)
                 
         except KeyboardInterrupt:
             print("\n\n⏹️  Monitoring stopped by user")
         except Exception as e:
-            print(f"✗ Error in monitoring loop: {e}")
+            logger.error("✗ Error in monitoring loop: %s", e)
         finally:
+            await self.stop_pipeline()
+            await self.stop_metrics()
             await self.save_state()
-            await self.close_browser()
 
     async def run(self):
         """Main execution method"""
         try:
             print("Starting Discord Monitor...")
             
+            self.webhook_client = WebhookClient()
+            await self.webhook_client.start()
             await self.start_browser()
             
             if not await self.login_to_discord():
@@ -852,6 +1136,7 @@ class DiscordMonitor:
 
 async def main():
     """Main function"""
+    setup_logging('monitor', log_file=os.getenv('LOG_FILE', 'monitor_log.jsonl'))
     monitor = DiscordMonitor()
     await monitor.run()
 
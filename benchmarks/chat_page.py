@@ -0,0 +1,266 @@
+"""
+Synthetic Discord-shaped chat pages for scaling tests.
+
+Generates a page with N rendered messages using Discord-style obfuscated class
+names (``messageContent_<hash>``, ``username_<hash>``, ``timestamp_<hash>``,
+fresh hashes per seed), a configurable share of embeds, attachments and
+grouped continuation rows, and valid increasing snowflake ids.
+
+The page also carries ``window.__chatSim``, which appends new rows the same
+way Discord does:
+
+    __chatSim.append(count)      append ``count`` messages now
+    __chatSim.start(perSecond)   keep appending at a steady rate
+    __chatSim.stop()
+    __chatSim.appended           ids appended so far
+
+With ``virtual_window`` the page behaves like Discord's virtualised list: only
+the newest rows are mounted, scrolling the list to the top mounts an older
+batch after a short delay, and rows past the window are unmounted from the
+bottom (``window.__virtualList.loads`` counts the batches).
+
+Run as a script to write a page to disk:
+
+    python benchmarks/chat_page.py 10000 -o chat_10k.html --embed-ratio 0.1 --rate 20
+"""
+
+import argparse
+import html
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+DISCORD_EPOCH_MS = 1420070400000
+CHANNEL_ID = '956761916179623956'
+START_TIME = datetime(2025, 12, 1, 9, 30, tzinfo=timezone.utc)
+
+AUTHORS = ['kouu', 'Atlas', 'Vega', 'orion.trades', 'Mira']
+TICKERS = ['SPY', 'QQQ', 'AMZN', 'TSLA', 'NVDA', 'AMD', 'META', 'AAPL', 'IWM']
+PHRASES = [
+    'IDEA- {t} {s}{cp} {d} @{p} light',
+    '{t} {s}{cp} {d} @{p} @Premium',
+    'Trimmed {t} here, up {g}%',
+    'Stop on {t} moved to {p}',
+    'Watching {t} at {s}, no entry yet',
+    'Out of {t} +{g}%. Great work everyone',
+    'Lotto: {t} {s}{cp} {d} @{p}\nSmall size only\nHard stop at open',
+]
+
+
+def snowflake_at(when: datetime, seq: int) -> int:
+    ms = int(when.timestamp() * 1000)
+    return ((ms - DISCORD_EPOCH_MS) << 22) | (1 << 17) | (seq & 0xFFF)
+
+
+def class_suffixes(rng: random.Random) -> dict:
+    """One random hash per CSS module, like a Discord build"""
+    return {module: '%06x' % rng.getrandbits(24)
+            for module in ('list', 'message', 'contents', 'markup', 'accessories', 'embed', 'attachment')}
+
+
+def random_content(rng: random.Random) -> str:
+    return rng.choice(PHRASES).format(
+        t=rng.choice(TICKERS), s=rng.randrange(100, 900, 5), cp=rng.choice('CP'),
+        d=f"12/{rng.randint(1, 31)}", p=f"{rng.uniform(0.2, 4):.2f}", g=rng.randint(10, 150))
+
+
+def render_message(cls: dict, snowflake: int, when: datetime, author: Optional[str], content: str,
+                   embed: bool, attachment: bool) -> str:
+    """One message row; ``author=None`` renders a grouped continuation row"""
+    m, c, k = cls['message'], cls['contents'], cls['markup']
+    iso = when.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    if author is not None:
+        header = (f'<h3 class="header_{c}"><span class="headerText_{c}"><span class="username_{c} clickable_{c}" role="button">{html.escape(author)}</span></span>'
+                  f'<span class="timestamp_{c} timestampInline_{c}"><time datetime="{iso}"><i class="separator_{c}" aria-hidden="true"> — </i>{when.strftime("%d/%m/%Y, %H:%M")}</time></span></h3>')
+        row_class = f'message_{m} cozyMessage_{m} groupStart_{m}'
+    else:
+        header = (f'<span class="timestamp_{c} timestampVisibleOnHover_{c}"><time datetime="{iso}">'
+                  f'<i class="separator_{c}" aria-hidden="true">[</i>{when.strftime("%H:%M")}<i class="separator_{c}" aria-hidden="true">]</i></time></span>')
+        row_class = f'message_{m} cozyMessage_{m}'
+    accessories = ''
+    if embed:
+        e = cls['embed']
+        accessories += (f'<article class="embedFull_{e} embed_{e} markup_{k}"><div class="grid_{e}">'
+                        f'<div class="embedTitle_{e}"><a class="embedTitleLink_{e}" href="https://example.com/chart/{snowflake}">Chart {snowflake % 1000}</a></div>'
+                        f'<div class="embedDescription_{e}">Levels and VWAP for the session</div></div></article>')
+    if attachment:
+        a = cls['attachment']
+        accessories += (f'<div class="messageAttachment_{a}"><div class="attachment_{a}">'
+                        f'<div class="filenameLinkWrapper_{a}"><a href="https://cdn.discordapp.com/attachments/{CHANNEL_ID}/{snowflake}/chart.png">chart.png</a></div></div></div>')
+    body = html.escape(content).replace('\n', '<br>')
+    return (f'<li id="chat-messages-{CHANNEL_ID}-{snowflake}" class="messageListItem_{m}">'
+            f'<div class="{row_class}" role="article"><div class="contents_{c}">{header}'
+            f'<div id="message-content-{snowflake}" class="markup_{k} messageContent_{c}">{body}</div></div>'
+            f'<div id="message-accessories-{snowflake}" class="container_{cls["accessories"]}">{accessories}</div></div></li>\n')
+
+
+# Mirrors render_message for rows appended at runtime
+SIMULATOR_JS = """
+(function () {
+    const cfg = %(config)s;
+    const list = document.querySelector('[data-list-id="chat-messages"]');
+    const c = cfg.cls;
+    const esc = (s) => s.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    let lastMs = cfg.lastMs, seq = 0, timer = null;
+
+    function nextSnowflake() {
+        const ms = Math.max(Date.now(), lastMs + 1);
+        lastMs = ms;
+        seq = (seq + 1) & 0xFFF;
+        return ((BigInt(ms - %(epoch)d) << 22n) | (1n << 17n) | BigInt(seq)).toString();
+    }
+
+    function row(sf) {
+        const when = new Date(lastMs).toISOString();
+        const author = cfg.authors[Math.floor(Math.random() * cfg.authors.length)];
+        const content = cfg.contents[Math.floor(Math.random() * cfg.contents.length)];
+        let acc = '';
+        if (Math.random() < cfg.embedRatio) {
+            acc += `<article class="embedFull_${c.embed} embed_${c.embed} markup_${c.markup}"><div class="grid_${c.embed}">` +
+                `<div class="embedTitle_${c.embed}"><a class="embedTitleLink_${c.embed}" href="https://example.com/chart/${sf}">Chart live</a></div>` +
+                `<div class="embedDescription_${c.embed}">Levels and VWAP for the session</div></div></article>`;
+        }
+        if (Math.random() < cfg.attachmentRatio) {
+            acc += `<div class="messageAttachment_${c.attachment}"><div class="attachment_${c.attachment}">` +
+                `<div class="filenameLinkWrapper_${c.attachment}"><a href="https://cdn.discordapp.com/attachments/${cfg.channel}/${sf}/chart.png">chart.png</a></div></div></div>`;
+        }
+        const li = document.createElement('li');
+        li.id = `chat-messages-${cfg.channel}-${sf}`;
+        li.className = `messageListItem_${c.message}`;
+        li.innerHTML = `<div class="message_${c.message} cozyMessage_${c.message} groupStart_${c.message}" role="article"><div class="contents_${c.contents}">` +
+            `<h3 class="header_${c.contents}"><span class="headerText_${c.contents}"><span class="username_${c.contents}" role="button">${esc(author)}</span></span>` +
+            `<span class="timestamp_${c.contents}"><time datetime="${when}">${when}</time></span></h3>` +
+            `<div id="message-content-${sf}" class="markup_${c.markup} messageContent_${c.contents}">${esc(content).replace(/\\n/g, '<br>')}</div></div>` +
+            `<div id="message-accessories-${sf}" class="container_${c.accessories}">${acc}</div></div>`;
+        return li;
+    }
+
+    window.__chatSim = {
+        appended: [],
+        append(count) {
+            const frag = document.createDocumentFragment();
+            for (let i = 0; i < (count || 1); i++) {
+                const li = row(nextSnowflake());
+                this.appended.push(li.id);
+                frag.appendChild(li);
+            }
+            list.appendChild(frag);
+        },
+        start(perSecond) {
+            this.stop();
+            const interval = Math.max(1, Math.round(1000 / perSecond));
+            const batch = Math.max(1, Math.round(perSecond * interval / 1000));
+            timer = setInterval(() => this.append(batch), interval);
+        },
+        stop() {
+            if (timer) clearInterval(timer);
+            timer = null;
+        }
+    };
+    if (cfg.rate > 0) window.__chatSim.start(cfg.rate);
+})();
+"""
+
+
+# Loads older rows when the scroller reaches the top, keeping at most cfg.window mounted
+VIRTUAL_LIST_JS = """
+(function () {
+    const older = %(older)s;
+    const cfg = %(config)s;
+    const list = document.querySelector('[data-list-id="chat-messages"]');
+    const scroller = list.parentElement;
+    let loading = false;
+    window.__virtualList = { loads: 0, remaining: () => older.length };
+    scroller.scrollTop = scroller.scrollHeight;
+    scroller.addEventListener('scroll', () => {
+        if (scroller.scrollTop > 0 || loading || !older.length) return;
+        loading = true;
+        setTimeout(() => {
+            const batch = older.splice(Math.max(0, older.length - cfg.batch));
+            list.insertAdjacentHTML('afterbegin', batch.join(''));
+            while (list.children.length > cfg.window) list.lastElementChild.remove();
+            // Keep the viewport off the top edge, as Discord's scroll anchoring does
+            scroller.scrollTop = Math.max(1, scroller.scrollHeight / 2);
+            window.__virtualList.loads += 1;
+            loading = false;
+        }, cfg.delayMs);
+    });
+})();
+"""
+
+
+def generate_chat_page(count: int, embed_ratio: float = 0.1, attachment_ratio: float = 0.1,
+                       group_ratio: float = 0.3, rate: float = 0, seed: int = 0,
+                       virtual_window: int = 0, load_delay_ms: int = 50) -> str:
+    """Build a full HTML chat page with ``count`` messages, oldest first
+
+    ``virtual_window`` > 0 mounts only that many rows and loads the rest on scroll.
+    """
+    rng = random.Random(seed)
+    cls = class_suffixes(rng)
+    rows: List[str] = []
+    when = START_TIME
+    author = None
+    for i in range(count):
+        when += timedelta(seconds=rng.randint(5, 600))
+        grouped = author is not None and rng.random() < group_ratio
+        if not grouped:
+            author = rng.choice(AUTHORS)
+        rows.append(render_message(cls, snowflake_at(when, i), when, None if grouped else author,
+                                   random_content(rng), rng.random() < embed_ratio,
+                                   rng.random() < attachment_ratio))
+
+    config = {
+        'cls': cls,
+        'channel': CHANNEL_ID,
+        'authors': AUTHORS,
+        'contents': [random_content(rng) for _ in range(50)],
+        'embedRatio': embed_ratio,
+        'attachmentRatio': attachment_ratio,
+        'rate': rate,
+        'lastMs': int(when.timestamp() * 1000),
+    }
+    script = SIMULATOR_JS % {'config': json.dumps(config), 'epoch': DISCORD_EPOCH_MS}
+    scroller_style = ''
+    if virtual_window:
+        older, rows = rows[:-virtual_window], rows[-virtual_window:]
+        virtual = {'window': virtual_window, 'batch': max(1, virtual_window // 2), 'delayMs': load_delay_ms}
+        script += VIRTUAL_LIST_JS % {'older': json.dumps(older), 'config': json.dumps(virtual)}
+        scroller_style = ' style="height: 600px; overflow-y: auto"'
+    l = cls['list']
+    return ('<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+            f'<title>#signals | Synthetic ({count} messages)</title>\n</head>\n<body>\n'
+            f'<nav aria-label="Servers sidebar"><div aria-label="Synthetic Server" aria-current="page"></div></nav>\n'
+            f'<main class="chatContent_{l}">\n<h1 role="heading" class="title_{l}">signals</h1>\n'
+            f'<div class="scroller_{l}" role="group"{scroller_style}>\n'
+            f'<ol data-list-id="chat-messages" class="scrollerInner_{l}" role="list">\n'
+            + ''.join(rows) +
+            '</ol>\n</div>\n'
+            f'<div role="textbox" contenteditable="true" data-slate-editor="true" class="editor_{l}"></div>\n'
+            f'</main>\n<script>{script}</script>\n</body>\n</html>\n')
+
+
+def main():
+    """Main function"""
+    ap = argparse.ArgumentParser(description='Generate a synthetic Discord-shaped chat page')
+    ap.add_argument('count', type=int, help='number of rendered messages')
+    ap.add_argument('-o', '--output', default=None, help='output file (default chat_<count>.html)')
+    ap.add_argument('--embed-ratio', type=float, default=0.1)
+    ap.add_argument('--attachment-ratio', type=float, default=0.1)
+    ap.add_argument('--group-ratio', type=float, default=0.3)
+    ap.add_argument('--rate', type=float, default=0, help='messages per second appended after load (0 = static)')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--virtual-window', type=int, default=0, help='rows mounted at once (0 = all)')
+    args = ap.parse_args()
+
+    output = args.output or f'chat_{args.count}.html'
+    page = generate_chat_page(args.count, args.embed_ratio, args.attachment_ratio,
+                              args.group_ratio, args.rate, args.seed, args.virtual_window)
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(page)
+    print(f"Wrote {args.count} messages to {output} ({len(page) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
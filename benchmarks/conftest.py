@@ -0,0 +1,131 @@
+"""
+Shared fixtures for the offline extraction benchmarks.
+
+Saved Discord-like chat pages live in ``fixtures/`` and are opened from disk
+in headless Chromium, so extraction can be timed without a Discord login.
+Everything skips cleanly when Playwright, its Chromium build or the monitor's
+own dependencies are not installed.
+"""
+
+import asyncio
+import importlib.util
+import os
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+FIXTURES_DIR = BENCH_DIR / 'fixtures'
+FIXTURE_NAMES = sorted(p.stem for p in FIXTURES_DIR.glob('*.html'))
+
+# The monitors import their helper modules (dom_extract, snowflake, ...) from the repo root
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+def record_per_item(benchmark, key: str, count: int, scale: float = 1000, digits: int = 3):
+    """Store mean time per item (``scale`` 1000 = ms, 1e6 = us) in extra_info
+
+    Skipped under --benchmark-disable, where the test runs once and no stats exist.
+    """
+    if benchmark.stats:
+        benchmark.extra_info[key] = round(benchmark.stats.stats.mean * scale / max(count, 1), digits)
+
+
+def fixture_path(name: str) -> Path:
+    return FIXTURES_DIR / f'{name}.html'
+
+
+def fixture_message_ids(name: str):
+    """Message row ids in a fixture file, in document order"""
+    return re.findall(r'<li id="(chat-messages-[\d-]+)"', fixture_path(name).read_text(encoding='utf-8'))
+
+
+def load_monitor_module():
+    """Import 6thsense.py (not importable by name) or skip if its dependencies are missing"""
+    spec = importlib.util.spec_from_file_location('sixthsense_monitor', REPO_ROOT / '6thsense.py')
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except ImportError as e:
+        pytest.skip(f"monitor dependencies not installed: {e}")
+    return module
+
+
+@pytest.fixture(scope='session')
+def run():
+    """Run a coroutine to completion on one event loop shared by the whole session"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture(scope='session')
+def browser(run):
+    async_api = pytest.importorskip('playwright.async_api')
+    playwright = run(async_api.async_playwright().start())
+    try:
+        # CHROMIUM_EXECUTABLE points at a local Chrome when Playwright's own build is not installed
+        browser = run(playwright.chromium.launch(headless=True, executable_path=os.getenv('CHROMIUM_EXECUTABLE') or None))
+    except Exception as e:
+        run(playwright.stop())
+        pytest.skip(f"headless Chromium not available: {str(e).splitlines()[0]}")
+    yield browser
+    run(browser.close())
+    run(playwright.stop())
+
+
+@pytest.fixture
+def page(run, browser):
+    page = run(browser.new_page(viewport={'width': 1920, 'height': 1080}))
+    yield page
+    run(page.close())
+
+
+@pytest.fixture
+def open_fixture(run, page):
+    """Load a saved chat page by name into ``page``"""
+    def _open(name: str):
+        run(page.goto(fixture_path(name).as_uri()))
+        return page
+    return _open
+
+
+@pytest.fixture
+def open_synthetic(run, page, tmp_path):
+    """Write a chat_page.generate_chat_page page to tmp_path and load it"""
+    from chat_page import generate_chat_page
+
+    def _open(count: int, rate: float = 0, virtual_window: int = 0):
+        path = tmp_path / f'chat_{count}.html'
+        path.write_text(generate_chat_page(count, rate=rate, virtual_window=virtual_window), encoding='utf-8')
+        run(page.goto(path.as_uri()))
+        return page
+    return _open
+
+
+@pytest.fixture
+def fake_webhook(run):
+    """A running FakeWebhookServer; its URL is ``fake_webhook.url``"""
+    pytest.importorskip('aiohttp')
+    from fake_webhook import FakeWebhookServer
+
+    server = FakeWebhookServer()
+    run(server.start())
+    yield server
+    run(server.stop())
+
+
+@pytest.fixture
+def monitor(monkeypatch, tmp_path):
+    """A 6thsense DiscordMonitor whose state, log and outbox files live in tmp_path"""
+    module = load_monitor_module()
+    monkeypatch.setenv('DISCORD_EMAIL', 'bench@example.com')
+    monkeypatch.setenv('DISCORD_PASSWORD', 'bench')
+    monkeypatch.chdir(tmp_path)
+    monitor = module.DiscordMonitor()
+    yield monitor
+    monitor.outbox.close()
@@ -0,0 +1,167 @@
+"""
+Local stand-in for a Discord webhook, for relay benchmarks that must not touch Discord.
+
+Implements the parts of the webhook contract the monitors depend on:
+``POST /api/webhooks/<id>/<token>`` answers 204, or 200 with a message object
+when called with ``?wait=true``, every response carries ``X-RateLimit-*``
+headers, and requests beyond the configured bucket get a 429 with
+``Retry-After``. Artificial latency can be added, and every request is recorded
+with its arrival time.
+
+    python benchmarks/fake_webhook.py --port 8765 --latency 0.05 --rate-limit 5/2
+    # then point the monitor at http://127.0.0.1:8765/api/webhooks/1/bench
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from aiohttp import web
+
+DISCORD_EPOCH_MS = 1420070400000
+
+
+class FakeWebhookServer:
+    def __init__(self, latency: float = 0.0, rate_limit: Optional[Tuple[int, float]] = None):
+        # rate_limit is (requests, per_seconds), e.g. (5, 2.0) for Discord's usual webhook bucket
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.arrivals: List[Dict[str, Any]] = []
+        self._window_start = 0.0
+        self._window_count = 0
+        self._seq = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ''
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/api/webhooks/{webhook_id}/{token}', self.handle_post)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Start listening; returns the webhook URL to post to"""
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://{host}:{bound_port}/api/webhooks/1/bench'
+        return self.url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _rate_limit_state(self, now: float) -> Tuple[bool, Dict[str, str]]:
+        """Fixed-window bucket; returns (allowed, headers)"""
+        if not self.rate_limit:
+            return True, {}
+        limit, per = self.rate_limit
+        if now - self._window_start >= per:
+            self._window_start = now
+            self._window_count = 0
+        reset_after = max(0.0, self._window_start + per - now)
+        allowed = self._window_count < limit
+        if allowed:
+            self._window_count += 1
+        headers = {
+            'X-RateLimit-Limit': str(limit),
+            'X-RateLimit-Remaining': str(max(0, limit - self._window_count)),
+            'X-RateLimit-Reset': f'{time.time() + reset_after:.3f}',
+            'X-RateLimit-Reset-After': f'{reset_after:.3f}',
+            'X-RateLimit-Bucket': 'fake-webhook-bucket',
+        }
+        if not allowed:
+            # Header is whole seconds like Discord's; the JSON body carries the exact float
+            headers['Retry-After'] = str(max(1, math.ceil(reset_after)))
+            headers['X-RateLimit-Scope'] = 'shared'
+        return allowed, headers
+
+    async def handle_post(self, request: web.Request) -> web.Response:
+        arrived_at = time.time()
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            payload = None
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        allowed, headers = self._rate_limit_state(time.monotonic())
+        record = {
+            'arrived_at': arrived_at,
+            'payload': payload,
+            'webhook_id': request.match_info['webhook_id'],
+            'wait': request.query.get('wait', '').lower() == 'true',
+        }
+        if not allowed:
+            record['status'] = 429
+            self.arrivals.append(record)
+            body = {'message': 'You are being rate limited.', 'retry_after': float(headers['X-RateLimit-Reset-After']), 'global': False}
+            return web.json_response(body, status=429, headers=headers)
+
+        if not payload or not (payload.get('content') or payload.get('embeds')):
+            record['status'] = 400
+            self.arrivals.append(record)
+            return web.json_response({'message': 'Cannot send an empty message', 'code': 50006}, status=400, headers=headers)
+
+        record['status'] = 200 if record['wait'] else 204
+        self.arrivals.append(record)
+        if not record['wait']:
+            return web.Response(status=204, headers=headers)
+
+        self._seq += 1
+        snowflake = ((int(arrived_at * 1000) - DISCORD_EPOCH_MS) << 22) | (self._seq & 0xFFF)
+        message = {
+            'id': str(snowflake),
+            'type': 0,
+            'content': payload.get('content', ''),
+            'channel_id': '1',
+            'author': {'id': request.match_info['webhook_id'], 'username': payload.get('username') or 'Fake Webhook', 'bot': True},
+            'timestamp': datetime.fromtimestamp(arrived_at, tz=timezone.utc).isoformat(),
+            'webhook_id': request.match_info['webhook_id'],
+        }
+        return web.json_response(message, headers=headers)
+
+    def delivered(self) -> List[Dict[str, Any]]:
+        """Arrivals that were accepted (204 or 200)"""
+        return [a for a in self.arrivals if a['status'] in (200, 204)]
+
+
+def parse_rate_limit(value: str) -> Tuple[int, float]:
+    count, _, per = value.partition('/')
+    return int(count), float(per or 1)
+
+
+async def serve(args):
+    server = FakeWebhookServer(args.latency, parse_rate_limit(args.rate_limit) if args.rate_limit else None)
+    url = await server.start(args.host, args.port)
+    print(f"Fake webhook listening on {url}")
+    try:
+        while True:
+            await asyncio.sleep(5)
+            print(f"  {len(server.delivered())} delivered, {len(server.arrivals)} requests")
+    finally:
+        await server.stop()
+
+
+def main():
+    """Main function"""
+    ap = argparse.ArgumentParser(description='Local Discord webhook stand-in')
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8765)
+    ap.add_argument('--latency', type=float, default=0.0, help='seconds added before each response')
+    ap.add_argument('--rate-limit', default=None, help='bucket as REQUESTS/SECONDS, e.g. 5/2')
+    args = ap.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Message cleaning throughput over real archived message bodies: the old
+sequential ``re.sub`` chain against content_normalizer's alternation scan.
+
+Needs no browser: the corpus is the content field of 6thsense_messages.json.
+
+    pytest benchmarks/test_cleaning.py --benchmark-group-by=group
+"""
+
+import json
+import re
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from conftest import REPO_ROOT, record_per_item
+from content_normalizer import NORMALIZED_KEY, normalize_content, normalize_message
+
+ARCHIVE = REPO_ROOT / '6thsense_messages.json'
+
+
+def clean_sequential(content: str) -> str:
+    """The eight-pass clean_message_content that content_normalizer replaced (reference)"""
+    if not content:
+        return content
+    content = re.sub(r'@premium', '@VIP', content, flags=re.IGNORECASE)
+    content = re.sub(r':[a-zA-Z0-9_+-]+:', '', content)
+    content = re.sub(r'\[\d{1,2}:\d{2}\].*?(?:Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday).*?Add\s*Reaction', '', content, flags=re.IGNORECASE | re.DOTALL)
+    content = re.sub(r'\d+Add\s*Reaction', '', content, flags=re.IGNORECASE)
+    content = re.sub(r'\s*Add\s*Reaction\s*', '', content, flags=re.IGNORECASE)
+    content = re.sub(r'(?:Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)\s+\d{1,2}\s+(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4}\s+at\s+\d{1,2}:\d{2}', '', content, flags=re.IGNORECASE)
+    content = re.sub(r'[ \t]+', ' ', content)
+    content = re.sub(r'\n[ \t]*\n[ \t]*\n+', '\n\n', content)
+    return content.strip()
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    if not ARCHIVE.exists():
+        pytest.skip(f"{ARCHIVE.name} not present")
+    messages = json.loads(ARCHIVE.read_text(encoding='utf-8'))
+    return [m.get('content') or '' for m in messages]
+
+
+def record_rate(benchmark, corpus):
+    benchmark.extra_info['messages'] = len(corpus)
+    record_per_item(benchmark, 'per_message_us', len(corpus), scale=1e6, digits=2)
+
+
+def test_normalizer_matches_sequential(corpus):
+    artifacts = [
+        '[09:55] Monday 8 December 2025 at 09:5573Add Reaction',
+        'IDEA- AMZN 230C 12/5 @.87 @Premium  light :fire:\n \n\t\n\nAdd Reaction',
+        'Recap Friday 5 December 2025 at 12:27 12Add Reaction done',
+    ]
+    for content in corpus + artifacts:
+        assert normalize_content(content) == clean_sequential(content)
+        assert normalize_content(normalize_content(content)) == normalize_content(content)
+
+
+@pytest.mark.parametrize('content, expected', [
+    # Removing "12Add Reaction" does not glue "AddReaction" to the trailing tab as the old chain did
+    ('xAddReaction12Add Reaction\t x', 'x x'),
+    # The date only forms once the reaction count between its words is gone
+    (' Monday 12Add Reaction8 December 2025 at 09:55', ''),
+])
+def test_normalizer_adjacent_tokens(content, expected):
+    assert normalize_content(content) == expected
+    assert normalize_content(expected) == expected
+
+
+@pytest.mark.benchmark(group='clean')
+def test_clean_sequential(benchmark, corpus):
+    benchmark(lambda: [clean_sequential(c) for c in corpus])
+    record_rate(benchmark, corpus)
+
+
+@pytest.mark.benchmark(group='clean')
+def test_normalize_content(benchmark, corpus):
+    cleaned = benchmark(lambda: [normalize_content(c) for c in corpus])
+
+    assert len(cleaned) == len(corpus)
+    record_rate(benchmark, corpus)
+
+
+@pytest.mark.benchmark(group='clean')
+def test_normalize_message_already_marked(benchmark, corpus):
+    """Second stage (migrate_messages) on records extraction already cleaned"""
+    records = [normalize_message({'content': c}) for c in corpus]
+    benchmark(lambda: [normalize_message(r) for r in records])
+
+    assert all(r[NORMALIZED_KEY] for r in records)
+    record_rate(benchmark, corpus)
+
+
+@pytest.mark.benchmark(group='clean')
+def test_clean_message_content(benchmark, monitor, corpus):
+    cleaned = benchmark(lambda: [monitor.clean_message_content(c) for c in corpus])
+
+    assert cleaned == [clean_sequential(c) for c in corpus]
+    record_rate(benchmark, corpus)
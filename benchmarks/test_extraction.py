@@ -0,0 +1,67 @@
+"""
+Extraction latency against the saved chat fixtures.
+
+    pytest benchmarks/ --benchmark-columns=min,mean,max,rounds
+
+``extract_message_data`` is timed over every row of a fixture and also
+reported per message; ``get_new_messages`` is timed as one full poll with an
+empty dedupe window, in both extraction modes.
+"""
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('playwright.async_api')
+
+import dom_extract
+from snowflake import DedupeWindow
+from conftest import FIXTURE_NAMES, fixture_message_ids, record_per_item
+
+
+def record_per_message(benchmark, count: int):
+    benchmark.extra_info['messages'] = count
+    record_per_item(benchmark, 'per_message_ms', count)
+
+
+@pytest.mark.parametrize('fixture_name', FIXTURE_NAMES)
+def test_extract_message_data(benchmark, run, monitor, open_fixture, fixture_name):
+    monitor.page = open_fixture(fixture_name)
+    elements = run(monitor.page.query_selector_all(dom_extract.MESSAGE_SELECTORS[0]))
+
+    async def extract_all():
+        return [await monitor.extract_message_data(el) for el in elements]
+
+    results = benchmark(lambda: run(extract_all()))
+
+    assert [r['message_id'] for r in results] == fixture_message_ids(fixture_name)
+    record_per_message(benchmark, len(results))
+
+
+@pytest.mark.parametrize('extraction_mode', ['batch', 'element'])
+@pytest.mark.parametrize('fixture_name', FIXTURE_NAMES)
+def test_get_new_messages(benchmark, run, monitor, open_fixture, fixture_name, extraction_mode):
+    monitor.page = open_fixture(fixture_name)
+    monitor.extraction_mode = extraction_mode
+
+    def forget_seen():
+        # Every poll should see the whole fixture as new
+        monitor.processed_messages = DedupeWindow(monitor.dedupe_window_size)
+        monitor.last_message_id = None
+
+    results = benchmark.pedantic(lambda: run(monitor.get_new_messages()), setup=forget_seen,
+                                 rounds=20, warmup_rounds=1)
+
+    assert [m['message_id'] for m in results] == fixture_message_ids(fixture_name)
+    record_per_message(benchmark, len(results))
+
+
+def test_extraction_modes_agree(run, monitor, open_fixture):
+    """Batch and element extraction produce the same records for every fixture"""
+    for fixture_name in FIXTURE_NAMES:
+        monitor.page = open_fixture(fixture_name)
+        batch = run(monitor.extract_visible_messages())
+        elements = run(monitor.page.query_selector_all(dom_extract.MESSAGE_SELECTORS[0]))
+        per_element = [run(monitor.extract_message_data(el)) for el in elements]
+        for a, b in zip(batch, per_element):
+            for key in ('message_id', 'content', 'author', 'timestamp', 'attachments', 'embeds', 'created_at'):
+                assert a[key] == b[key], (fixture_name, a['message_id'], key)
@@ -0,0 +1,85 @@
+"""
+Offline lxml parsing of captured message HTML (EXTRACTION_MODE=html).
+
+The parser tests need no browser: rows are cut out of the fixture files and
+the synthetic chat pages with lxml, the same ``outerHTML`` the page would hand
+over. Only the mode comparison at the end opens Chromium.
+
+    pytest benchmarks/test_html_parser.py --benchmark-group-by=param:count
+"""
+
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+lxml_html = pytest.importorskip('lxml.html')
+
+import html_parser
+from chat_page import generate_chat_page
+from conftest import FIXTURE_NAMES, fixture_message_ids, fixture_path, record_per_item
+
+ROWS_XPATH = '//*[@data-list-id="chat-messages"]//*[starts-with(@id, "chat-messages-")]'
+
+
+def capture_rows(page_html: str):
+    """What dom_extract.capture_message_html returns for a page, without a browser"""
+    root = lxml_html.document_fromstring(page_html)
+    return [{'message_id': row.get('id'), 'html': lxml_html.tostring(row, encoding='unicode')}
+            for row in root.xpath(ROWS_XPATH)]
+
+
+@pytest.fixture(scope='module')
+def pool():
+    executor = ProcessPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.parametrize('fixture_name', FIXTURE_NAMES)
+def test_parse_fixture(fixture_name):
+    captured = capture_rows(fixture_path(fixture_name).read_text(encoding='utf-8'))
+    messages = html_parser.parse_messages(captured, clean=True)
+
+    assert [m['message_id'] for m in messages] == fixture_message_ids(fixture_name)
+    for message in messages:
+        assert message['content'] or message['attachments'] or message['embeds']
+        assert message['content_normalized']
+
+
+@pytest.mark.parametrize('count', [100, 1000])
+def test_parse_in_process(benchmark, count):
+    captured = capture_rows(generate_chat_page(count))
+
+    messages = benchmark(html_parser.parse_messages, captured, clean=True)
+
+    assert len(messages) == count
+    record_per_item(benchmark, 'per_message_us', count, scale=1e6, digits=2)
+
+
+@pytest.mark.parametrize('count', [100, 1000])
+def test_parse_in_pool(benchmark, pool, count):
+    """Round-trip through a worker process, as the monitor does (includes pickling)"""
+    captured = capture_rows(generate_chat_page(count))
+    parse = functools.partial(html_parser.parse_messages, clean=True)
+
+    messages = benchmark(lambda: pool.submit(parse, captured).result())
+
+    assert len(messages) == count
+
+
+def test_html_mode_agrees_with_batch(run, monitor, open_fixture):
+    """html extraction yields the same records as the in-page serialiser, up to whitespace"""
+    for fixture_name in FIXTURE_NAMES:
+        monitor.page = open_fixture(fixture_name)
+        batch = run(monitor.extract_visible_messages())
+        parsed = run(monitor.extract_messages_html())
+        assert [m['message_id'] for m in parsed] == [m['message_id'] for m in batch]
+        for a, b in zip(batch, parsed):
+            assert a['content'].split() == b['content'].split(), (fixture_name, a['message_id'])
+            assert a['author'].split() == b['author'].split(), (fixture_name, a['message_id'])
+            assert [x['url'] for x in a['attachments']] == [x['url'] for x in b['attachments']]
+            assert [x['url'] for x in a['embeds']] == [x['url'] for x in b['embeds']]
+    monitor.parse_pool.shutdown()
+    monitor.parse_pool = None
@@ -0,0 +1,28 @@
+"""
+MessageLog crash recovery: appends after a torn trailing line.
+
+    pytest benchmarks/test_message_log.py
+"""
+
+from message_log import MessageLog
+
+
+def test_append_after_torn_tail(tmp_path):
+    path = tmp_path / 'log.jsonl'
+    path.write_text('{"message_id":"a"}\n{"message_id":"b", "con', encoding='utf-8')
+    log = MessageLog(str(path))
+
+    assert [m['message_id'] for m in log.append([{'message_id': 'c'}])] == ['c']
+    assert [m['message_id'] for m in MessageLog(str(path))] == ['a', 'c']
+    # The torn record was never archived, so it can be appended again
+    log.append([{'message_id': 'b'}])
+    assert [m['message_id'] for m in MessageLog(str(path))] == ['a', 'c', 'b']
+
+
+def test_append_keeps_complete_last_line(tmp_path):
+    path = tmp_path / 'log.jsonl'
+    path.write_text('{"message_id":"a"}\n{"message_id":"b"}', encoding='utf-8')
+
+    MessageLog(str(path)).append([{'message_id': 'c'}])
+
+    assert [m['message_id'] for m in MessageLog(str(path))] == ['a', 'b', 'c']
@@ -0,0 +1,252 @@
+"""
+discord_migrator.py's webhook mode against the local fake webhook.
+
+No browser or login: the archive is the monitors' 6thsense_messages.json,
+repeated to the requested size. The archive is streamed, so the tests also
+cover message_log.iter_archive on both archive formats.
+
+    pytest benchmarks/test_migrator.py -s
+"""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('aiohttp')
+pytest.importorskip('playwright')
+
+from conftest import REPO_ROOT, record_per_item
+from discord_migrator import DiscordMigrator, MESSAGE_CHAR_LIMIT
+from message_log import iter_archive, iter_json_array
+from snowflake import message_snowflake
+from webhook_client import WebhookClient
+
+ARCHIVE = REPO_ROOT / '6thsense_messages.json'
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """Write an archive of ``count`` messages and return its path"""
+    if not ARCHIVE.exists():
+        pytest.skip(f"{ARCHIVE.name} not present")
+    source = json.loads(ARCHIVE.read_text(encoding='utf-8'))
+
+    def _write(count: int, with_ids: bool = True):
+        messages = [dict(source[i % len(source)]) for i in range(count)]
+        if not with_ids:
+            # discord_scraper.py exports carry no message_id
+            for message in messages:
+                message.pop('message_id', None)
+        path = tmp_path / f'archive_{count}.json'
+        path.write_text(json.dumps(messages, ensure_ascii=False), encoding='utf-8')
+        return path
+    return _write
+
+
+def test_webhook_payload_attribution():
+    migrator = DiscordMigrator('unused.json', webhook_url='http://127.0.0.1/api/webhooks/1/t')
+    payloads = migrator.webhook_payloads({
+        'message_id': 'chat-messages-956761916179623956-1446173830224679025',
+        'content': 'IDEA- AMZN 230C 12/5 @.87 @everyone\n' + 'x' * 2500,
+        'author': '  kouu\n',
+        'attachments': [{'name': 'chart.png', 'url': 'https://cdn.example/chart.png'}],
+        'embeds': [{'title': 'Chart', 'description': '', 'url': 'https://example.com'}],
+    })
+
+    assert len(payloads) == 2
+    assert all(p['username'] == 'kouu' for p in payloads)
+    assert all(p['allowed_mentions'] == {'parse': []} for p in payloads)
+    assert all(len(p['content']) <= MESSAGE_CHAR_LIMIT for p in payloads)
+    assert payloads[0]['content'].startswith('-# <t:1764865109:f>\nIDEA- AMZN')
+    assert payloads[-1]['content'].endswith('https://cdn.example/chart.png')
+    assert payloads[-1]['embeds'] == [{'title': 'Chart', 'url': 'https://example.com'}]
+
+
+@pytest.mark.parametrize('count', [200])
+def test_webhook_migration(benchmark, run, archive, fake_webhook, count):
+    """Every message arrives once, in archive order, under its author's name"""
+    path = archive(count)
+
+    def fresh_run():
+        fake_webhook.arrivals.clear()
+        for leftover in path.parent.glob(f'{path.stem}_*'):
+            leftover.unlink()
+        return (), {}
+
+    def migrate():
+        migrator = DiscordMigrator(str(path), webhook_url=fake_webhook.url)
+        run(migrator.run())
+        return migrator
+
+    migrator = benchmark.pedantic(migrate, setup=fresh_run, rounds=3)
+
+    delivered = fake_webhook.delivered()
+    assert len(delivered) == count
+    expected = [m.get('author') or 'Unknown' for m in json.loads(path.read_text(encoding='utf-8'))]
+    assert [d['payload']['username'] for d in delivered] == expected
+    record_per_item(benchmark, 'per_message_ms', count)
+
+
+def test_resume_posts_each_message_once(run, archive, fake_webhook):
+    """A run cut off after 40 posts, resumed: the channel gets every message exactly once, in order"""
+    path = archive(100, with_ids=False)
+
+    run(DiscordMigrator(str(path), webhook_url=fake_webhook.url).run(limit=40))
+    # Without --resume an existing checkpoint stops the run instead of posting duplicates
+    run(DiscordMigrator(str(path), webhook_url=fake_webhook.url).run())
+    assert len(fake_webhook.delivered()) == 40
+
+    migrator = DiscordMigrator(str(path), webhook_url=fake_webhook.url)
+    run(migrator.run(resume=True))
+
+    delivered = fake_webhook.delivered()
+    assert len(delivered) == 100
+    expected = [m.get('author') or 'Unknown' for m in json.loads(path.read_text(encoding='utf-8'))]
+    assert [d['payload']['username'] for d in delivered] == expected
+    id_map = list(migrator.id_map)
+    assert [entry['message_id'] for entry in id_map] == [f'#{i}' for i in range(100)]
+    assert all(len(entry['dest_ids']) == 1 for entry in id_map)
+    assert migrator.checkpoint['last_index'] == 99
+
+
+@pytest.mark.parametrize('chunk_size', [7, 4096])
+def test_iter_json_array_matches_json_load(chunk_size):
+    if not ARCHIVE.exists():
+        pytest.skip(f"{ARCHIVE.name} not present")
+    with open(ARCHIVE, 'r', encoding='utf-8') as f:
+        streamed = list(iter_json_array(f, chunk_size))
+
+    assert streamed == json.loads(ARCHIVE.read_text(encoding='utf-8'))
+
+
+def test_range_from_jsonl_archive(run, tmp_path, fake_webhook):
+    """--from-id/--to-id on a JSON Lines archive post just that slice, in order"""
+    if not ARCHIVE.exists():
+        pytest.skip(f"{ARCHIVE.name} not present")
+    messages = json.loads(ARCHIVE.read_text(encoding='utf-8'))
+    path = tmp_path / 'archive.jsonl'
+    path.write_text(''.join(json.dumps(m, ensure_ascii=False) + '\n' for m in messages), encoding='utf-8')
+    assert list(iter_archive(str(path))) == messages
+
+    snowflakes = sorted(message_snowflake(m['message_id']) for m in messages)
+    low, high = snowflakes[10], snowflakes[19]
+    wanted = [m for m in messages if low <= message_snowflake(m['message_id']) <= high]
+    low_id = next(m['message_id'] for m in messages if message_snowflake(m['message_id']) == low)
+    # Either id form is accepted: full element id or bare snowflake
+    migrator = DiscordMigrator(str(path), webhook_url=fake_webhook.url, from_id=low_id, to_id=str(high))
+    run(migrator.run())
+
+    assert [entry['message_id'] for entry in migrator.id_map] == [m['message_id'] for m in wanted]
+    assert len(fake_webhook.delivered()) == len(wanted)
+
+
+def test_unreadable_webhook_reply_is_a_failure(run, monkeypatch, archive, fake_webhook):
+    """A 200 with a body that is not a message fails that message only"""
+    path = archive(5)
+    migrator = DiscordMigrator(str(path), webhook_url=fake_webhook.url)
+    migrator.webhook_client = WebhookClient()
+    replies = iter([(200, {}, ''), (200, {}, 'null')])
+    real_send = migrator.webhook_client.send
+
+    async def send(url, payload, params=None):
+        reply = next(replies, None)
+        return reply if reply is not None else await real_send(url, payload, params)
+    monkeypatch.setattr(migrator.webhook_client, 'send', send)
+
+    run(migrator.run())
+
+    assert len(fake_webhook.delivered()) == 3
+    assert len(list(migrator.id_map)) == 3
+
+
+def test_resume_retries_failed_messages(run, monkeypatch, archive, fake_webhook):
+    """A message that failed is posted by the resumed run, and only that one"""
+    path = archive(10, with_ids=False)
+    migrator = DiscordMigrator(str(path), webhook_url=fake_webhook.url)
+    migrator.webhook_client = WebhookClient()
+    real_send = migrator.webhook_client.send
+    calls = []
+
+    async def send(url, payload, params=None):
+        calls.append(payload)
+        if len(calls) == 3:
+            return 500, {}, 'Internal Server Error'
+        return await real_send(url, payload, params)
+    monkeypatch.setattr(migrator.webhook_client, 'send', send)
+
+    run(migrator.run())
+    assert len(fake_webhook.delivered()) == 9
+
+    resumed = DiscordMigrator(str(path), webhook_url=fake_webhook.url)
+    run(resumed.run(resume=True))
+
+    assert len(fake_webhook.delivered()) == 10
+    assert fake_webhook.delivered()[-1]['payload'] == calls[2]
+    assert sorted(entry['message_id'] for entry in resumed.id_map) == sorted(f'#{i}' for i in range(10))
+    assert resumed.failed == {}
+
+
+def test_split_message_resumes_at_first_unposted_part(run, monkeypatch, tmp_path, fake_webhook):
+    """When part 2 of 3 fails, the retry posts parts 2 and 3 only"""
+    path = tmp_path / 'long.json'
+    content = '\n'.join(f'line {i} ' + 'x' * 900 for i in range(5))
+    path.write_text(json.dumps([{'content': content, 'author': 'kouu'}]), encoding='utf-8')
+    migrator = DiscordMigrator(str(path), webhook_url=fake_webhook.url)
+    parts = migrator.webhook_payloads({'content': content, 'author': 'kouu'})
+    assert len(parts) == 3
+    migrator.webhook_client = WebhookClient()
+    real_send = migrator.webhook_client.send
+    calls = []
+
+    async def send(url, payload, params=None):
+        calls.append(payload)
+        if len(calls) == 2:
+            return 500, {}, 'Internal Server Error'
+        return await real_send(url, payload, params)
+    monkeypatch.setattr(migrator.webhook_client, 'send', send)
+
+    run(migrator.run())
+    resumed = DiscordMigrator(str(path), webhook_url=fake_webhook.url)
+    run(resumed.run(resume=True))
+
+    assert [d['payload']['content'] for d in fake_webhook.delivered()] == [p['content'] for p in parts]
+    (entry,) = list(resumed.id_map)
+    assert len(entry['dest_ids']) == 3
+
+
+def test_resume_over_reexported_archive(run, tmp_path, fake_webhook):
+    """Older history exported in front of migrated rows is posted; migrated rows are not posted again"""
+    if not ARCHIVE.exists():
+        pytest.skip(f"{ARCHIVE.name} not present")
+    messages = json.loads(ARCHIVE.read_text(encoding='utf-8'))[:5]
+    older, kept = messages[:2], messages[2:]
+    path = tmp_path / 'archive.json'
+    path.write_text(json.dumps(kept, ensure_ascii=False), encoding='utf-8')
+    run(DiscordMigrator(str(path), webhook_url=fake_webhook.url).run(limit=2))
+
+    path.write_text(json.dumps(older + kept, ensure_ascii=False), encoding='utf-8')
+    migrator = DiscordMigrator(str(path), webhook_url=fake_webhook.url)
+    run(migrator.run(resume=True))
+
+    posted = [entry['message_id'] for entry in migrator.id_map]
+    assert sorted(posted) == sorted(m['message_id'] for m in messages)
+    assert len(fake_webhook.delivered()) == 5
+
+
+def test_start_over_replaces_the_id_map(run, archive, fake_webhook):
+    """Deleting the checkpoint starts over: the id map points at the new posts only"""
+    path = archive(3)
+    first = DiscordMigrator(str(path), webhook_url=fake_webhook.url)
+    run(first.run())
+    old_dest_ids = {entry['message_id']: entry['dest_ids'] for entry in first.id_map}
+
+    os.remove(first.checkpoint_file)
+    again = DiscordMigrator(str(path), webhook_url=fake_webhook.url)
+    run(again.run())
+
+    id_map = list(again.id_map)
+    assert len(id_map) == 3
+    assert all(entry['dest_ids'] != old_dest_ids[entry['message_id']] for entry in id_map)
+    assert len(fake_webhook.delivered()) == 6
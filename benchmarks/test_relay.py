@@ -0,0 +1,160 @@
+"""
+Webhook delivery against the local fake webhook, and end-to-end relay latency
+from a synthetic source page to webhook arrival.
+
+    pytest benchmarks/test_relay.py -s
+"""
+
+import asyncio
+import json
+import statistics
+import time
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('aiohttp')
+
+from snowflake import message_timestamp_ms
+from webhook_client import WebhookClient
+
+
+@pytest.fixture
+def client(run):
+    client = WebhookClient()
+    yield client
+    run(client.close())
+
+
+def test_webhook_post_latency(benchmark, run, client, fake_webhook):
+    status, _, _ = benchmark(lambda: run(client.post(fake_webhook.url, {'content': 'SPY 680P 12/5 @1.12'})))
+
+    assert status == 204
+    assert fake_webhook.delivered()[-1]['payload']['content'] == 'SPY 680P 12/5 @1.12'
+
+
+def test_wait_true_returns_message(run, client, fake_webhook):
+    status, _, body = run(client.post(fake_webhook.url, {'content': 'hello', 'username': 'Signal Monitor'}, params={'wait': 'true'}))
+
+    assert status == 200
+    message = json.loads(body)
+    assert message['content'] == 'hello'
+    assert message['author']['username'] == 'Signal Monitor'
+
+
+def test_rate_limit_headers_and_429(run, client, fake_webhook):
+    fake_webhook.rate_limit = (2, 30.0)
+    statuses = []
+    for i in range(3):
+        status, headers, _ = run(client.post(fake_webhook.url, {'content': f'msg {i}'}))
+        statuses.append(status)
+
+    assert statuses == [204, 204, 429]
+    assert headers['X-RateLimit-Remaining'] == '0'
+    assert float(headers['Retry-After']) > 0
+
+
+def test_send_queues_through_rate_limit(run, client, fake_webhook):
+    """A burst larger than the bucket is spread over the windows with no 429s and no lost posts"""
+    fake_webhook.rate_limit = (5, 0.5)
+
+    async def burst():
+        started = time.monotonic()
+        results = await asyncio.gather(*(client.send(fake_webhook.url, {'content': f'msg {i}'}) for i in range(20)))
+        return [status for status, _, _ in results], time.monotonic() - started
+
+    statuses, elapsed = run(burst())
+
+    assert statuses == [204] * 20
+    assert [r['status'] for r in fake_webhook.arrivals].count(429) == 0
+    assert [r['payload']['content'] for r in fake_webhook.delivered()] == [f'msg {i}' for i in range(20)]
+    # Four windows of five: three waits for a reset, none longer than needed
+    assert 1.4 <= elapsed < 2.5
+
+
+def test_send_waits_out_429(run, client, fake_webhook):
+    """A 429 from a bucket the client has not seen yet is retried after retry_after"""
+    fake_webhook.rate_limit = (1, 0.3)
+    run(client.post(fake_webhook.url, {'content': 'used the window'}))
+
+    status, _, _ = run(client.send(fake_webhook.url, {'content': 'queued'}))
+
+    assert status == 204
+    assert client.stats()['rate_limited'] == 1
+    assert fake_webhook.delivered()[-1]['payload']['content'] == 'queued'
+
+
+def test_cancelled_send_releases_its_slot(run, client, fake_webhook):
+    """A post cancelled mid-request (e.g. a stopping stage) does not block the route"""
+    fake_webhook.latency = 0.5
+
+    async def cancel_then_send():
+        task = asyncio.ensure_future(client.send(fake_webhook.url, {'content': 'cancelled'}))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        fake_webhook.latency = 0
+        return await asyncio.wait_for(client.send(fake_webhook.url, {'content': 'next'}), 2)
+
+    status, _, _ = run(cancel_then_send())
+
+    assert status == 204
+    assert client.bucket(fake_webhook.url).in_flight == 0
+
+
+def test_rejected_post_is_not_retried(run, monkeypatch, monitor, fake_webhook):
+    """A 4xx is given up on at once and leaves the outbox, a 5xx is retried"""
+    monkeypatch.setenv('6th_DISCORD_WEBHOOK_URL', fake_webhook.url)
+    monitor.delivery_retry_base = 0.01
+    replies = iter([(400, {}, 'Bad Request'), (500, {}, 'Server Error'), (204, {}, '')])
+
+    async def send(url, payload, params=None):
+        return next(replies)
+    monitor.webhook_client = WebhookClient()
+    monkeypatch.setattr(monitor.webhook_client, 'send', send)
+    monitor.outbox.enqueue([{'message_id': 'chat-messages-1-1', 'content': 'a'},
+                            {'message_id': 'chat-messages-1-2', 'content': 'b'}])
+
+    assert not run(monitor.deliver_message({'content': 'a'}, 'chat-messages-1-1'))
+    assert run(monitor.deliver_message({'content': 'b'}, 'chat-messages-1-2'))
+    assert monitor.outbox.counts() == {'rejected': 1, 'delivered': 1}
+    assert monitor.outbox.pending() == []
+
+
+@pytest.mark.parametrize('rate', [5, 20])
+def test_end_to_end_relay(benchmark, run, monkeypatch, monitor, open_synthetic, fake_webhook, rate):
+    """Source row rendered (snowflake time) -> webhook arrival, through the full monitor_loop"""
+    monitor.page = open_synthetic(1000)
+    monkeypatch.setenv('6th_DISCORD_WEBHOOK_URL', fake_webhook.url)
+    monitor.webhook_client = WebhookClient()
+    duration = 3.0
+
+    async def relay():
+        loop_task = asyncio.ensure_future(monitor.monitor_loop())
+        # Let the first poll skip the backlog before new rows start arriving
+        await asyncio.sleep(1.5)
+        await monitor.page.evaluate('(rate) => window.__chatSim.start(rate)', rate)
+        await asyncio.sleep(duration)
+        await monitor.page.evaluate('() => window.__chatSim.stop()')
+        appended = await monitor.page.evaluate('() => window.__chatSim.appended')
+        # Give the deliverer time to drain, then stop the loop
+        for _ in range(50):
+            if len(fake_webhook.delivered()) >= len(appended):
+                break
+            await asyncio.sleep(0.1)
+        loop_task.cancel()
+        await asyncio.gather(loop_task, return_exceptions=True)
+        # run() closes the client after monitor_loop returns; this test calls the loop directly
+        await monitor.webhook_client.close()
+        return appended
+
+    appended = benchmark.pedantic(lambda: run(relay()), rounds=1, iterations=1)
+
+    delivered = fake_webhook.delivered()
+    assert len(delivered) == len(appended)
+    lags_ms = sorted(a['arrived_at'] * 1000 - message_timestamp_ms(mid) for mid, a in zip(appended, delivered))
+    benchmark.extra_info['messages'] = len(appended)
+    benchmark.extra_info['lag_p50_ms'] = round(statistics.median(lags_ms), 1)
+    benchmark.extra_info['lag_max_ms'] = round(lags_ms[-1], 1)
+    print(f"{rate}/s: {len(appended)} relayed, lag p50 {statistics.median(lags_ms):.0f} ms, max {lags_ms[-1]:.0f} ms")
@@ -0,0 +1,108 @@
+"""
+How polling, dedupe and push detection scale with the rendered list size and
+the message rate, using pages from chat_page.generate_chat_page.
+
+    pytest benchmarks/test_scaling.py --benchmark-group-by=func
+"""
+
+import json
+import time
+import tracemalloc
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from chat_page import CHANNEL_ID
+from snowflake import DedupeWindow
+
+SIZES = [100, 1000, 10000]
+RATES = [10, 100]
+
+
+def js_heap_bytes(run, page):
+    return run(page.evaluate('() => performance.memory ? performance.memory.usedJSHeapSize : null'))
+
+
+@pytest.mark.parametrize('count', SIZES)
+def test_first_poll(benchmark, run, monitor, open_synthetic, count):
+    """A poll that finds every rendered message new (startup, or after a long gap)"""
+    monitor.page = open_synthetic(count)
+
+    def forget_seen():
+        monitor.processed_messages = DedupeWindow(monitor.dedupe_window_size)
+        monitor.last_message_id = None
+
+    results = benchmark.pedantic(lambda: run(monitor.get_new_messages()), setup=forget_seen,
+                                 rounds=5, warmup_rounds=1)
+
+    assert len(results) == count
+    benchmark.extra_info['js_heap_bytes'] = js_heap_bytes(run, monitor.page)
+
+
+@pytest.mark.parametrize('count', SIZES)
+def test_steady_state_poll(benchmark, run, monitor, open_synthetic, count):
+    """A poll over a list that is already fully seen: pure per-poll overhead"""
+    monitor.page = open_synthetic(count)
+    run(monitor.get_new_messages())
+
+    results = benchmark(lambda: run(monitor.get_new_messages()))
+
+    # Rows older than the dedupe window fall below its floor, so nothing is new
+    assert results == []
+    benchmark.extra_info['js_heap_bytes'] = js_heap_bytes(run, monitor.page)
+
+
+@pytest.mark.parametrize('count', SIZES + [100000])
+def test_dedupe_window(benchmark, count):
+    """Recording ``count`` ids and re-checking them; state size stays bounded"""
+    ids = [f'chat-messages-{CHANNEL_ID}-{1446164853789032652 + (i << 22)}' for i in range(count)]
+
+    def record_and_check():
+        window = DedupeWindow()
+        for mid in ids:
+            window.add(mid)
+        assert all(mid in window for mid in ids)
+        return window
+
+    window = benchmark(record_and_check)
+
+    tracemalloc.start()
+    record_and_check()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    benchmark.extra_info['state_bytes'] = len(json.dumps(window.to_dict()))
+    benchmark.extra_info['peak_alloc_bytes'] = peak
+    assert len(window) <= window.window_size
+
+
+@pytest.mark.parametrize('rate', RATES)
+@pytest.mark.parametrize('count', [1000, 10000])
+def test_push_detection_keeps_up(run, monitor, open_synthetic, count, rate):
+    """Every row appended at ``rate`` msg/s reaches the observer callback"""
+    monitor.page = open_synthetic(count)
+    assert run(monitor.enable_push_detection())
+
+    duration = 3.0
+    received = []
+
+    async def collect():
+        page = monitor.page
+        await page.evaluate('(rate) => window.__chatSim.start(rate)', rate)
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            batch = await monitor.wait_for_pushed_messages(deadline - time.monotonic())
+            if batch:
+                received.extend(m['message_id'] for m in batch)
+        await page.evaluate('() => window.__chatSim.stop()')
+        # Let the last observer callback land
+        batch = await monitor.wait_for_pushed_messages(1.0)
+        if batch:
+            received.extend(m['message_id'] for m in batch)
+        return await page.evaluate('() => window.__chatSim.appended')
+
+    appended = run(collect())
+
+    assert appended, "simulator did not append anything"
+    assert received == appended
+    print(f"{count} rendered, {rate}/s: {len(received)} pushed in {duration:.0f}s")
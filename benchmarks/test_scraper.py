@@ -0,0 +1,72 @@
+"""
+DiscordScraper's scroll harvest against a virtualised synthetic channel.
+
+The page mounts only a window of rows and swaps in older ones as the list is
+scrolled to the top, like Discord, so anything not read while it is rendered
+is lost.
+
+    pytest benchmarks/test_scraper.py -s
+"""
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('pandas')
+
+import discord_scraper
+from message_log import MessageLog
+from snowflake import message_snowflake
+
+
+@pytest.fixture
+def scraper(monkeypatch, tmp_path):
+    monkeypatch.setenv('DISCORD_EMAIL', 'bench@example.com')
+    monkeypatch.setenv('DISCORD_PASSWORD', 'bench')
+    monkeypatch.chdir(tmp_path)
+    # A scroll that mounts nothing older only has to wait this long before counting as the top
+    monkeypatch.setattr(discord_scraper, 'SCROLL_WAIT_MS', 1000)
+    return discord_scraper.DiscordScraper()
+
+
+@pytest.mark.parametrize('count', [600])
+def test_scroll_harvest_gets_full_history(benchmark, run, scraper, open_synthetic, count):
+    """Every message once, oldest first after export, in a single pass"""
+    def harvest():
+        scraper.messages_data.clear()
+        scraper.page = open_synthetic(count, virtual_window=60)
+        run(scraper.scrape_messages())
+
+    benchmark.pedantic(harvest, rounds=1)
+
+    ids = [m['message_id'] for m in scraper.messages_data]
+    assert len(ids) == len(set(ids)) == count
+    assert run(scraper.page.evaluate('window.__virtualList.remaining()')) == 0
+    assert len(list(MessageLog(scraper.harvest_log.path))) == count
+
+    run(scraper.export_data())
+    snowflakes = [message_snowflake(m['message_id']) for m in scraper.messages_data]
+    assert snowflakes == sorted(snowflakes)
+    benchmark.extra_info['loads'] = run(scraper.page.evaluate('window.__virtualList.loads'))
+
+
+def test_row_missing_from_a_read_is_harvested_later(run, monkeypatch, scraper, open_synthetic):
+    """A row that is asked for but not returned (unmounted mid-read) is not marked as seen"""
+    real_extract = discord_scraper.dom_extract.extract_messages
+    dropped = []
+
+    async def extract_messages(page, ids=None, **kwargs):
+        records = await real_extract(page, ids=ids, **kwargs)
+        if not dropped:
+            # The oldest row of the first window stays mounted after the next scroll
+            oldest = min(records, key=lambda r: message_snowflake(r['message_id']))
+            dropped.append(oldest['message_id'])
+            records = [r for r in records if r is not oldest]
+        return records
+    monkeypatch.setattr(discord_scraper.dom_extract, 'extract_messages', extract_messages)
+
+    scraper.page = open_synthetic(200, virtual_window=60)
+    run(scraper.scrape_messages())
+
+    ids = [m['message_id'] for m in scraper.messages_data]
+    assert dropped[0] in ids
+    assert len(ids) == len(set(ids)) == 200
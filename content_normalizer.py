@@ -0,0 +1,86 @@
+"""
+One-scan cleanup of scraped Discord message text.
+
+Replaces the chain of ``re.sub`` calls that used to live in
+6thsense.py's ``clean_message_content``. The patterns are compiled once. The
+removals (emoji shortcodes, ``[HH:MM] ... Add Reaction`` hover artifacts,
+long-form dates) and the ``@premium`` -> ``@VIP`` rewrite run as one
+alternation scan, and whitespace is collapsed afterwards. Removing a token can
+join its neighbours into a new one, so the scan repeats until nothing matches
+(one extra scan, only for text that had artifacts). The result is stable under
+re-cleaning. On archived messages it matches the old chain, but where tokens
+touch it can differ, because the old passes depended on their order. Records
+that went through ``normalize_message`` carry ``content_normalized: True``, so
+later stages can skip cleaning them again.
+
+    python content_normalizer.py 6thsense_messages.json   # print cleaned contents
+"""
+
+import json
+import re
+import sys
+from typing import Any, Dict
+
+NORMALIZED_KEY = 'content_normalized'
+
+_WEEKDAY = r'(?:Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)'
+_MONTH = r'(?:January|February|March|April|May|June|July|August|September|October|November|December)'
+
+# Alternatives are tried left to right at each position, in the order the old passes ran.
+# The lookahead rejects positions that cannot start any alternative before the branch is entered.
+TOKEN_PATTERN = re.compile(
+    r'(?=[@:\[\d\samtwfs])(?:'
+    r'(?P<premium>@premium)'
+    r'|(?P<emoji>:[a-zA-Z0-9_+-]+:)'
+    # "[09:55] Monday 8 December 2025 at 09:5573Add Reaction" (hover timestamp + reaction button)
+    r'|(?P<hover>\[\d{1,2}:\d{2}\].*?' + _WEEKDAY + r'.*?Add\s*Reaction)'
+    # "73Add Reaction": reaction count glued to the button label
+    r'|(?P<reaction_count>\d+Add\s*Reaction)'
+    r'|(?P<reaction>\s*Add\s*Reaction\s*)'
+    # "Monday 8 December 2025 at 09:55"
+    r'|(?P<date>' + _WEEKDAY + r'\s+\d{1,2}\s+' + _MONTH + r'\s+\d{4}\s+at\s+\d{1,2}:\d{2}))',
+    re.IGNORECASE | re.DOTALL)
+
+# Runs of spaces/tabs -> one space (single spaces never match, so most text is untouched)
+SPACES_PATTERN = re.compile(r'[ \t][ \t]+|\t')
+# Three or more line breaks (blank lines may hold spaces) -> one blank line
+BLANK_LINES_PATTERN = re.compile(r'\n[ \t]*\n[ \t]*\n+')
+
+
+def _replace_token(match: re.Match) -> str:
+    return '@VIP' if match.lastgroup == 'premium' else ''
+
+
+def normalize_content(content: str) -> str:
+    """Remove DOM artifacts and emoji shortcodes, replace @premium, tidy whitespace"""
+    if not content:
+        return content
+    replaced = True
+    while replaced:
+        content, replaced = TOKEN_PATTERN.subn(_replace_token, content)
+    content = SPACES_PATTERN.sub(' ', content)
+    content = BLANK_LINES_PATTERN.sub('\n\n', content)
+    return content.strip()
+
+
+def normalize_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalise ``message['content']`` in place, once; returns the message"""
+    if not message.get(NORMALIZED_KEY):
+        message['content'] = normalize_content(message.get('content') or '')
+        message[NORMALIZED_KEY] = True
+    return message
+
+
+def main():
+    """Main function"""
+    if len(sys.argv) < 2:
+        print("Usage: python content_normalizer.py <messages.json>")
+        sys.exit(1)
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        messages = json.load(f)
+    for message in messages:
+        print(json.dumps(normalize_content(message.get('content') or ''), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,28 @@
+import argparse
 import json
 import asyncio
 import os
+import time
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from itertools import islice
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from playwright.async_api import async_playwright, Page, Browser
 from dotenv import load_dotenv
+import slate_input
+from message_log import MessageLog, iter_archive
+from snowflake import message_snowflake, message_timestamp_ms
+from webhook_client import WebhookClient
 
 load_dotenv()
 
+# Discord limits for webhook messages
+MESSAGE_CHAR_LIMIT = 2000
+USERNAME_CHAR_LIMIT = 80
+EMBEDS_PER_MESSAGE = 10
+
 class DiscordMigrator:
-    def __init__(self, json_file_path: str):
+    def __init__(self, json_file_path: str, webhook_url: Optional[str] = None,
+                 from_id: Optional[str] = None, to_id: Optional[str] = None):
         self.json_file_path = json_file_path
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
@@ -17,20 +30,182 @@ class DiscordMigrator:
         self.password = os.getenv('DISCORD_PASSWORD')
         self.new_server_name = os.getenv('NEW_SERVER_NAME', '')
         self.target_channel = os.getenv('TARGET_CHANNEL', 'announcement')
-        self.messages_data: List[Dict[str, Any]] = []
+        # Optional inclusive snowflake range of messages to migrate
+        self.from_snowflake = self.parse_snowflake(from_id)
+        self.to_snowflake = self.parse_snowflake(to_id)
+        # Webhook mode posts straight to the destination channel, no browser or login
+        self.webhook_url = webhook_url
+        self.webhook_client: Optional[WebhookClient] = None
+        # Restart support: last posted source id, and source -> destination ids (JSONL)
+        base = os.path.splitext(json_file_path)[0]
+        self.checkpoint_file = f"{base}_checkpoint.json"
+        self.id_map = MessageLog(f"{base}_id_map.jsonl")
+        # Failed messages, append-only; a later success appends a 'resolved' record
+        self.failure_log = MessageLog(f"{base}_failed.jsonl")
+        self.failed: Dict[str, List[str]] = {}
+        self.checkpoint: Dict[str, Any] = {}
+        self.resume = False
         
-        if not self.email or not self.password:
+        if not self.webhook_url and (not self.email or not self.password):
             raise ValueError("Please set DISCORD_EMAIL and DISCORD_PASSWORD in your .env file")
 
-    async def load_messages_data(self):
-        """Load messages from JSON file"""
+    @staticmethod
+    def parse_snowflake(value: Optional[str]) -> Optional[int]:
+        """Snowflake from a bare id or a chat-messages-<channel>-<snowflake> element id"""
+        if not value:
+            return None
+        if value.isdigit():
+            return int(value)
+        snowflake = message_snowflake(value)
+        if snowflake is None:
+            raise ValueError(f"Not a message id: {value}")
+        return snowflake
+
+    def in_range(self, message_data: Dict[str, Any]) -> bool:
+        if self.from_snowflake is None and self.to_snowflake is None:
+            return True
+        snowflake = message_snowflake(message_data.get('message_id'))
+        if snowflake is None:
+            return False
+        if self.from_snowflake is not None and snowflake < self.from_snowflake:
+            return False
+        return self.to_snowflake is None or snowflake <= self.to_snowflake
+
+    def iter_messages_data(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """(archive index, message) streamed from the JSON array or JSONL archive, range-filtered"""
+        for i, message_data in enumerate(iter_archive(self.json_file_path)):
+            if self.in_range(message_data):
+                yield i, message_data
+
+    @staticmethod
+    def source_id(index: int, message_data: Dict[str, Any]) -> str:
+        """Stable key of an archived message (scraper exports have no message_id: use the position)"""
+        return message_data.get('message_id') or f"#{index}"
+
+    def load_checkpoint(self) -> bool:
+        """Read the checkpoint of an earlier run; False if there is none"""
+        if not os.path.exists(self.checkpoint_file):
+            return False
         try:
-            with open(self.json_file_path, 'r', encoding='utf-8') as f:
-                self.messages_data = json.load(f)
-            print(f"Loaded {len(self.messages_data)} messages from {self.json_file_path}")
-        except Exception as e:
-            print(f"Error loading messages data: {e}")
-            raise
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                self.checkpoint = json.load(f)
+            return True
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable checkpoint {self.checkpoint_file}: {e}")
+            return False
+
+    def save_checkpoint(self):
+        """Write the checkpoint atomically (a crash leaves the previous one intact)"""
+        self.checkpoint['updated_at'] = datetime.now().isoformat()
+        tmp_path = f"{self.checkpoint_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoint, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_file)
+
+    def append_failure_record(self, record: Dict[str, Any]):
+        # Not MessageLog.append: the same id can fail, then be resolved
+        self.failure_log.repair_tail()
+        with open(self.failure_log.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load_failures(self):
+        """Messages that failed in earlier runs and have not been posted since"""
+        self.failed = {}
+        for record in self.failure_log:
+            source_id = record.get('message_id')
+            if record.get('resolved'):
+                self.failed.pop(source_id, None)
+            elif source_id:
+                self.failed[source_id] = record.get('dest_ids') or []
+        # Checkpoints from before the failure log kept the ids inline
+        for source_id in self.checkpoint.pop('failed_ids', []):
+            self.failed.setdefault(source_id, [])
+
+    def record_migrated(self, index: int, message_data: Dict[str, Any], dest_ids: List[str]):
+        """Map the source message to its posts, then move the checkpoint past it"""
+        source_id = self.source_id(index, message_data)
+        self.id_map.append([{'message_id': source_id, 'dest_ids': dest_ids, 'migrated_at': datetime.now().isoformat()}])
+        if source_id in self.failed:
+            del self.failed[source_id]
+            self.append_failure_record({'message_id': source_id, 'resolved': True})
+        self.checkpoint['last_source_id'] = source_id
+        self.checkpoint['last_index'] = index
+        self.checkpoint['migrated'] = self.checkpoint.get('migrated', 0) + 1
+        self.save_checkpoint()
+
+    def record_failed(self, index: int, message_data: Dict[str, Any], dest_ids: Optional[List[str]] = None):
+        """Log a failure; ``dest_ids`` are the parts of a split message that did get posted"""
+        source_id = self.source_id(index, message_data)
+        self.failed[source_id] = dest_ids or []
+        self.append_failure_record({'message_id': source_id, 'index': index, 'dest_ids': dest_ids or [],
+                                    'failed_at': datetime.now().isoformat()})
+
+    def prepare_checkpoint(self) -> bool:
+        """Load or start the checkpoint; False if an earlier run exists and --resume was not given"""
+        if self.load_checkpoint():
+            if not self.resume:
+                print(f"Found a checkpoint from an earlier run ({self.checkpoint.get('migrated', 0)} messages migrated, "
+                      f"last {self.checkpoint.get('last_source_id')}).")
+                print(f"Pass --resume to continue it, or delete {self.checkpoint_file} to start over.")
+                return False
+            print(f"Resuming after {self.checkpoint.get('last_source_id')} "
+                  f"({self.checkpoint.get('migrated', 0)} messages already migrated)")
+            self.load_failures()
+            if self.failed:
+                print(f"Retrying {len(self.failed)} messages that failed earlier (posted where they are reached)")
+        else:
+            self.checkpoint = {'archive': self.json_file_path, 'started_at': datetime.now().isoformat(), 'migrated': 0}
+            # Id map and failures of a run that was started over; the new posts replace them
+            for log in (self.id_map, self.failure_log):
+                if os.path.exists(log.path):
+                    os.remove(log.path)
+            self.id_map = MessageLog(self.id_map.path)
+            self.save_checkpoint()
+        return True
+
+    def checkpoint_in_place(self, last_index: int, last_id: str) -> bool:
+        """True if the archive still has the checkpoint message at the checkpoint index"""
+        for i, message_data in enumerate(iter_archive(self.json_file_path)):
+            if i == last_index:
+                return self.source_id(i, message_data) == last_id
+        return False
+
+    def pending_messages(self, limit: int = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """(index, message) still to post: earlier failures and everything after the checkpoint
+
+        Resuming skips by archive index up to the checkpoint, without holding
+        any ids in memory. If the message at the checkpoint index is not the
+        checkpoint id (the archive was re-exported or reordered), every message
+        is checked against the id map instead.
+        """
+        last_id = self.checkpoint.get('last_source_id') if self.resume else None
+        last_index = self.checkpoint.get('last_index', -1) if last_id is not None else -1
+        retry = set(self.failed) if self.resume else set()
+        migrated: Optional[set] = None
+        if last_index >= 0 and not self.checkpoint_in_place(last_index, last_id):
+            print(f"Checkpoint id {last_id} is not at position {last_index} any more; checking the id map instead")
+            migrated = self.id_map.load_ids()
+            last_index = -1
+
+        def pending():
+            for i, message_data in self.iter_messages_data():
+                source_id = self.source_id(i, message_data)
+                if i < last_index:
+                    # Earlier failures are retried, necessarily after their neighbours
+                    if source_id in retry:
+                        yield i, message_data
+                    continue
+                if i == last_index:
+                    continue
+                if migrated is not None and source_id in migrated:
+                    continue
+                yield i, message_data
+
+        return islice(pending(), limit) if limit else pending()
 
     async def start_browser(self):
         """Initialize Playwright browser"""
@@ -149,13 +324,9 @@ class DiscordMigrator:
                     url = embed.get('url', 'No URL')
                     formatted_message += f"\n- **{title}**: {description}\n  URL: {url}"
             
-            # Type the message
-            await message_input.click()
-            await self.random_delay(0.5, 1)
-            
-            # Clear any existing content and type new message
-            await message_input.evaluate('element => element.innerHTML = ""')
-            await message_input.type(formatted_message)
+            # Clear any existing draft, then insert the message in one paste
+            await slate_input.clear_input(self.page, message_input)
+            await slate_input.insert_text(self.page, message_input, formatted_message)
             
             await self.random_delay(1, 2)
             
@@ -173,29 +344,25 @@ class DiscordMigrator:
 
     async def migrate_messages(self, limit: int = None):
         """Migrate messages to the new server"""
-        if not self.messages_data:
-            print("No messages to migrate")
-            return
-        
-        messages_to_migrate = self.messages_data[:limit] if limit else self.messages_data
-        
-        print(f"Starting migration of {len(messages_to_migrate)} messages...")
+        print(f"Starting migration from {self.json_file_path}...")
         
         successful_posts = 0
         failed_posts = 0
         
-        for i, message_data in enumerate(messages_to_migrate):
+        for n, (i, message_data) in enumerate(self.pending_messages(limit), start=1):
             try:
-                print(f"Migrating message {i+1}/{len(messages_to_migrate)}")
+                print(f"Migrating message {i+1}")
                 
                 if await self.post_message(message_data):
                     successful_posts += 1
+                    self.record_migrated(i, message_data, [])
                 else:
                     failed_posts += 1
+                    self.record_failed(i, message_data)
                 
                 # Add longer delay every 10 messages to avoid rate limiting
-                if (i + 1) % 10 == 0:
-                    print(f"Pausing for 30 seconds after {i+1} messages...")
+                if n % 10 == 0:
+                    print(f"Pausing for 30 seconds after {n} messages...")
                     await self.random_delay(30, 35)
                 
             except Exception as e:
@@ -207,6 +374,116 @@ class DiscordMigrator:
         print(f"Successfully posted: {successful_posts}")
         print(f"Failed posts: {failed_posts}")
 
+    def webhook_payloads(self, message_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Webhook payloads for one archived message, posted under its author's name and time"""
+        author = ' '.join((message_data.get('author') or '').split())[:USERNAME_CHAR_LIMIT] or 'Unknown'
+
+        # Exact creation time from the snowflake, rendered in each reader's timezone
+        created_ms = message_timestamp_ms(message_data.get('message_id'))
+        if created_ms is not None:
+            stamp = f"<t:{created_ms // 1000}:f>"
+        else:
+            lines = [line.strip() for line in (message_data.get('timestamp') or '').splitlines() if line.strip()]
+            stamp = lines[-1] if lines else ''
+
+        parts = [f"-# {stamp}"] if stamp else []
+        content = (message_data.get('content') or '').strip()
+        if content:
+            parts.append(content)
+        for attachment in message_data.get('attachments', []):
+            if attachment.get('url'):
+                parts.append(attachment['url'])
+        text = '\n'.join(parts)
+
+        embeds = []
+        for embed in message_data.get('embeds', [])[:EMBEDS_PER_MESSAGE]:
+            fields = {key: embed[key] for key in ('title', 'description', 'url') if embed.get(key)}
+            if fields.get('title') or fields.get('description'):
+                embeds.append(fields)
+
+        # Split long messages at line breaks; embeds go with the last part
+        chunks = []
+        while len(text) > MESSAGE_CHAR_LIMIT:
+            cut = text.rfind('\n', 0, MESSAGE_CHAR_LIMIT)
+            cut = cut if cut > MESSAGE_CHAR_LIMIT // 2 else MESSAGE_CHAR_LIMIT
+            chunks.append(text[:cut])
+            text = text[cut:].lstrip('\n')
+        chunks.append(text)
+
+        payloads = [{
+            'content': chunk,
+            'username': author,
+            # Archived @everyone/@role mentions must not ping anyone again
+            'allowed_mentions': {'parse': []},
+        } for chunk in chunks]
+        if embeds:
+            payloads[-1]['embeds'] = embeds
+        return [p for p in payloads if p['content'].strip() or p.get('embeds')]
+
+    async def post_webhook_message(self, message_data: Dict[str, Any],
+                                   posted: Optional[List[str]] = None) -> Tuple[List[str], bool]:
+        """Post one message through the webhook; returns (destination ids, complete)
+
+        ``posted`` are the ids of parts already posted by an earlier attempt;
+        those parts are not sent again.
+        """
+        if self.webhook_client is None:
+            self.webhook_client = WebhookClient()
+        dest_ids = list(posted or [])
+        for payload in self.webhook_payloads(message_data)[len(dest_ids):]:
+            try:
+                # wait=true makes Discord answer with the created message
+                status, _, body = await self.webhook_client.send(self.webhook_url, payload, params={'wait': 'true'})
+            except Exception as e:
+                print(f"Error posting message: {e}")
+                return dest_ids, False
+            if status != 200:
+                print(f"Webhook returned {status}: {body[:200]}")
+                return dest_ids, False
+            try:
+                dest_ids.append(json.loads(body).get('id', ''))
+            except (ValueError, AttributeError):
+                # The part was accepted, but its id is unknown
+                print(f"Webhook returned an unreadable message: {body[:200]!r}")
+                dest_ids.append('')
+                return dest_ids, False
+        return dest_ids, True
+
+    async def migrate_messages_webhook(self, limit: int = None):
+        """Migrate messages through the destination webhook, as fast as its rate limit allows"""
+        print(f"Starting webhook migration from {self.json_file_path}...")
+
+        successful_posts = 0
+        failed_posts = 0
+        started = time.monotonic()
+
+        for n, (i, message_data) in enumerate(self.pending_messages(limit), start=1):
+            # Posts go out in archive order; the client waits only when the route's bucket is empty
+            posted = self.failed.get(self.source_id(i, message_data))
+            try:
+                dest_ids, complete = await self.post_webhook_message(message_data, posted)
+            except Exception as e:
+                print(f"Error migrating message {i+1}: {e}")
+                dest_ids, complete = posted, False
+            if complete:
+                successful_posts += 1
+                self.record_migrated(i, message_data, dest_ids)
+            else:
+                failed_posts += 1
+                self.record_failed(i, message_data, dest_ids)
+                print(f"Failed to migrate message {i+1}")
+            if n % 100 == 0:
+                rate = n / max(time.monotonic() - started, 1e-9)
+                print(f"Migrated {n} messages, up to #{i+1} ({rate:.1f} msg/s)")
+
+        elapsed = time.monotonic() - started
+        if not successful_posts and not failed_posts:
+            print("No messages to migrate")
+        print(f"Migration completed in {elapsed:.0f}s!")
+        print(f"Successfully posted: {successful_posts}")
+        print(f"Failed posts: {failed_posts}")
+        print(f"Rate limits: {self.webhook_client.stats() if self.webhook_client else {}}")
+
     async def random_delay(self, min_seconds: float = 1, max_seconds: float = 3):
         """Add random delay to mimic human behavior"""
         import random
@@ -214,16 +491,25 @@ class DiscordMigrator:
         await asyncio.sleep(delay)
 
     async def close_browser(self):
-        """Close the browser"""
+        """Close the browser and the webhook session"""
         if self.browser:
             await self.browser.close()
+        if self.webhook_client:
+            await self.webhook_client.close()
 
-    async def run(self, limit: int = None):
+    async def run(self, limit: int = None, resume: bool = False):
         """Main execution method"""
         try:
             print("Starting Discord migration...")
             
-            await self.load_messages_data()
+            self.resume = resume
+            if not self.prepare_checkpoint():
+                return
+
+            if self.webhook_url:
+                await self.migrate_messages_webhook(limit)
+                return
+
             await self.start_browser()
             
             if not await self.login_to_discord():
@@ -249,22 +535,37 @@ class DiscordMigrator:
 
 async def main():
     """Main function"""
-    import sys
+    parser = argparse.ArgumentParser(
+        description='Migrate an archived channel to a new server',
+        epilog='Example: python discord_migrator.py discord_messages_20231201_120000.json 50 --webhook')
+    parser.add_argument('json_file_path', help='JSON array or JSON Lines archive (discord_scraper.py export, monitor log)')
+    parser.add_argument('limit', nargs='?', type=int, default=None, help='migrate at most this many messages')
+    parser.add_argument('--webhook', nargs='?', const='', default=None, metavar='URL',
+                        help='post through a destination webhook instead of the browser '
+                             '(URL defaults to MIGRATION_WEBHOOK_URL)')
+    parser.add_argument('--from-id', default=None, help='first message to migrate (snowflake or chat-messages-... id)')
+    parser.add_argument('--to-id', default=None, help='last message to migrate (inclusive)')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue after the last message posted by an earlier run (see the _checkpoint.json file)')
+    args = parser.parse_args()
     
-    if len(sys.argv) < 2:
-        print("Usage: python discord_migrator.py <json_file_path> [limit]")
-        print("Example: python discord_migrator.py discord_messages_20231201_120000.json 50")
+    if not os.path.exists(args.json_file_path):
+        print(f"File not found: {args.json_file_path}")
         return
+
+    webhook_url = None
+    if args.webhook is not None:
+        webhook_url = args.webhook or os.getenv('MIGRATION_WEBHOOK_URL')
+        if not webhook_url:
+            print("No webhook URL: pass --webhook URL or set MIGRATION_WEBHOOK_URL in your .env file")
+            return
     
-    json_file_path = sys.argv[1]
-    limit = int(sys.argv[2]) if len(sys.argv) > 2 else None
-    
-    if not os.path.exists(json_file_path):
-        print(f"File not found: {json_file_path}")
+    try:
+        migrator = DiscordMigrator(args.json_file_path, webhook_url, args.from_id, args.to_id)
+    except ValueError as e:
+        print(e)
         return
-    
-    migrator = DiscordMigrator(json_file_path)
-    await migrator.run(limit)
+    await migrator.run(args.limit, args.resume)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -5,15 +5,52 @@ import os
 import time
 import random
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from playwright.async_api import async_playwright, Page, Browser
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
 from dotenv import load_dotenv
 import pandas as pd
 
+import dom_extract
+from message_log import MessageLog
+from snowflake import message_snowflake
+
 # Load environment variables
 load_dotenv()
 
+# Scroll-harvest tuning: how long a scroll may take to mount older rows, and how
+# many scrolls in a row without an older message mean the top of the channel
+SCROLL_WAIT_MS = int(os.getenv('SCROLL_WAIT_MS', '5000'))
+STABLE_SCROLLS = int(os.getenv('STABLE_SCROLLS', '2'))
+
+# Scrolls the chat list's scroller to the top; returns the id of the oldest rendered row
+SCROLL_TO_OLDEST_JS = """
+(selectors) => {
+    for (const sel of selectors) {
+        const row = document.querySelector(sel);
+        if (!row) continue;
+        let scroller = row.parentElement;
+        while (scroller && scroller.scrollHeight <= scroller.clientHeight) scroller = scroller.parentElement;
+        if (scroller) scroller.scrollTop = 0;
+        else row.scrollIntoView({ block: 'start' });
+        return row.id;
+    }
+    return null;
+}
+"""
+
+# True once the oldest rendered row is a different one (older rows were mounted)
+OLDEST_ROW_CHANGED_JS = """
+([selectors, oldestId]) => {
+    for (const sel of selectors) {
+        const row = document.querySelector(sel);
+        if (row) return row.id !== oldestId;
+    }
+    return false;
+}
+"""
+
 class DiscordScraper:
     def __init__(self):
         self.browser: Optional[Browser] = None
@@ -23,6 +60,9 @@ class DiscordScraper:
         self.server_name = os.getenv('OLD_SERVER_NAME', 'cooks')
         self.target_channel = os.getenv('TARGET_CHANNEL', 'announcement')
         self.messages_data: List[Dict[str, Any]] = []
+        # Harvested messages are appended here as they are found, so a crash keeps them
+        self.run_stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.harvest_log = MessageLog(f"discord_messages_{self.run_stamp}.jsonl")
         
         if not self.email or not self.password:
             raise ValueError("Please set DISCORD_EMAIL and DISCORD_PASSWORD in your .env file")
@@ -138,159 +178,70 @@ class DiscordScraper:
                 print(f"  - {name}")
             return False
 
-    async def scroll_to_load_messages(self, scroll_count: int = 10):
-        """Scroll up to load more messages"""
-        print(f"Scrolling to load messages (scrolls: {scroll_count})")
-        
-        # Find the message container
-        message_container = await self.page.query_selector('[data-list-id="chat-messages"]')
-        if not message_container:
-            print("Could not find message container")
-            return
-        
-        for i in range(scroll_count):
-            # Scroll up to load older messages
-            await message_container.evaluate('element => element.scrollTop = 0')
-            await self.random_delay(2, 4)
-            
-            # Check if we've reached the top
-            scroll_position = await message_container.evaluate('element => element.scrollTop')
-            if scroll_position == 0:
-                print(f"Reached the top after {i+1} scrolls")
-                break
-            
-            print(f"Scroll {i+1}/{scroll_count} completed")
+    async def scrape_messages(self, max_scrolls: Optional[int] = None):
+        """Scroll to the top of the channel, harvesting every rendered window on the way
 
-    async def scrape_messages(self):
-        """Scrape all visible messages from the channel"""
-        print("Starting message scraping...")
+        Discord keeps only a window of rows mounted, so each window is read as
+        soon as it renders. Only rows whose snowflake has not been seen are
+        serialised, and they are appended to the JSONL log at once. The loop
+        waits for older rows after each scroll rather than sleeping, and stops
+        when the oldest snowflake stays the same for STABLE_SCROLLS scrolls.
+        """
+        print("Starting scroll harvest...")
         
-        # Wait for messages to load
         await self.page.wait_for_selector('[data-list-id="chat-messages"]', timeout=10000)
         
-        # Get all message elements
-        message_elements = await self.page.query_selector_all('[data-list-id="chat-messages"] [id^="chat-messages-"]')
-        
-        print(f"Found {len(message_elements)} messages")
+        seen: Set[int] = set()
+        oldest: Optional[int] = None
+        stable = 0
+        scrolls = 0
+        started = time.monotonic()
         
-        for i, message_element in enumerate(message_elements):
-            try:
-                message_data = await self.extract_message_data(message_element)
-                if message_data:
-                    self.messages_data.append(message_data)
-                    print(f"Scraped message {i+1}/{len(message_elements)}: {message_data.get('content', '')[:50]}...")
-                
-                # Add delay between messages to avoid rate limiting
-                await self.random_delay(0.5, 1.5)
-                
-            except Exception as e:
-                print(f"Error scraping message {i+1}: {e}")
-                continue
-        
-        print(f"Successfully scraped {len(self.messages_data)} messages")
-
-    async def extract_message_data(self, message_element) -> Optional[Dict[str, Any]]:
-        """Extract data from a single message element"""
-        try:
-            # Extract message content
-            content_element = await message_element.query_selector('[data-slate-editor="true"]')
-            content = ""
-            if content_element:
-                content = await content_element.inner_text()
-            
-            # Extract author name
-            author_element = await message_element.query_selector('[class*="username"]')
-            author = ""
-            if author_element:
-                author = await author_element.inner_text()
-            
-            # Extract timestamp
-            timestamp_element = await message_element.query_selector('[class*="timestamp"]')
-            timestamp = ""
-            if timestamp_element:
-                timestamp = await timestamp_element.inner_text()
-            
-            # Extract attachments
-            attachments = []
-            attachment_elements = await message_element.query_selector_all('[class*="attachment"]')
-            for attachment in attachment_elements:
-                attachment_data = await self.extract_attachment_data(attachment)
-                if attachment_data:
-                    attachments.append(attachment_data)
+        while True:
+            _, ids = await dom_extract.find_message_ids(self.page)
+            snowflakes = {mid: message_snowflake(mid) for mid in ids}
+            new_ids = [mid for mid, sf in snowflakes.items() if sf is not None and sf not in seen]
             
-            # Extract embeds
-            embeds = []
-            embed_elements = await message_element.query_selector_all('[class*="embed"]')
-            for embed in embed_elements:
-                embed_data = await self.extract_embed_data(embed)
-                if embed_data:
-                    embeds.append(embed_data)
+            harvested = []
+            if new_ids:
+                for raw in await dom_extract.extract_messages(self.page, ids=new_ids):
+                    raw.pop('content_selector', None)
+                    raw['scraped_at'] = datetime.now().isoformat()
+                    harvested.append(raw)
+                # Only rows that came back: one unmounted mid-read is picked up next round
+                seen.update(message_snowflake(raw.get('message_id')) for raw in harvested)
+                self.messages_data.extend(harvested)
+                self.harvest_log.append(harvested)
             
-            return {
-                'content': content,
-                'author': author,
-                'timestamp': timestamp,
-                'attachments': attachments,
-                'embeds': embeds,
-                'scraped_at': datetime.now().isoformat()
-            }
+            window_oldest = min((sf for sf in snowflakes.values() if sf is not None), default=None)
+            if window_oldest is not None and (oldest is None or window_oldest < oldest):
+                oldest = window_oldest
+                stable = 0
+            else:
+                stable += 1
             
-        except Exception as e:
-            print(f"Error extracting message data: {e}")
-            return None
-
-    async def extract_attachment_data(self, attachment_element) -> Optional[Dict[str, Any]]:
-        """Extract attachment data"""
-        try:
-            # Get attachment URL
-            link_element = await attachment_element.query_selector('a')
-            url = ""
-            if link_element:
-                url = await link_element.get_attribute('href')
-            
-            # Get attachment name
-            name_element = await attachment_element.query_selector('[class*="filename"]')
-            name = ""
-            if name_element:
-                name = await name_element.inner_text()
-            
-            return {
-                'url': url,
-                'name': name
-            }
-        except Exception as e:
-            print(f"Error extracting attachment data: {e}")
-            return None
-
-    async def extract_embed_data(self, embed_element) -> Optional[Dict[str, Any]]:
-        """Extract embed data"""
-        try:
-            # Get embed title
-            title_element = await embed_element.query_selector('[class*="embedTitle"]')
-            title = ""
-            if title_element:
-                title = await title_element.inner_text()
-            
-            # Get embed description
-            description_element = await embed_element.query_selector('[class*="embedDescription"]')
-            description = ""
-            if description_element:
-                description = await description_element.inner_text()
-            
-            # Get embed URL
-            url_element = await embed_element.query_selector('[class*="embedTitle"] a')
-            url = ""
-            if url_element:
-                url = await url_element.get_attribute('href')
+            print(f"Scroll {scrolls}: {len(harvested)} new, {len(self.messages_data)} total "
+                  f"({time.monotonic() - started:.0f}s)")
+            if stable >= STABLE_SCROLLS:
+                print(f"Reached the top after {scrolls} scrolls")
+                break
+            if max_scrolls is not None and scrolls >= max_scrolls:
+                print(f"Stopped after {scrolls} scrolls (limit)")
+                break
             
-            return {
-                'title': title,
-                'description': description,
-                'url': url
-            }
-        except Exception as e:
-            print(f"Error extracting embed data: {e}")
-            return None
+            oldest_id = await self.page.evaluate(SCROLL_TO_OLDEST_JS, dom_extract.MESSAGE_SELECTORS)
+            if oldest_id is None:
+                print("Could not find any messages to scroll")
+                break
+            scrolls += 1
+            try:
+                await self.page.wait_for_function(
+                    OLDEST_ROW_CHANGED_JS, arg=[dom_extract.MESSAGE_SELECTORS, oldest_id], timeout=SCROLL_WAIT_MS)
+            except PlaywrightTimeoutError:
+                # Nothing older mounted in time; the next round counts it as a stable scroll
+                pass
+        
+        print(f"Successfully scraped {len(self.messages_data)} messages")
 
     async def export_data(self):
         """Export scraped data to JSON and CSV files"""
@@ -298,13 +249,16 @@ class DiscordScraper:
             print("No data to export")
             return
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = self.run_stamp
+        
+        # Oldest first; harvesting walked the history backwards
+        self.messages_data.sort(key=lambda msg: message_snowflake(msg.get('message_id')) or 0)
         
         # Export to JSON
         json_filename = f"discord_messages_{timestamp}.json"
         with open(json_filename, 'w', encoding='utf-8') as f:
             json.dump(self.messages_data, f, indent=2, ensure_ascii=False)
-        print(f"Data exported to {json_filename}")
+        print(f"Data exported to {json_filename} (harvest log: {self.harvest_log.path})")
         
         # Export to CSV
         csv_filename = f"discord_messages_{timestamp}.csv"
@@ -357,10 +311,7 @@ class DiscordScraper:
                 print("Could not find the target channel.")
                 return
             
-            # Scroll to load more messages
-            await self.scroll_to_load_messages(scroll_count=20)
-            
-            # Scrape messages
+            # Scroll to the top, harvesting messages before Discord unmounts them
             await self.scrape_messages()
             
             # Export data
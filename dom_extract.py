@@ -0,0 +1,221 @@
+"""
+In-page DOM serialisation helpers for the Discord monitors.
+
+Each snippet here runs inside the page through a single ``page.evaluate`` call,
+so reading the chat list costs one CDP round-trip no matter how many messages
+Discord has rendered.
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+
+# Selectors for message rows, tried in order until one matches
+MESSAGE_SELECTORS = [
+    '[data-list-id="chat-messages"] [id^="chat-messages-"]',
+    '[id^="chat-messages-"]',
+    '[data-list-id="chat-messages"] article',
+    'li[id^="chat-messages-"]'
+]
+
+# Selectors for the message body: the content div itself, then class-prefix fallbacks
+CONTENT_SELECTORS = [
+    '[id^="message-content-"]',
+    '[class^="messageContent_"]',
+    '[class^="markup__"]',
+    'div[role="document"]',
+    'div[role="textbox"]',
+]
+
+AUTHOR_SELECTORS = [
+    '[class*="username_"]',
+    '[class*="headerText_"] [class*="username_"]',
+    '[class*="headerText-"] [class*="username-"]',
+    'h3[role="heading"]',
+]
+AUTHOR_SELECTOR = ', '.join(AUTHOR_SELECTORS)
+TIMESTAMP_SELECTOR = '[class*="timestamp_"], [class*="timestamp"], time'
+ATTACHMENT_SELECTOR = '[class*="attachment"]'
+EMBED_SELECTOR = '[class*="embed"]'
+
+# Name of the Python callback exposed to the page for push-based detection
+PUSH_BINDING_NAME = '__discordMonitorPush'
+
+# Mirrors DiscordMonitor.extract_message_data / extract_attachment_data / extract_embed_data
+SERIALIZE_MESSAGE_JS = """
+function serializeMessage(el, opts) {
+    const text = (node) => node ? (node.innerText || '') : '';
+    let content = '';
+    let contentSelector = null;
+    for (const sel of opts.contentSelectors) {
+        const node = el.querySelector(sel);
+        if (node) {
+            content = text(node).trim();
+            if (content) {
+                contentSelector = sel;
+                break;
+            }
+        }
+    }
+    if (!content) content = (el.textContent || '').trim();
+
+    const attachments = Array.from(el.querySelectorAll(opts.attachmentSelector)).map((att) => {
+        const link = att.querySelector('a');
+        return {
+            url: link ? link.getAttribute('href') : '',
+            name: text(att.querySelector('[class*="filename"]'))
+        };
+    });
+    const embeds = Array.from(el.querySelectorAll(opts.embedSelector)).map((emb) => {
+        const link = emb.querySelector('[class*="embedTitle"] a');
+        return {
+            title: text(emb.querySelector('[class*="embedTitle"]')),
+            description: text(emb.querySelector('[class*="embedDescription"]')),
+            url: link ? link.getAttribute('href') : ''
+        };
+    });
+
+    return {
+        message_id: el.id,
+        content: content,
+        content_selector: contentSelector,
+        author: text(el.querySelector(opts.authorSelector)),
+        timestamp: text(el.querySelector(opts.timestampSelector)),
+        attachments: attachments,
+        embeds: embeds
+    };
+}
+"""
+
+EXTRACT_MESSAGES_JS = """
+(opts) => {
+    %s
+    let nodes = [];
+    for (const sel of opts.messageSelectors) {
+        nodes = Array.from(document.querySelectorAll(sel));
+        if (nodes.length) break;
+    }
+    const wanted = opts.ids ? new Set(opts.ids) : null;
+    return nodes
+        .filter((node) => node.id && (!wanted || wanted.has(node.id)))
+        .map((node) => serializeMessage(node, opts));
+}
+""" % SERIALIZE_MESSAGE_JS
+
+# Raw outerHTML of the message rows, parsed offline by html_parser (EXTRACTION_MODE=html)
+CAPTURE_HTML_JS = """
+(opts) => {
+    let nodes = [];
+    for (const sel of opts.messageSelectors) {
+        nodes = Array.from(document.querySelectorAll(sel));
+        if (nodes.length) break;
+    }
+    const wanted = opts.ids ? new Set(opts.ids) : null;
+    return nodes
+        .filter((node) => node.id && (!wanted || wanted.has(node.id)))
+        .map((node) => ({ message_id: node.id, html: node.outerHTML }));
+}
+"""
+
+LIST_MESSAGE_IDS_JS = """
+(messageSelectors) => {
+    for (const sel of messageSelectors) {
+        const nodes = document.querySelectorAll(sel);
+        if (nodes.length) return { selector: sel, ids: Array.from(nodes, (node) => node.id).filter(Boolean) };
+    }
+    return { selector: null, ids: [] };
+}
+"""
+
+# Installs (idempotently) a MutationObserver on the chat list that serialises
+# newly mounted message rows and hands them to the exposed Python callback.
+OBSERVE_MESSAGES_JS = """
+(opts) => {
+    %s
+    const container = document.querySelector('[data-list-id="chat-messages"]');
+    if (!container || typeof window[opts.bindingName] !== 'function') return false;
+    const current = window.__discordMonitorObserver;
+    if (current && current.container === container && container.isConnected) return true;
+    if (current) current.observer.disconnect();
+
+    const seen = new Set(Array.from(container.querySelectorAll('[id^="chat-messages-"]'), (node) => node.id));
+    const observer = new MutationObserver((mutations) => {
+        const added = [];
+        const collect = (node) => {
+            if (node.id && node.id.startsWith('chat-messages-') && !seen.has(node.id)) {
+                seen.add(node.id);
+                added.push(node);
+            }
+        };
+        for (const mutation of mutations) {
+            for (const node of mutation.addedNodes) {
+                if (node.nodeType !== 1) continue;
+                collect(node);
+                node.querySelectorAll('[id^="chat-messages-"]').forEach(collect);
+            }
+        }
+        if (added.length) {
+            window[opts.bindingName](added.map((node) => serializeMessage(node, opts)));
+        }
+    });
+    observer.observe(container, { childList: true, subtree: true });
+    window.__discordMonitorObserver = { observer: observer, container: container };
+    return true;
+}
+""" % SERIALIZE_MESSAGE_JS
+
+
+def extraction_options(ids: Optional[List[str]] = None, selectors: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+    """Build the argument object passed to the in-page snippets
+
+    ``selectors`` overrides the candidate order per role ('message', 'content'),
+    e.g. ``SelectorCache.order()``.
+    """
+    selectors = selectors or {}
+    return {
+        'messageSelectors': selectors.get('message', MESSAGE_SELECTORS),
+        'contentSelectors': selectors.get('content', CONTENT_SELECTORS),
+        'authorSelector': AUTHOR_SELECTOR,
+        'timestampSelector': TIMESTAMP_SELECTOR,
+        'attachmentSelector': ATTACHMENT_SELECTOR,
+        'embedSelector': EMBED_SELECTOR,
+        'ids': ids,
+    }
+
+
+async def extract_messages(page, ids: Optional[List[str]] = None,
+                           selectors: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, Any]]:
+    """Serialise every rendered message (or only ``ids``) in one evaluate call.
+
+    Returns plain dicts with message_id, content, content_selector (the
+    content selector that matched, or None), author, timestamp, attachments
+    and embeds, in DOM order.
+    """
+    return await page.evaluate(EXTRACT_MESSAGES_JS, extraction_options(ids, selectors))
+
+
+async def capture_message_html(page, ids: Optional[List[str]] = None,
+                               selectors: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, str]]:
+    """``[{'message_id', 'html'}]`` for every rendered message (or only ``ids``) in one evaluate call"""
+    return await page.evaluate(CAPTURE_HTML_JS, extraction_options(ids, selectors))
+
+
+async def find_message_ids(page, selectors: Optional[List[str]] = None) -> Tuple[Optional[str], List[str]]:
+    """Ids of the rendered messages in DOM order, plus the message selector that matched"""
+    found = await page.evaluate(LIST_MESSAGE_IDS_JS, selectors or MESSAGE_SELECTORS)
+    return found['selector'], found['ids']
+
+
+async def list_message_ids(page) -> List[str]:
+    """Read only the ids of the rendered messages, in DOM order"""
+    _, ids = await find_message_ids(page)
+    return ids
+
+
+async def observe_messages(page, selectors: Optional[Dict[str, List[str]]] = None) -> bool:
+    """Attach the chat-list MutationObserver; returns False if the list is not mounted.
+
+    Safe to call repeatedly: it is a no-op while the observed container is
+    still attached, and re-attaches after Discord swaps the list out.
+    """
+    opts = extraction_options(selectors=selectors)
+    opts['bindingName'] = PUSH_BINDING_NAME
+    return await page.evaluate(OBSERVE_MESSAGES_JS, opts)
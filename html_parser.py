@@ -0,0 +1,214 @@
+"""
+Offline parsing of captured message ``outerHTML`` with lxml.
+
+With EXTRACTION_MODE=html the monitors grab the raw HTML of the new message
+rows in one ``page.evaluate`` call and hand it to ``parse_messages`` in a
+ProcessPoolExecutor, so parsing and cleaning run on other cores instead of
+the event loop that drives Playwright. The records mirror what
+dom_extract's in-page serialiser returns (same selectors, as XPath).
+Element text approximates ``innerText``: block elements and ``<br>`` break
+lines, and runs of whitespace collapse to one space.
+
+The same parser re-processes a raw HTML archive (ARCHIVE_RAW_HTML=true):
+
+    python html_parser.py 6thsense_raw_html.jsonl -o reparsed.jsonl --clean
+"""
+
+import argparse
+import json
+import re
+import sys
+from typing import Any, Dict, List, Optional
+
+from lxml import etree
+
+import content_normalizer
+import dom_extract
+from message_log import MessageLog
+
+# dom_extract.CONTENT_SELECTORS as XPath, keyed by the CSS selector so the
+# monitors' adaptive order (SelectorCache) can be passed straight through
+CONTENT_XPATHS = {
+    '[id^="message-content-"]': etree.XPath('.//*[starts-with(@id, "message-content-")]'),
+    '[class^="messageContent_"]': etree.XPath('.//*[starts-with(@class, "messageContent_")]'),
+    '[class^="markup__"]': etree.XPath('.//*[starts-with(@class, "markup__")]'),
+    'div[role="document"]': etree.XPath('.//div[@role="document"]'),
+    'div[role="textbox"]': etree.XPath('.//div[@role="textbox"]'),
+}
+# Unions come back in document order, like querySelector with a selector list
+AUTHOR_XPATH = etree.XPath(
+    '(.//*[contains(@class, "username_")]'
+    ' | .//*[contains(@class, "headerText_")]//*[contains(@class, "username_")]'
+    ' | .//*[contains(@class, "headerText-")]//*[contains(@class, "username-")]'
+    ' | .//h3[@role="heading"])[1]')
+TIMESTAMP_XPATH = etree.XPath('(.//*[contains(@class, "timestamp")] | .//time)[1]')
+ATTACHMENT_XPATH = etree.XPath('.//*[contains(@class, "attachment")]')
+ATTACHMENT_LINK_XPATH = etree.XPath('(.//a)[1]')
+ATTACHMENT_NAME_XPATH = etree.XPath('(.//*[contains(@class, "filename")])[1]')
+EMBED_XPATH = etree.XPath('.//*[contains(@class, "embed")]')
+EMBED_TITLE_XPATH = etree.XPath('(.//*[contains(@class, "embedTitle")])[1]')
+EMBED_DESCRIPTION_XPATH = etree.XPath('(.//*[contains(@class, "embedDescription")])[1]')
+EMBED_LINK_XPATH = etree.XPath('(.//*[contains(@class, "embedTitle")]//a)[1]')
+
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure',
+    'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav',
+    'ol', 'p', 'pre', 'section', 'table', 'tr', 'ul',
+}
+SKIP_TAGS = {'script', 'style', 'template'}
+# Plain etree elements: lxml.html's element class lookup costs more than the parse itself
+_PARSER = etree.HTMLParser(remove_comments=True)
+_BLOCK_BREAK = '\x00'
+_COLLAPSE = re.compile(r'[ \t\r\n\f]+')
+_BREAKS = re.compile(r' ?\x00[\x00 ]*')
+_LINE_EDGES = re.compile(r' *\n *')
+
+
+def inner_text(el) -> str:
+    """Approximate ``innerText`` of an element (no layout: hidden nodes are included)"""
+    if el is None:
+        return ''
+    parts: List[str] = []
+
+    def walk(node, pre: bool):
+        tag = node.tag if isinstance(node.tag, str) else None
+        if tag is not None and tag not in SKIP_TAGS:
+            if tag == 'br':
+                parts.append('\n')
+            else:
+                pre = pre or tag == 'pre'
+                block = tag in BLOCK_TAGS
+                if block:
+                    parts.append(_BLOCK_BREAK)
+                if node.text:
+                    parts.append(node.text if pre else _COLLAPSE.sub(' ', node.text))
+                for child in node:
+                    walk(child, pre)
+                if block:
+                    parts.append(_BLOCK_BREAK)
+        if node is not el and node.tail:
+            parts.append(node.tail if pre else _COLLAPSE.sub(' ', node.tail))
+
+    walk(el, False)
+    text = _BREAKS.sub('\n', ''.join(parts))
+    return _LINE_EDGES.sub('\n', text).strip(' \n')
+
+
+def _first(xpath, el):
+    found = xpath(el)
+    return found[0] if found else None
+
+
+def _parse_rows(markup: str) -> List[Any]:
+    """Top-level elements of an HTML snippet"""
+    root = etree.fromstring(f'<html><body>{markup}</body></html>', _PARSER)
+    body = root.find('body') if root is not None else None
+    return list(body) if body is not None else []
+
+
+def parse_message(message_id: str, raw_html: str, content_selectors: Optional[List[str]] = None) -> Dict[str, Any]:
+    """One message row's outerHTML -> the same dict dom_extract.extract_messages returns"""
+    rows = _parse_rows(raw_html)
+    if not rows:
+        raise ValueError(f"no element in captured HTML for {message_id}")
+    return parse_row(rows[0], message_id, content_selectors)
+
+
+def parse_row(el, message_id: Optional[str] = None, content_selectors: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Parsed message row element -> message dict"""
+    content = ''
+    content_selector = None
+    for sel in content_selectors or dom_extract.CONTENT_SELECTORS:
+        xpath = CONTENT_XPATHS.get(sel)
+        node = _first(xpath, el) if xpath is not None else None
+        if node is not None:
+            content = inner_text(node).strip()
+            if content:
+                content_selector = sel
+                break
+    if not content:
+        content = ''.join(el.itertext()).strip()
+
+    attachments = []
+    for att in ATTACHMENT_XPATH(el):
+        link = _first(ATTACHMENT_LINK_XPATH, att)
+        attachments.append({
+            'url': link.get('href', '') if link is not None else '',
+            'name': inner_text(_first(ATTACHMENT_NAME_XPATH, att)),
+        })
+    embeds = []
+    for emb in EMBED_XPATH(el):
+        link = _first(EMBED_LINK_XPATH, emb)
+        embeds.append({
+            'title': inner_text(_first(EMBED_TITLE_XPATH, emb)),
+            'description': inner_text(_first(EMBED_DESCRIPTION_XPATH, emb)),
+            'url': link.get('href', '') if link is not None else '',
+        })
+
+    return {
+        'message_id': message_id or el.get('id'),
+        'content': content,
+        'content_selector': content_selector,
+        'author': inner_text(_first(AUTHOR_XPATH, el)),
+        'timestamp': inner_text(_first(TIMESTAMP_XPATH, el)),
+        'attachments': attachments,
+        'embeds': embeds,
+    }
+
+
+def parse_messages(captured: List[Dict[str, str]], content_selectors: Optional[List[str]] = None,
+                   clean: bool = False) -> List[Dict[str, Any]]:
+    """Parse ``[{'message_id', 'html'}]`` in order (runs inside a worker process)
+
+    With ``clean`` the content also goes through content_normalizer and the
+    record is marked ``content_normalized``. A row that fails to parse comes
+    back with empty fields rather than failing the batch.
+    """
+    # One parse for the whole batch; fall back to row by row if the rows do not line up
+    try:
+        rows = _parse_rows(''.join(item.get('html') or '' for item in captured))
+    except (etree.ParserError, ValueError):
+        rows = []
+    if [row.get('id') for row in rows] != [item.get('message_id') for item in captured]:
+        rows = [None] * len(captured)
+
+    results = []
+    for item, row in zip(captured, rows):
+        try:
+            if row is not None:
+                message = parse_row(row, item.get('message_id'), content_selectors)
+            else:
+                message = parse_message(item.get('message_id'), item.get('html') or '', content_selectors)
+        except (etree.ParserError, ValueError):
+            message = {'message_id': item.get('message_id'), 'content': '', 'content_selector': None,
+                       'author': '', 'timestamp': '', 'attachments': [], 'embeds': []}
+        if clean:
+            content_normalizer.normalize_message(message)
+        results.append(message)
+    return results
+
+
+def main():
+    """Main function"""
+    ap = argparse.ArgumentParser(description='Re-parse a raw HTML archive into message records')
+    ap.add_argument('archive', help='JSON Lines file of {message_id, html} records')
+    ap.add_argument('-o', '--output', default=None, help='JSON Lines output (default stdout)')
+    ap.add_argument('--clean', action='store_true', help='apply content_normalizer to the content')
+    args = ap.parse_args()
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    count = 0
+    try:
+        for record in MessageLog(args.archive):
+            message = parse_messages([record], clean=args.clean)[0]
+            message['captured_at'] = record.get('captured_at')
+            out.write(json.dumps(message, ensure_ascii=False) + '\n')
+            count += 1
+    finally:
+        if args.output:
+            out.close()
+    print(f"Re-parsed {count} messages", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
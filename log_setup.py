@@ -0,0 +1,83 @@
+"""
+Leveled, non-blocking logging for the monitors.
+
+Records are put on an in-memory queue by a QueueHandler; a QueueListener thread
+writes them to the console (plain text, same look as the old prints) and to a
+JSON-lines file, so a slow terminal or disk never stalls the event loop.
+
+    LOG_LEVEL=DEBUG LOG_FILE=6thsense_log.jsonl python 6thsense.py
+
+At INFO (the default) the per-message and per-selector lines and the debug
+dumps are skipped entirely; guard expensive debug-only work with
+``logger.isEnabledFor(logging.DEBUG)``.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message (+ exception)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(name: str, level: Optional[str] = None, log_file: Optional[str] = None) -> logging.Logger:
+    """Route all logging through a background queue listener; returns ``logging.getLogger(name)``
+
+    ``level`` defaults to LOG_LEVEL (INFO) and ``log_file`` to LOG_FILE; an
+    empty file name disables the JSON-lines sink.
+    """
+    global _listener
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    if log_file is None:
+        log_file = os.getenv('LOG_FILE', '')
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('%(message)s'))
+    handlers = [console]
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8')
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+
+    stop_logging()
+    records = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(records)]
+    root.setLevel(level)
+    return logging.getLogger(name)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,233 @@
+"""
+Append-only JSON Lines archive for monitored messages.
+
+Each saved message is one line of JSON. Saving a batch appends only the new
+lines and fsyncs once, so the cost is proportional to the batch rather than
+to the whole history. The set of archived ids is read once, on first use.
+
+``iter_archive`` streams either archive format (a JSON array, parsed
+incrementally, or JSON Lines) one message at a time, so readers such as the
+migrator never hold a whole archive in memory.
+
+Run as a script to convert an existing JSON array archive:
+
+    python message_log.py 6thsense_messages.json [6thsense_messages.jsonl]
+"""
+
+import json
+import os
+import sys
+from typing import List, Dict, Any, Optional, Set, Iterator
+
+
+ARCHIVE_CHUNK_SIZE = 1 << 16
+_WHITESPACE = ' \t\r\n'
+
+
+def iter_json_array(f, chunk_size: int = ARCHIVE_CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the elements of a JSON array from a text file object, one chunk read at a time"""
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    started = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    while True:
+        # Skip whitespace, the opening bracket and separators up to the next element
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf):
+                break
+            if not fill():
+                if started:
+                    raise ValueError("JSON array is not terminated")
+                return
+        ch = buf[pos]
+        if not started:
+            if ch != '[':
+                raise ValueError(f"expected a JSON array, found {ch!r}")
+            started = True
+            pos += 1
+            continue
+        if ch == ']':
+            return
+        if ch == ',':
+            pos += 1
+            continue
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Most likely the element runs past the buffer: read more and retry
+            if fill():
+                continue
+            raise
+        if end == len(buf) and not eof and not isinstance(item, (dict, list, str)):
+            # A bare number may continue in the next chunk
+            if fill():
+                continue
+        pos = end
+        yield item
+
+
+class _Prepend:
+    """File-like view that returns already-read text before the rest of ``f``"""
+
+    def __init__(self, head: str, f):
+        self.head = head
+        self.f = f
+
+    def read(self, size: int = -1) -> str:
+        if self.head:
+            head, self.head = self.head, ''
+            return head
+        return self.f.read(size)
+
+
+def iter_archive(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield messages from a JSON array or JSON Lines archive, without loading the whole file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(ARCHIVE_CHUNK_SIZE)
+        first = head.lstrip()[:1]
+        if first == '[':
+            rest = _Prepend(head, f)
+            yield from iter_json_array(rest)
+            return
+    # JSON Lines (MessageLog tolerates a torn trailing line)
+    yield from MessageLog(path)
+
+
+class MessageLog:
+    def __init__(self, path: str):
+        self.path = path
+        self.ids: Set[str] = set()
+        self._loaded = False
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Yield archived messages in file order, skipping a torn trailing line"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave a partial last line behind
+                    continue
+
+    def load_ids(self) -> Set[str]:
+        """Build the in-memory id index from the log (once)"""
+        if not self._loaded:
+            for message in self:
+                mid = message.get('message_id')
+                if mid:
+                    self.ids.add(mid)
+            self._loaded = True
+        return self.ids
+
+    def repair_tail(self):
+        """Make the log end in a newline before appending
+
+        A torn last line (crash mid-write) is cut off, otherwise the next record
+        would be glued onto it and both would be skipped on read. A complete
+        record that only lacks its newline is kept.
+        """
+        try:
+            f = open(self.path, 'rb+')
+        except FileNotFoundError:
+            return
+        with f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b'\n':
+                return
+            # Find the start of the last line
+            start = end
+            while start > 0:
+                step = min(ARCHIVE_CHUNK_SIZE, start)
+                f.seek(start - step)
+                chunk = f.read(step)
+                idx = chunk.rfind(b'\n')
+                if idx >= 0:
+                    start = start - step + idx + 1
+                    break
+                start -= step
+            f.seek(start)
+            tail = f.read()
+            try:
+                json.loads(tail.decode('utf-8'))
+                f.write(b'\n')
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                f.truncate(start)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Append messages not yet in the log; returns the ones written"""
+        self.load_ids()
+        new_unique_messages = []
+        for m in messages:
+            mid = m.get('message_id')
+            if mid in self.ids:
+                continue
+            if mid:
+                self.ids.add(mid)
+            new_unique_messages.append(m)
+        if not new_unique_messages:
+            return []
+
+        lines = ''.join(json.dumps(m, ensure_ascii=False) + '\n' for m in new_unique_messages)
+        self.repair_tail()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        return new_unique_messages
+
+
+def convert_json_array(src_path: str, dst_path: Optional[str] = None) -> int:
+    """Convert a JSON array archive into a JSON Lines log; returns messages written"""
+    if dst_path is None:
+        dst_path = os.path.splitext(src_path)[0] + '.jsonl'
+    with open(src_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    messages = json.loads(content) if content.strip() else []
+    return len(MessageLog(dst_path).append(messages))
+
+
+def main():
+    """Main function"""
+    if len(sys.argv) < 2:
+        print("Usage: python message_log.py <json_array_file> [jsonl_file]")
+        print("Example: python message_log.py 6thsense_messages.json")
+        return
+
+    src_path = sys.argv[1]
+    dst_path = sys.argv[2] if len(sys.argv) > 2 else None
+    if not os.path.exists(src_path):
+        print(f"File not found: {src_path}")
+        return
+
+    count = convert_json_array(src_path, dst_path)
+    print(f"Converted {count} messages from {src_path}")
+
+
+if __name__ == "__main__":
+    main()
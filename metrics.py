@@ -0,0 +1,124 @@
+"""
+Rolling latency histograms for the monitors.
+
+Each named metric keeps its most recent samples (milliseconds) in a bounded
+window, so percentiles describe current behaviour rather than the whole run.
+Snapshots can be dumped to a JSON file and served in Prometheus text format
+on a local ``/metrics`` endpoint.
+
+    with self.metrics.timer('poll.extract'):
+        extracted = await self.extract_visible_messages(ids=fresh_ids)
+    self.metrics.observe('lag.end_to_end', lag_ms)
+"""
+
+import json
+import math
+import os
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+PERCENTILES = (50, 95, 99)
+
+
+def nearest_rank(ordered, p: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not ordered:
+        return None
+    return ordered[max(1, math.ceil(p / 100 * len(ordered))) - 1]
+
+
+class Histogram:
+    def __init__(self, window: int = 1024):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Nearest-rank percentile over the rolling window"""
+        return nearest_rank(sorted(self.samples), p)
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        summary = {'count': self.count, 'window': len(ordered), 'sum': round(self.total, 3)}
+        for p in PERCENTILES + (100,):
+            value = nearest_rank(ordered, p)
+            summary['max' if p == 100 else f'p{p}'] = round(value, 3) if value is not None else None
+        return summary
+
+
+class Metrics:
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self.histograms: Dict[str, Histogram] = {}
+        self.started_at = time.time()
+
+    def observe(self, name: str, value_ms: float):
+        """Record one sample (milliseconds) under ``name``"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(self.window)
+        histogram.observe(value_ms)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time the enclosed block (awaits included) into ``name``"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - started) * 1000)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'generated_at': time.time(),
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'unit': 'ms',
+            'metrics': {name: h.summary() for name, h in sorted(self.histograms.items())},
+        }
+
+    def dump(self, path: str):
+        """Write the snapshot to ``path`` atomically"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def prometheus_text(self, prefix: str = 'discord_monitor') -> str:
+        """Render every histogram as a Prometheus summary (quantiles, _sum, _count)"""
+        lines = []
+        for name, h in sorted(self.histograms.items()):
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_ms"
+            lines.append(f'# TYPE {metric} summary')
+            for p in PERCENTILES:
+                value = h.percentile(p)
+                if value is not None:
+                    lines.append(f'{metric}{{quantile="{p / 100}"}} {value:.3f}')
+            lines.append(f'{metric}_sum {h.total:.3f}')
+            lines.append(f'{metric}_count {h.count}')
+        return '\n'.join(lines) + '\n'
+
+    async def serve(self, port: int, host: str = '127.0.0.1'):
+        """Expose ``/metrics`` (Prometheus text) and ``/metrics.json`` on a local port"""
+        from aiohttp import web
+
+        async def prometheus(request):
+            return web.Response(text=self.prometheus_text(), content_type='text/plain', charset='utf-8')
+
+        async def snapshot(request):
+            return web.json_response(self.snapshot())
+
+        app = web.Application()
+        app.router.add_get('/metrics', prometheus)
+        app.router.add_get('/metrics.json', snapshot)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
@@ -1,25 +1,39 @@
 import asyncio
 import json
+import logging
 import os
 import time
 import random
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Set
-from playwright.async_api import async_playwright, Page, Browser
+from playwright.async_api import async_playwright, Page, Browser, BrowserContext
 from dotenv import load_dotenv
 import pandas as pd
 import aiofiles
 from dateutil import parser
 import pytz
 import re
+import dom_extract
+from selector_cache import SelectorCache
+from snowflake import DedupeWindow, message_snowflake, message_timestamp_ms, message_created_at
+from message_log import MessageLog, convert_json_array
+import slate_input
+from log_setup import setup_logging
+from pipeline import Stage
+from metrics import Metrics
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger('monitor')
+
 class DiscordMonitor:
     def __init__(self):
         self.browser: Optional[Browser] = None
+        self.context: Optional[BrowserContext] = None
+        # Source channel stays pinned in self.page; posting happens in dest_page
         self.page: Optional[Page] = None
+        self.dest_page: Optional[Page] = None
         self.email = os.getenv('DISCORD_EMAIL')
         self.password = os.getenv('DISCORD_PASSWORD')
         self.source_server = os.getenv('SOURCE_SERVER_NAME', 'cooks')
@@ -31,12 +45,41 @@ class DiscordMonitor:
         self.check_interval = float(os.getenv('CHECK_INTERVAL', '0.5'))
         self.max_messages_per_batch = int(os.getenv('MAX_MESSAGES_PER_BATCH', '10'))
         self.enable_auto_migration = os.getenv('ENABLE_AUTO_MIGRATION', 'true').lower() == 'true'
+        # 'batch' serialises all messages in one evaluate call, 'element' walks element handles
+        self.extraction_mode = os.getenv('EXTRACTION_MODE', 'batch').lower()
+        # 'push' reacts to an in-page MutationObserver, 'poll' re-reads the DOM every CHECK_INTERVAL
+        self.detection_mode = os.getenv('DETECTION_MODE', 'push').lower()
+        self.watchdog_interval = float(os.getenv('WATCHDOG_INTERVAL', '10'))
+        # Per-role selector order (message, content, author, input), last success first
+        self.selectors = SelectorCache()
+        # Server/channel names, read once and dropped when the main frame navigates
+        self._location: Optional[Dict[str, str]] = None
+        self._location_page: Optional[Page] = None
         
         # State tracking
         self.last_message_id: Optional[str] = None
-        self.processed_messages: Set[str] = set()
+        # Per-channel snowflake watermark + bounded window of recent ids (constant size)
+        self.dedupe_window_size = int(os.getenv('DEDUPE_WINDOW_SIZE', '256'))
+        self.processed_messages = DedupeWindow(self.dedupe_window_size)
+        # Rows pushed by the in-page observer, drained by monitor_loop
+        self._pushed_messages: List[Dict[str, Any]] = []
+        self._push_event: Optional[asyncio.Event] = None
+        # Archiver and deliverer stages fed by monitor_loop, each behind a bounded queue
+        self.pipeline_queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE', '100'))
+        self.archiver: Optional[Stage] = None
+        self.deliverer: Optional[Stage] = None
+        # Rolling per-stage latency histograms, dumped to JSON and optionally served on /metrics
+        self.metrics = Metrics()
+        self.metrics_file = 'monitor_metrics.json'
+        self.metrics_interval = float(os.getenv('METRICS_INTERVAL', '60'))
+        self.metrics_port = int(os.getenv('METRICS_PORT', '0'))
+        self._metrics_task: Optional[asyncio.Task] = None
+        self._metrics_runner = None
         self.state_file = 'monitor_state.json'
-        self.messages_log_file = 'monitored_messages.json'
+        self.messages_log_file = 'monitored_messages.jsonl'
+        # Pre-JSONL archive, converted once on startup if the JSONL log is missing
+        self.legacy_messages_log_file = 'monitored_messages.json'
+        self.message_log = MessageLog(self.messages_log_file)
         
         if not self.email or not self.password:
             raise ValueError("Please set DISCORD_EMAIL and DISCORD_PASSWORD in your .env file")
@@ -55,21 +98,21 @@ class DiscordMonitor:
             ]
         )
         
-        context = await self.browser.new_context(
+        self.context = await self.browser.new_context(
             user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             viewport={'width': 1920, 'height': 1080},
             locale='en-US',
             timezone_id='America/New_York'
         )
         
-        self.page = await context.new_page()
-        
-        # Add stealth scripts
-        await self.page.add_init_script("""
+        # Add stealth scripts (context-wide, so the destination page gets them too)
+        await self.context.add_init_script("""
             Object.defineProperty(navigator, 'webdriver', {
                 get: () => undefined,
             });
         """)
+        
+        self.page = await self.context.new_page()
 
     async def login_to_discord(self):
         """Login to Discord web interface"""
@@ -159,6 +202,21 @@ class DiscordMonitor:
             return True
 
     async def _get_current_location(self) -> Dict[str, str]:
+        """Current server and channel names, cached until the page navigates"""
+        if self._location_page is not self.page:
+            self.page.on('framenavigated', self._on_frame_navigated)
+            self._location_page = self.page
+            self._location = None
+        if self._location is None:
+            self._location = await self._read_current_location()
+        return self._location
+
+    def _on_frame_navigated(self, frame):
+        """Drop the cached location when the watched page's main frame changes URL"""
+        if self._location_page is not None and frame == self._location_page.main_frame:
+            self._location = None
+
+    async def _read_current_location(self) -> Dict[str, str]:
         """Best-effort read of current server and channel names for debug logs."""
         server_name = ''
         channel_name = ''
@@ -186,84 +244,196 @@ class DiscordMonitor:
 
     async def get_new_messages(self) -> List[Dict[str, Any]]:
         """Get new messages since last check with per-second retry and detailed logs"""
-        loc = await self._get_current_location()
-        print(f"\n📥 Fetching from: {loc['server']} > {loc['channel']}")
+        with self.metrics.timer('poll.location'):
+            loc = await self._get_current_location()
+        logger.debug("📥 Fetching from: %s > %s", loc['server'], loc['channel'])
         
         try:
             # Retry up to 10 seconds for messages container
             found = False
-            for i in range(1, 11):
-                try:
-                    await self.page.wait_for_selector('[data-list-id="chat-messages"]', timeout=1000)
-                    found = True
-                    print(f"  ⏳ trying {i}s: messages container visible")
-                    break
-                except Exception:
-                    print(f"  ⏳ trying {i}s: waiting for messages container...")
+            with self.metrics.timer('poll.container_wait'):
+                for i in range(1, 11):
+                    try:
+                        await self.page.wait_for_selector('[data-list-id="chat-messages"]', timeout=1000)
+                        found = True
+                        logger.debug("  ⏳ trying %ss: messages container visible", i)
+                        break
+                    except Exception:
+                        logger.info("  ⏳ trying %ss: waiting for messages container...", i)
             if not found:
-                print("✗ Messages container not found after 10s")
+                logger.warning("✗ Messages container not found after 10s")
                 return []
             
             # Light auto-scroll to ensure messages render (Discord virtualizes)
-            try:
-                await self.page.mouse.wheel(0, -800)
-                await asyncio.sleep(0.2)
-                await self.page.mouse.wheel(0, 800)
-                await asyncio.sleep(0.2)
-            except Exception:
-                pass
+            with self.metrics.timer('poll.scroll'):
+                try:
+                    await self.page.mouse.wheel(0, -800)
+                    await asyncio.sleep(0.2)
+                    await self.page.mouse.wheel(0, 800)
+                    await asyncio.sleep(0.2)
+                except Exception:
+                    pass
 
-            # Try multiple selectors for message elements
-            print("⏳ Extracting message elements...")
-            selectors = [
-                '[data-list-id="chat-messages"] [id^="chat-messages-"]',
-                '[id^="chat-messages-"]',
-                '[data-list-id="chat-messages"] article',
-                'li[id^="chat-messages-"]'
-            ]
-            message_elements: List[Any] = []
-            for sel in selectors:
-                message_elements = await self.page.query_selector_all(sel)
-                print(f"  • selector '{sel}' -> {len(message_elements)} elements")
-                if message_elements:
-                    break
-            if not message_elements:
-                print("✗ No message elements found with known selectors")
+            logger.debug("⏳ Extracting message elements...")
+            # Read only the rendered ids first; full extraction runs just for unseen ones
+            with self.metrics.timer('poll.element_query'):
+                message_strategy = self.selectors.get('message')
+                selector, rendered_ids = await dom_extract.find_message_ids(self.page, message_strategy.candidates)
+                message_strategy.record(selector)
+            if not rendered_ids:
+                logger.warning("✗ No message elements found with known selectors")
                 return []
-            print(f"✓ Found {len(message_elements)} message elements")
-            
-            new_messages = []
-            
-            for idx, message_element in enumerate(message_elements):
-                try:
-                    message_data = await self.extract_message_data(message_element)
-                    if message_data and message_data['message_id'] not in self.processed_messages:
-                        new_messages.append(message_data)
-                        self.processed_messages.add(message_data['message_id'])
-                        
-                        # Update last message ID
-                        if not self.last_message_id:
-                            self.last_message_id = message_data['message_id']
-                        
-                        preview = (message_data.get('content') or '').strip().replace('\n', ' ')
-                        if len(preview) > 120:
-                            preview = preview[:117] + '...'
-                        print(f"  ✓ fetched #{idx+1}: '{preview}'")
-                        
-                except Exception as e:
-                    print(f"  ✗ Error extracting message {idx+1}: {e}")
-                    continue
-            
-            # Sort by timestamp (oldest first)
-            new_messages.sort(key=lambda x: x.get('timestamp', ''))
+            fresh_ids = self.filter_unseen_ids(rendered_ids)
+            logger.debug("✓ Found %d message elements, %d not seen before", len(rendered_ids), len(fresh_ids))
+            if not fresh_ids:
+                return []
+
+            if self.extraction_mode == 'batch':
+                with self.metrics.timer('poll.extract'):
+                    extracted = await self.extract_visible_messages(ids=fresh_ids)
+                logger.debug("✓ Extracted %d messages in one round-trip", len(extracted))
+            else:
+                with self.metrics.timer('poll.extract'):
+                    extracted = await self.extract_message_elements(ids=fresh_ids)
+                if extracted is None:
+                    return []
             
-            print(f"✓ Fetch successful! {len(new_messages)} new messages")
-            return new_messages
+            with self.metrics.timer('poll.select'):
+                return self.select_new_messages(extracted)
             
         except Exception as e:
-            print(f"✗ Error getting messages: {e}")
+            logger.error("✗ Error getting messages: %s", e)
             return []
 
+    def select_new_messages(self, extracted: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Dedupe and filter extracted messages, returning the new ones oldest first"""
+        new_messages = []
+
+        for idx, message_data in enumerate(extracted):
+            try:
+                if message_data and message_data['message_id'] not in self.processed_messages:
+                    new_messages.append(message_data)
+                    self.processed_messages.add(message_data['message_id'])
+
+                    # Update last message ID
+                    if not self.last_message_id:
+                        self.last_message_id = message_data['message_id']
+
+                    preview = (message_data.get('content') or '').strip().replace('\n', ' ')
+                    if len(preview) > 120:
+                        preview = preview[:117] + '...'
+                    logger.debug("  ✓ fetched #%d: '%s'", idx + 1, preview)
+
+            except Exception as e:
+                logger.warning("  ✗ Error extracting message %d: %s", idx + 1, e)
+                continue
+
+        # Sort by snowflake creation time (oldest first)
+        new_messages.sort(key=lambda x: message_snowflake(x.get('message_id')) or 0)
+
+        logger.debug("✓ Fetch successful! %d new messages", len(new_messages))
+        return new_messages
+
+    def filter_unseen_ids(self, message_ids: List[str]) -> List[str]:
+        """Drop ids the dedupe window has already seen (integer snowflake checks)"""
+        return [mid for mid in message_ids if mid not in self.processed_messages]
+
+    async def extract_visible_messages(self, ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Extract every rendered message (or only ``ids``) in a single evaluate call"""
+        try:
+            raw_messages = await dom_extract.extract_messages(self.page, ids=ids, selectors=self.selectors.order())
+        except Exception as e:
+            logger.error("Error extracting messages in batch: %s", e)
+            return []
+        
+        return [self.build_message_data(raw) for raw in raw_messages]
+
+    def build_message_data(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn a dict serialised in the page into the monitor's message record"""
+        content = raw.get('content') or ''
+        self.selectors.record('content', raw.get('content_selector'))
+        if not content:
+            logger.debug("    ⚠️  Empty content extracted for %s", raw.get('message_id'))
+        return {
+            'message_id': raw.get('message_id'),
+            'content': content,
+            'author': raw.get('author') or '',
+            'timestamp': raw.get('timestamp') or '',
+            'created_at': message_created_at(raw.get('message_id')),
+            'attachments': raw.get('attachments') or [],
+            'embeds': raw.get('embeds') or [],
+            'scraped_at': datetime.now().isoformat(),
+            'source_server': self.source_server,
+            'source_channel': self.source_channel
+        }
+
+    async def extract_message_elements(self, ids: Optional[List[str]] = None) -> Optional[List[Optional[Dict[str, Any]]]]:
+        """Extract messages one element handle at a time (EXTRACTION_MODE=element)"""
+        message_elements: List[Any] = []
+        if ids is not None:
+            for mid in ids:
+                el = await self.page.query_selector(f'[id="{mid}"]')
+                if el:
+                    message_elements.append(el)
+        else:
+            # Try the message selector that matched last time, then the others
+            strategy = self.selectors.get('message')
+            message_elements = await strategy.query_all(self.page)
+            logger.debug("  • selector '%s' -> %d elements", strategy.preferred, len(message_elements))
+        if not message_elements:
+            logger.warning("✗ No message elements found with known selectors")
+            return None
+        logger.debug("✓ Found %d message elements", len(message_elements))
+
+        extracted = []
+        for idx, message_element in enumerate(message_elements):
+            try:
+                extracted.append(await self.extract_message_data(message_element))
+            except Exception as e:
+                logger.warning("  ✗ Error extracting message %d: %s", idx + 1, e)
+                extracted.append(None)
+        return extracted
+
+    async def enable_push_detection(self) -> bool:
+        """Expose the push callback to the page and attach the chat-list observer"""
+        try:
+            if self._push_event is None:
+                await self.page.expose_function(dom_extract.PUSH_BINDING_NAME, self._on_pushed_messages)
+                self._push_event = asyncio.Event()
+        except Exception as e:
+            logger.warning("⚠️  Push detection unavailable, falling back to polling: %s", e)
+            return False
+        await self.attach_message_observer()
+        return True
+
+    async def attach_message_observer(self):
+        """(Re-)attach the MutationObserver; a no-op while it is still attached"""
+        try:
+            if not await dom_extract.observe_messages(self.page, self.selectors.order()):
+                logger.warning("⚠️  Messages container not mounted yet; observer will be retried by the watchdog")
+        except Exception as e:
+            logger.warning("⚠️  Could not attach message observer: %s", e)
+
+    def _on_pushed_messages(self, raw_messages: List[Dict[str, Any]]):
+        """Called from the page as soon as Discord renders new message rows"""
+        self._pushed_messages.extend(raw_messages)
+        self._push_event.set()
+
+    async def wait_for_pushed_messages(self, timeout: float) -> Optional[List[Dict[str, Any]]]:
+        """Wait for the observer to push rows; returns None if the watchdog timeout expires"""
+        try:
+            await asyncio.wait_for(self._push_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._push_event.clear()
+        raw_messages, self._pushed_messages = self._pushed_messages, []
+        with self.metrics.timer('push.select'):
+            fresh_ids = set(self.filter_unseen_ids([raw.get('message_id') for raw in raw_messages]))
+            logger.debug("⚡ Observer pushed %d messages, %d not seen before", len(raw_messages), len(fresh_ids))
+            return self.select_new_messages([
+                self.build_message_data(raw) for raw in raw_messages if raw.get('message_id') in fresh_ids
+            ])
+
     async def extract_message_data(self, message_element) -> Optional[Dict[str, Any]]:
         """Extract data from a single message element"""
         try:
@@ -273,41 +443,19 @@ class DiscordMonitor:
                 return None
             
             # Extract message content from current Discord DOM
-            content = ""
-            # 1) Direct message content div
-            content_el = await message_element.query_selector('[id^="message-content-"]')
-            if content_el:
-                try:
-                    content = (await content_el.inner_text()).strip()
-                except Exception:
-                    pass
-            # 2) Fallback: common class prefixes (obfuscated suffixes)
-            if not content:
-                for sel in [
-                    '[class^="messageContent_"]',
-                    '[class^="markup__"]',
-                    'div[role="document"]',
-                    'div[role="textbox"]',
-                ]:
-                    el = await message_element.query_selector(sel)
-                    if el:
-                        try:
-                            content = (await el.inner_text()).strip()
-                            if content:
-                                break
-                        except Exception:
-                            pass
-            # 3) Last resort: grab textContent of the whole message node
+            # 1) Content div or class-prefix fallbacks, the last selector that worked first
+            content = await self.selectors.get('content').query_text(message_element)
+            # 2) Last resort: grab textContent of the whole message node
             if not content:
                 try:
                     content = (await message_element.evaluate('el => el.textContent || ""')).strip()
                 except Exception:
                     pass
             if not content:
-                print("    ⚠️  Empty content extracted for", message_id)
+                logger.debug("    ⚠️  Empty content extracted for %s", message_id)
             
             # Extract author name
-            author_element = await message_element.query_selector('[class*="username_"], [class*="headerText_"] [class*="username_"], [class*="headerText-"] [class*="username-"], h3[role="heading"]')
+            author_element = await self.selectors.get('author').query(message_element)
             author = ""
             if author_element:
                 author = await author_element.inner_text()
@@ -339,6 +487,7 @@ class DiscordMonitor:
                 'content': content,
                 'author': author,
                 'timestamp': timestamp,
+                'created_at': message_created_at(message_id),
                 'attachments': attachments,
                 'embeds': embeds,
                 'scraped_at': datetime.now().isoformat(),
@@ -347,7 +496,7 @@ class DiscordMonitor:
             }
             
         except Exception as e:
-            print(f"Error extracting message data: {e}")
+            logger.warning("⚠️  Error extracting message data: %s", e)
             return None
 
     async def extract_attachment_data(self, attachment_element) -> Optional[Dict[str, Any]]:
@@ -368,7 +517,7 @@ class DiscordMonitor:
                 'name': name
             }
         except Exception as e:
-            print(f"Error extracting attachment data: {e}")
+            logger.warning("⚠️  Error extracting attachment data: %s", e)
             return None
 
     async def extract_embed_data(self, embed_element) -> Optional[Dict[str, Any]]:
@@ -395,7 +544,7 @@ class DiscordMonitor:
                 'url': url
             }
         except Exception as e:
-            print(f"Error extracting embed data: {e}")
+            logger.warning("⚠️  Error extracting embed data: %s", e)
             return None
 
     def convert_message_structure(self, message_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -461,45 +610,40 @@ class DiscordMonitor:
         return converted_message
 
     async def save_messages(self, messages: List[Dict[str, Any]]):
-        """Save messages to log file"""
+        """Append new messages to the JSONL log"""
         if not messages:
             return
         
         try:
-            # Load existing messages
-            existing_messages = []
-            existing_ids: Set[str] = set()
-            if os.path.exists(self.messages_log_file):
-                async with aiofiles.open(self.messages_log_file, 'r', encoding='utf-8') as f:
-                    content = await f.read()
-                    if content.strip():
-                        existing_messages = json.loads(content)
-                        for m in existing_messages:
-                            mid = m.get('message_id')
-                            if mid:
-                                existing_ids.add(mid)
-            
-            # Add new messages
-            new_unique_messages = [m for m in messages if m.get('message_id') not in existing_ids]
+            # File append + fsync runs off the event loop
+            loop = asyncio.get_event_loop()
+            new_unique_messages = await loop.run_in_executor(None, self.message_log.append, messages)
             if not new_unique_messages:
-                print("ℹ️  No new unique messages to save")
+                logger.debug("ℹ️  No new unique messages to save")
                 return
-            existing_messages.extend(new_unique_messages)
-            
-            # Save updated messages
-            async with aiofiles.open(self.messages_log_file, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(existing_messages, indent=2, ensure_ascii=False))
             
-            print(f"Saved {len(new_unique_messages)} new messages to {self.messages_log_file}")
+            logger.info("💾 Saved %d new messages to %s", len(new_unique_messages), self.messages_log_file)
             
         except Exception as e:
-            print(f"Error saving messages: {e}")
+            logger.error("✗ Error saving messages: %s", e)
+
+    async def load_processed_from_log(self):
+        """Build the archived-id index once and fold it into the dedupe state"""
+        if not os.path.exists(self.messages_log_file) and os.path.exists(self.legacy_messages_log_file):
+            count = convert_json_array(self.legacy_messages_log_file, self.messages_log_file)
+            print(f"Converted {count} messages from {self.legacy_messages_log_file} to {self.messages_log_file}")
+        
+        loop = asyncio.get_event_loop()
+        archived_ids = await loop.run_in_executor(None, self.message_log.load_ids)
+        for mid in archived_ids:
+            self.processed_messages.add(mid)
+        print(f"Indexed {len(archived_ids)} archived messages from {self.messages_log_file}")
 
     async def save_state(self):
         """Save monitoring state"""
         state = {
             'last_message_id': self.last_message_id,
-            'processed_messages': list(self.processed_messages),
+            'dedupe': self.processed_messages.to_dict(),
             'last_check': datetime.now().isoformat()
         }
         
@@ -507,20 +651,23 @@ class DiscordMonitor:
             async with aiofiles.open(self.state_file, 'w', encoding='utf-8') as f:
                 await f.write(json.dumps(state, indent=2, ensure_ascii=False))
         except Exception as e:
-            print(f"Error saving state: {e}")
+            logger.error("✗ Error saving state: %s", e)
 
     async def load_state(self):
         """Load monitoring state"""
-        if not os.path.exists(self.state_file):
-            return
-        
         try:
-            async with aiofiles.open(self.state_file, 'r', encoding='utf-8') as f:
-                content = await f.read()
+            if os.path.exists(self.state_file):
+                async with aiofiles.open(self.state_file, 'r', encoding='utf-8') as f:
+                    content = await f.read()
                 if content.strip():
                     state = json.loads(content)
                     self.last_message_id = state.get('last_message_id')
-                    self.processed_messages = set(state.get('processed_messages', []))
+                    self.processed_messages = DedupeWindow.from_dict(state.get('dedupe') or {}, self.dedupe_window_size)
+                    # Older state files carried the full processed id list
+                    for mid in state.get('processed_messages', []):
+                        self.processed_messages.add(mid)
+                    for channel, mark in (state.get('high_water_marks') or {}).items():
+                        self.processed_messages.raise_floor(channel, int(mark))
                     print(f"Loaded state: {len(self.processed_messages)} processed messages")
             # Also load processed IDs from existing log for dedupe across runs
             await self.load_processed_from_log()
@@ -530,70 +677,87 @@ class DiscordMonitor:
     async def migrate_messages(self, messages: List[Dict[str, Any]]):
         """Migrate messages to destination server"""
         if not self.enable_auto_migration:
-            print("⚠️  Auto-migration disabled")
+            logger.warning("⚠️  Auto-migration disabled")
             return
         
         # Check if we have destination URL (preferred) or server name
         if not self.dest_channel_url.strip() and not self.dest_server:
-            print("⚠️  No destination configured. Set DEST_CHANNEL_URL or DEST_SERVER_NAME in .env")
+            logger.warning("⚠️  No destination configured. Set DEST_CHANNEL_URL or DEST_SERVER_NAME in .env")
             return
         
         dest_name = self.dest_channel_url.strip() or f"{self.dest_server} > {self.dest_channel}"
-        print(f"\n📤 Starting migration of {len(messages)} messages to {dest_name}")
+        logger.info("📤 Starting migration of %d messages to %s", len(messages), dest_name)
         
-        # If we have a direct channel URL, skip server/channel finding
-        if self.dest_channel_url.strip():
-            print(f"↪️  Using direct channel URL: {self.dest_channel_url.strip()}")
-        else:
-            # Navigate to destination server using traditional method
-            if not await self.find_dest_server():
-                print("✗ Failed to find destination server. Migration aborted.")
-                return
-            
-            if not await self.find_dest_channel():
-                print("✗ Failed to find destination channel. Migration aborted.")
-                return
+        if not await self.open_dest_page():
+            logger.error("✗ Destination page unavailable. Migration aborted.")
+            return
         
         successful_migrations = 0
         
         for i, message_data in enumerate(messages):
             try:
-                print(f"\n📝 Migrating message {i+1}/{len(messages)}...")
-                converted_message = self.convert_message_structure(message_data)
+                logger.debug("📝 Migrating message %d/%d...", i + 1, len(messages))
+                with self.metrics.timer('message.convert'):
+                    converted_message = self.convert_message_structure(message_data)
                 preview = (converted_message.get('formatted_content') or converted_message.get('content') or '').strip().replace('\n', ' ')
                 if len(preview) > 120:
                     preview = preview[:117] + '...'
-                print(f"   ✍️  rewrite preview: '{preview}'")
+                logger.debug("   ✍️  rewrite preview: '%s'", preview)
                 
-                if await self.post_message(converted_message):
+                with self.metrics.timer('message.deliver'):
+                    posted = await self.post_message(converted_message)
+                if posted:
                     successful_migrations += 1
+                    created_ms = message_timestamp_ms(message_data.get('message_id'))
+                    if created_ms is not None:
+                        # Snowflake creation time -> post confirmed in the destination channel
+                        self.metrics.observe('lag.end_to_end', time.time() * 1000 - created_ms)
                     dest_display = self.dest_channel_url.strip() or f"{self.dest_server} > {self.dest_channel}"
-                    print(f"✓ Posted to '{dest_display}' (#{i+1})")
+                    logger.info("✓ Posted to '%s' (#%d)", dest_display, i + 1)
                 else:
-                    print(f"✗ Failed to migrate message {i+1}/{len(messages)}")
+                    logger.warning("✗ Failed to migrate message %d/%d", i + 1, len(messages))
                 
-                # Rate limiting
-                await self.random_delay(3, 6)
+                # No extra pause: post_message already waits ~3.5s per post to confirm it,
+                # and this runs in the deliverer stage, so detection is not held up
                 
             except Exception as e:
-                print(f"✗ Error migrating message {i+1}: {e}")
+                logger.error("✗ Error migrating message %d: %s", i + 1, e)
                 continue
         
-        print(f"\n{'='*60}")
-        print(f"✓ Migration completed: {successful_migrations}/{len(messages)} messages migrated successfully")
-        print(f"{'='*60}\n")
+        logger.info("✓ Migration completed: %d/%d messages migrated successfully", successful_migrations, len(messages))
+
+    async def open_dest_page(self) -> bool:
+        """Open (once) a second page in the same context, parked on the destination channel"""
+        if self.dest_page and not self.dest_page.is_closed():
+            return True
+        
+        print("🗂️  Opening destination page...")
+        self.dest_page = await self.context.new_page()
+        dest_url = self.dest_channel_url.strip()
+        if dest_url:
+            print(f"🌐 Navigating destination page to: {dest_url}")
+            await self.dest_page.goto(dest_url)
+        else:
+            # Same session cookies, so the app loads logged in; then click through to the channel
+            await self.dest_page.goto('https://discord.com/channels/@me')
+            if not await self.find_dest_server() or not await self.find_dest_channel():
+                # Drop the half-opened page so the next post retries from scratch
+                await self.dest_page.close()
+                self.dest_page = None
+                return False
+        return True
 
     async def find_dest_server(self):
-        """Find and navigate to destination server"""
+        """Find and open the destination server in the destination page"""
         print(f"\n🔍 Finding destination server: '{self.dest_server}'")
         
         server_selector = f'[aria-label*="{self.dest_server}"]'
         
         try:
             print(f"⏳ Waiting for destination server selector...")
-            await self.page.wait_for_selector(server_selector, timeout=10000)
+            await self.dest_page.wait_for_selector(server_selector, timeout=10000)
             print(f"✓ Destination server found! Clicking on '{self.dest_server}'...")
-            await self.page.click(server_selector)
+            await self.dest_page.click(server_selector)
             print(f"✓ Successfully navigated to destination server: {self.dest_server}")
             await self.random_delay(2, 4)
             return True
@@ -602,16 +766,16 @@ class DiscordMonitor:
             return False
 
     async def find_dest_channel(self):
-        """Find and navigate to destination channel"""
+        """Find and open the destination channel in the destination page"""
         print(f"\n🔍 Finding destination channel: '{self.dest_channel}'")
         
         channel_selector = f'[data-list-item-id*="channels"][aria-label*="{self.dest_channel}"]'
         
         try:
             print(f"⏳ Waiting for destination channel selector...")
-            await self.page.wait_for_selector(channel_selector, timeout=10000)
+            await self.dest_page.wait_for_selector(channel_selector, timeout=10000)
             print(f"✓ Destination channel found! Clicking on '{self.dest_channel}'...")
-            await self.page.click(channel_selector)
+            await self.dest_page.click(channel_selector)
             print(f"✓ Successfully navigated to destination channel: {self.dest_channel}")
             await self.random_delay(2, 4)
             return True
@@ -619,90 +783,64 @@ class DiscordMonitor:
             print(f"✗ Could not find destination channel '{self.dest_channel}': {e}")
             return False
 
-   async def post_message(self, message_data: Dict[str, Any]):
-        """Post a full message to destination Discord channel"""
+    async def post_message(self, message_data: Dict[str, Any]):
+        """Post a full message from the parked destination page (no navigation)"""
         try:
-            dest_url = self.dest_channel_url.strip()
-            if dest_url:
-                current_url = self.page.url
-                if dest_url not in current_url:
-                    print(f"🌐 Navigating to destination channel: {dest_url}")
-                    await self.page.goto(dest_url)
-                    await asyncio.sleep(4)
-                else:
-                    print(f"✅ Already in correct destination channel: {dest_url}")
+            if not await self.open_dest_page():
+                return False
+            page = self.dest_page
 
-            print("🔍 Locating message input box...")
-            selectors = [
-                '[data-slate-editor="true"]',
-                'div[role="textbox"][contenteditable="true"]',
-                '[aria-label^="Message #"][data-slate-editor="true"]',
-            ]
-
-            message_input = None
-            for sel in selectors:
-                try:
-                    await self.page.wait_for_selector(sel, timeout=3000)
-                    el = await self.page.query_selector(sel)
-                    if el:
-                        message_input = el
-                        print(f"✅ Found input box: {sel}")
-                        break
-                except:
-                    continue
+            logger.debug("🔍 Locating message input box...")
+            # Waits only on the selector that found the box last time, unless it misses
+            strategy = self.selectors.get('input')
+            message_input = await strategy.query(page, timeout_ms=3000)
+            if message_input:
+                logger.debug("✅ Found input box: %s", strategy.preferred)
 
             if not message_input:
-                print("❌ Could not find a writable message input box. (Check channel permissions)")
+                logger.error("❌ Could not find a writable message input box. (Check channel permissions)")
                 return False
 
             # Fetch full formatted message content
             content = message_data.get('formatted_content', message_data.get('content', '')).strip()
             if not content:
-                print("⚠️ No message content to send.")
+                logger.warning("⚠️ No message content to send.")
                 return False
 
-            print(f"⌨️ Typing full message ({len(content)} chars)...")
-            await message_input.click()
-            await asyncio.sleep(0.3)
-
-            # Type the entire message in one go, including line breaks
-            # We handle "\n" manually as Enter keys without sending prematurely
-            for line in content.split("\n"):
-                await self.page.keyboard.type(line, delay=30)
-                await self.page.keyboard.down("Shift")
-                await self.page.keyboard.press("Enter")  # newline, not send
-                await self.page.keyboard.up("Shift")
+            # Insert the whole message (line breaks included) in one operation
+            method = await slate_input.insert_text(page, message_input, content)
+            logger.debug("📋 Inserted full message (%d chars) via %s", len(content), method)
 
             # Small delay before final send
             await asyncio.sleep(0.5)
 
             # Send the message (final Enter)
-            print("🚀 Sending message...")
-            await self.page.keyboard.press("Enter")
+            logger.debug("🚀 Sending message...")
+            await page.keyboard.press("Enter")
 
             await asyncio.sleep(3)
 
             # Optional confirmation
             try:
-                recent_messages = await self.page.query_selector_all(
+                recent_messages = await page.query_selector_all(
                     '[data-list-id="chat-messages"] [id^="chat-messages-"]'
                 )
                 if recent_messages:
                     last_message = recent_messages[-1]
                     last_content = await last_message.evaluate('el => el.textContent || el.innerText || ""')
                     if content.split("\n")[0][:50] in last_content:
-                        print("✅ Message confirmed sent successfully.")
+                        logger.debug("✅ Message confirmed sent successfully.")
                         return True
                     else:
-                        print(f"⚠️ Message check mismatch:\n{last_content[:100]}...")
+                        logger.warning("⚠️ Message check mismatch:\n%s...", last_content[:100])
                         return False
             except Exception as e:
-                print(f"⚠️ Could not verify message: {e}")
+                logger.warning("⚠️ Could not verify message: %s", e)
 
             return True
 
         except Exception as e:
-            print(f"❌ Error posting message: {e}")
+            logger.error("❌ Error posting message: %s", e)
             return False
 
     async def random_delay(self, min_seconds: float = 1, max_seconds: float = 3):
@@ -714,6 +852,61 @@ class DiscordMonitor:
         """Close the browser"""
         if self.browser:
             await self.browser.close()
+            self.browser = None
+
+    def start_pipeline(self):
+        """Start the archiver and deliverer stages that monitor_loop feeds"""
+        self.archiver = Stage('archive', self.archive_messages, self.pipeline_queue_size, self.max_messages_per_batch)
+        # One destination page, so the deliverer posts one batch at a time
+        self.deliverer = Stage('deliver', self.migrate_messages, self.pipeline_queue_size, self.max_messages_per_batch)
+        self.archiver.start()
+        self.deliverer.start()
+
+    async def archive_messages(self, messages: List[Dict[str, Any]]):
+        """Archiver stage: append to the log, then persist the dedupe state"""
+        with self.metrics.timer('stage.save'):
+            await self.save_messages(messages)
+        with self.metrics.timer('stage.state_save'):
+            await self.save_state()
+
+    async def stop_pipeline(self):
+        """Drain queued messages and stop both stages"""
+        for stage in (self.archiver, self.deliverer):
+            if stage:
+                await stage.stop()
+                print(f"📊 {stage.describe()}")
+
+    async def start_metrics(self):
+        """Dump metrics every METRICS_INTERVAL seconds; serve /metrics when METRICS_PORT is set"""
+        if self.metrics_port:
+            try:
+                self._metrics_runner = await self.metrics.serve(self.metrics_port)
+                print(f"📈 Metrics at http://127.0.0.1:{self.metrics_port}/metrics")
+            except Exception as e:
+                print(f"⚠️  Could not start metrics endpoint: {e}")
+        self._metrics_task = asyncio.ensure_future(self._dump_metrics_periodically())
+
+    async def _dump_metrics_periodically(self):
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            self.dump_metrics()
+
+    def dump_metrics(self):
+        """Write the current histogram snapshot to the metrics file"""
+        try:
+            self.metrics.dump(self.metrics_file)
+        except Exception as e:
+            logger.warning("⚠️  Error saving metrics: %s", e)
+
+    async def stop_metrics(self):
+        """Stop the dump task and endpoint, writing one final snapshot"""
+        if self._metrics_task:
+            self._metrics_task.cancel()
+            self._metrics_task = None
+        if self._metrics_runner:
+            await self._metrics_runner.cleanup()
+            self._metrics_runner = None
+        self.dump_metrics()
 
     async def monitor_loop(self):
         """Main monitoring loop"""
@@ -727,42 +920,57 @@ class DiscordMonitor:
         print(f"{'='*60}\n")
         
         await self.load_state()
+        self.start_pipeline()
+        await self.start_metrics()
+        
+        push_active = self.detection_mode == 'push' and await self.enable_push_detection()
+        if push_active:
+            print(f"⚡ Push detection active (watchdog poll every {self.watchdog_interval} seconds)")
+        poll_due = True
         
         try:
             while True:
-                print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔄 Checking for new messages...")
-                
-                # Get new messages (we're already on the correct server/channel)
-                new_messages = await self.get_new_messages()
+                if push_active and not poll_due:
+                    new_messages = await self.wait_for_pushed_messages(self.watchdog_interval)
+                    if new_messages is None:
+                        # Watchdog: nothing pushed for a while, re-attach the observer and poll
+                        poll_due = True
+                        continue
+                else:
+                    logger.debug("🔄 Checking for new messages...")
+                    if push_active:
+                        await self.attach_message_observer()
+                    
+                    # Get new messages (we're already on the correct server/channel)
+                    with self.metrics.timer('poll.total'):
+                        new_messages = await self.get_new_messages()
+                    poll_due = False
                 
                 if new_messages:
-                    print(f"✓ Found {len(new_messages)} new messages")
-                    
-                    # Save messages
-                    print("💾 Saving messages...")
-                    await self.save_messages(new_messages)
-                    print("✓ Messages saved")
+                    logger.info("[%s] ✓ Found %d new messages", datetime.now().strftime('%Y-%m-%d %H:%M:%S'), len(new_messages))
                     
-                    # Migrate messages if enabled
-                    if self.enable_auto_migration:
-                        await self.migrate_messages(new_messages)
-                    
-                    # Save state
-                    await self.save_state()
+                    # Hand off to the archiver/deliverer stages; detection resumes right away
+                    for message_data in new_messages:
+                        await self.archiver.put(message_data)
+                        if self.enable_auto_migration:
+                            await self.deliverer.put(message_data)
+                    logger.info("📊 %s | %s", self.archiver.describe(), self.deliverer.describe())
                 else:
-                    print("ℹ️  No new messages found")
+                    logger.debug("ℹ️  No new messages found")
                 
-                # Wait before next check
-                print(f"⏳ Waiting {self.check_interval} seconds before next check...")
-                await asyncio.sleep(self.check_interval)
+                # Wait before next check (push mode waits on the observer instead)
+                if not push_active:
+                    logger.debug("⏳ Waiting %s seconds before next check...", self.check_interval)
+                    await asyncio.sleep(self.check_interval)
                 
         except KeyboardInterrupt:
             print("\n\n⏹️  Monitoring stopped by user")
         except Exception as e:
-            print(f"✗ Error in monitoring loop: {e}")
+            logger.error("✗ Error in monitoring loop: %s", e)
         finally:
+            await self.stop_pipeline()
+            await self.stop_metrics()
             await self.save_state()
-            await self.close_browser()
 
     async def run(self):
         """Main execution method"""
@@ -780,6 +988,9 @@ class DiscordMonitor:
             print("\n✓ Ready on target channel")
             print(f"📋 Monitoring: {loc['server']} > {loc['channel']}")
             
+            if self.enable_auto_migration:
+                await self.open_dest_page()
+            
             await self.monitor_loop()
             
         except Exception as e:
@@ -789,6 +1000,7 @@ class DiscordMonitor:
 
 async def main():
     """Main function"""
+    setup_logging('monitor', log_file=os.getenv('LOG_FILE', 'monitor_log.jsonl'))
     monitor = DiscordMonitor()
     await monitor.run()
 
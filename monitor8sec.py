@@ -12,6 +12,8 @@ import aiofiles
 from dateutil import parser
 import pytz
 import re
+from snowflake import message_snowflake, message_timestamp_ms, message_created_at
+import slate_input
 
 # Load environment variables
 load_dotenv()
@@ -252,25 +254,12 @@ class DiscordMonitor:
                     if not ('OCULUS TRADING SIGNAL' in content or 'Ticker :' in content):
                         continue
                     
-                    # Check if message is recent (within the specified time window)
-                    is_recent = False
-                    try:
-                        timestamp_str = message_data.get('timestamp', '')
-                        if timestamp_str:
-                            # Check for "Today at" or recent time indicators
-                            if 'Today at' in timestamp_str or 'Just now' in timestamp_str:
-                                is_recent = True
-                            elif 'PM' in timestamp_str or 'AM' in timestamp_str:
-                                # Check if it's a recent time (within last few minutes)
-                                time_part = timestamp_str.split('—')[-1].strip()
-                                if any(indicator in time_part for indicator in ['PM', 'AM']):
-                                    # For now, assume recent if it has time format
-                                    is_recent = True
-                    except Exception:
-                        # If we can't parse timestamp, skip this message
+                    # Check if message is recent, using the exact creation time in its snowflake
+                    created_ms = message_timestamp_ms(message_data['message_id'])
+                    if created_ms is None:
                         continue
-                    
-                    if not is_recent:
+                    age_seconds = time.time() - created_ms / 1000
+                    if age_seconds > self.max_message_age_seconds:
                         continue
                     
                     new_messages.append(message_data)
@@ -289,8 +278,8 @@ class DiscordMonitor:
                     print(f"  ✗ Error extracting message {idx+1}: {e}")
                     continue
             
-            # Sort by timestamp (oldest first)
-            new_messages.sort(key=lambda x: x.get('timestamp', ''))
+            # Sort by snowflake creation time (oldest first)
+            new_messages.sort(key=lambda x: message_snowflake(x.get('message_id')) or 0)
             
             print(f"✓ Fetch successful! {len(new_messages)} new trading signal messages")
             return new_messages
@@ -374,6 +363,7 @@ class DiscordMonitor:
                 'content': content,
                 'author': author,
                 'timestamp': timestamp,
+                'created_at': message_created_at(message_id),
                 'attachments': attachments,
                 'embeds': embeds,
                 'scraped_at': datetime.now().isoformat(),
@@ -691,9 +681,8 @@ class DiscordMonitor:
                 print("⚠️ No message content to send.")
                 return False
 
-            print(f"⌨️ Typing message: {content[:100]}...")
-            await message_input.click()
-            await self.page.keyboard.type(content)
+            print(f"📋 Inserting message: {content[:100]}...")
+            await slate_input.insert_text(self.page, message_input, content)
             await self.page.keyboard.press("Enter")
 
             print("✅ Message sent successfully! Waiting briefly for confirmation...")
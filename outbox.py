@@ -0,0 +1,98 @@
+"""
+Persistent webhook outbox backed by SQLite.
+
+Every message handed to the deliverer is first recorded as ``pending`` under
+its source message id, and flipped to ``delivered`` only once the webhook has
+returned 204. A crash at any point leaves undelivered messages pending, and
+they are replayed on the next start; ids already delivered are never queued
+again, so each source message is relayed once. Messages the webhook can never
+accept (a 4xx, empty content) are marked ``rejected`` and not replayed.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    message_id   TEXT PRIMARY KEY,
+    payload      TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'pending',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    last_error   TEXT,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL
+)
+"""
+
+
+class Outbox:
+    def __init__(self, path: str):
+        self.path = path
+        # Calls arrive from executor threads; one connection guarded by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    def enqueue(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Record messages as pending; returns the ones not already in the outbox"""
+        now = time.time()
+        fresh = []
+        with self._lock, self._conn:
+            for m in messages:
+                mid = m.get('message_id')
+                if not mid:
+                    continue
+                cur = self._conn.execute(
+                    'INSERT OR IGNORE INTO outbox (message_id, payload, created_at, updated_at) VALUES (?, ?, ?, ?)',
+                    (mid, json.dumps(m, ensure_ascii=False), now, now),
+                )
+                if cur.rowcount:
+                    fresh.append(m)
+        return fresh
+
+    def mark_delivered(self, message_id: str):
+        """Flip an entry to delivered after the webhook returned 204"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'delivered', attempts = attempts + 1, last_error = NULL, updated_at = ? WHERE message_id = ?",
+                (time.time(), message_id),
+            )
+
+    def mark_failed(self, message_id: str, error: str = ''):
+        """Count a failed attempt; the entry stays pending"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE outbox SET attempts = attempts + 1, last_error = ?, updated_at = ? WHERE message_id = ?',
+                (error, time.time(), message_id),
+            )
+
+    def mark_rejected(self, message_id: str, error: str = ''):
+        """Give up on an entry that retrying cannot fix; it is not replayed"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'rejected', attempts = attempts + 1, last_error = ?, updated_at = ? WHERE message_id = ?",
+                (error, time.time(), message_id),
+            )
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Undelivered messages, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM outbox WHERE status = 'pending' ORDER BY created_at, rowid"
+            ).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of entries per status"""
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
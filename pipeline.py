@@ -0,0 +1,100 @@
+"""
+Bounded-queue stages for the monitor pipeline.
+
+monitor_loop is the detector: it only finds new messages and hands them to
+stages (archiver, deliverer) that run concurrently, each draining its own
+asyncio queue. A slow webhook or disk write then delays only its own stage,
+not the detection of the next message.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Any, List, Optional
+
+logger = logging.getLogger('pipeline')
+
+
+class Stage:
+    """A worker task fed by a bounded queue.
+
+    ``put`` applies backpressure: when the queue is full the caller waits
+    until the worker frees a slot, and the wait is counted in ``blocked_puts``
+    so a saturated stage is visible in the stats instead of silently dropping
+    items. The worker hands the handler up to ``batch_size`` queued items at
+    a time.
+    """
+
+    def __init__(self, name: str, handler: Callable[[List[Any]], Awaitable[Any]],
+                 maxsize: int = 100, batch_size: int = 10):
+        self.name = name
+        self.handler = handler
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.processed = 0
+        self.errors = 0
+        self.blocked_puts = 0
+        self.max_depth = 0
+
+    def start(self):
+        """Create the queue and worker task on the running loop"""
+        self.queue = asyncio.Queue(self.maxsize)
+        self._task = asyncio.ensure_future(self._run())
+
+    async def put(self, item: Any):
+        """Enqueue an item, waiting if the stage is saturated"""
+        if self.queue.full():
+            self.blocked_puts += 1
+            logger.warning("⏸️  %s queue full (%d); waiting for the stage to catch up", self.name, self.maxsize)
+        await self.queue.put(item)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self.handler(batch)
+            except Exception as e:
+                self.errors += 1
+                logger.exception("✗ Error in %s stage: %s", self.name, e)
+            finally:
+                self.processed += len(batch)
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def stop(self, drain_timeout: float = 30):
+        """Let queued items finish (up to ``drain_timeout`` seconds), then cancel the worker"""
+        if not self._task:
+            return
+        if self.queue.qsize():
+            logger.info("⏳ Draining %d queued items from %s stage...", self.queue.qsize(), self.name)
+        try:
+            await asyncio.wait_for(self.queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("⚠️  %s stage still had %d items after %ss", self.name, self.queue.qsize(), drain_timeout)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and throughput counters"""
+        return {
+            'depth': self.queue.qsize() if self.queue else 0,
+            'maxsize': self.maxsize,
+            'max_depth': self.max_depth,
+            'processed': self.processed,
+            'errors': self.errors,
+            'blocked_puts': self.blocked_puts,
+        }
+
+    def describe(self) -> str:
+        """One-line summary for the monitor log"""
+        s = self.stats()
+        return (f"{self.name}: {s['depth']}/{s['maxsize']} queued (peak {s['max_depth']}), "
+                f"{s['processed']} done, {s['blocked_puts']} blocked puts")
@@ -0,0 +1,127 @@
+"""
+Adaptive selector order for the DOM lookups the monitors repeat on every poll.
+
+Discord's markup changes between builds, so each lookup has a list of
+candidate selectors. A SelectorStrategy keeps that list ordered by recent
+success: the selector that matched last is tried first, selectors that missed
+before a later candidate matched move to the back, and the full list is only
+walked again when the preferred one misses. Once warm, a lookup costs a single
+selector query.
+
+    strategy = self.selectors.get('input')
+    message_input = await strategy.query(page, timeout_ms=3000)
+"""
+
+from typing import Any, Dict, List, Optional
+
+import dom_extract
+
+# Message input on the destination channel (Slate editor)
+INPUT_SELECTORS = [
+    '[data-slate-editor="true"]',
+    'div[role="textbox"][contenteditable="true"]',
+    '[aria-label^="Message #"][data-slate-editor="true"]',
+]
+
+DEFAULT_SELECTORS = {
+    'message': dom_extract.MESSAGE_SELECTORS,
+    'content': dom_extract.CONTENT_SELECTORS,
+    'author': dom_extract.AUTHOR_SELECTORS,
+    'input': INPUT_SELECTORS,
+}
+
+
+class SelectorStrategy:
+    def __init__(self, role: str, candidates: List[str]):
+        self.role = role
+        self.candidates = list(candidates)
+        self.hits = 0      # preferred selector matched
+        self.probes = 0    # preferred missed, another candidate matched
+        self.misses = 0    # nothing matched
+
+    @property
+    def preferred(self) -> str:
+        return self.candidates[0]
+
+    def record(self, selector: Optional[str]):
+        """Report which candidate matched (None if none did) and reorder"""
+        if selector is None:
+            # Nothing matched (e.g. a message without text): no selector is to blame
+            self.misses += 1
+            return
+        if selector == self.candidates[0]:
+            self.hits += 1
+            return
+        self.probes += 1
+        if selector not in self.candidates:
+            self.candidates.insert(0, selector)
+            return
+        idx = self.candidates.index(selector)
+        failed = self.candidates[:idx]
+        self.candidates = [selector] + self.candidates[idx + 1:] + failed
+
+    async def query(self, root, timeout_ms: int = 0):
+        """First element matching a candidate under ``root`` (page or element handle)
+
+        With ``timeout_ms`` each candidate is awaited that long, so a warm
+        lookup waits on the selector that worked last time only.
+        """
+        for sel in list(self.candidates):
+            try:
+                if timeout_ms:
+                    el = await root.wait_for_selector(sel, timeout=timeout_ms)
+                else:
+                    el = await root.query_selector(sel)
+            except Exception:
+                el = None
+            if el:
+                self.record(sel)
+                return el
+        self.record(None)
+        return None
+
+    async def query_all(self, root) -> List[Any]:
+        """All elements for the first candidate that matches anything"""
+        for sel in list(self.candidates):
+            elements = await root.query_selector_all(sel)
+            if elements:
+                self.record(sel)
+                return elements
+        self.record(None)
+        return []
+
+    async def query_text(self, root) -> str:
+        """Inner text of the first candidate that yields non-empty text"""
+        for sel in list(self.candidates):
+            try:
+                el = await root.query_selector(sel)
+                text = (await el.inner_text()).strip() if el else ''
+            except Exception:
+                text = ''
+            if text:
+                self.record(sel)
+                return text
+        self.record(None)
+        return ''
+
+    def stats(self) -> Dict[str, Any]:
+        return {'preferred': self.preferred, 'hits': self.hits, 'probes': self.probes, 'misses': self.misses}
+
+
+class SelectorCache:
+    def __init__(self, selectors: Optional[Dict[str, List[str]]] = None):
+        self.strategies = {role: SelectorStrategy(role, candidates)
+                           for role, candidates in (selectors or DEFAULT_SELECTORS).items()}
+
+    def get(self, role: str) -> SelectorStrategy:
+        return self.strategies[role]
+
+    def record(self, role: str, selector: Optional[str]):
+        self.strategies[role].record(selector)
+
+    def order(self) -> Dict[str, List[str]]:
+        """Current candidate order per role, e.g. for the in-page snippets"""
+        return {role: list(s.candidates) for role, s in self.strategies.items()}
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {role: s.stats() for role, s in self.strategies.items()}
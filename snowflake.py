@@ -0,0 +1,157 @@
+"""
+Helpers for the Discord snowflake ids embedded in message element ids.
+
+Rendered messages carry ids of the form ``chat-messages-<channel>-<snowflake>``.
+Snowflakes are time-ordered, so comparing them as integers tells us which
+message is newer without reading anything else from the DOM.
+"""
+
+import heapq
+import re
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+MESSAGE_ID_PATTERN = re.compile(r'^chat-messages-(?:(\d+)-)?(\d+)$')
+
+
+def parse_message_id(message_id: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Split a message element id into (channel_id, snowflake).
+
+    Returns None when the id does not follow the chat-messages pattern.
+    The channel part is '' for ids that only carry a snowflake.
+    """
+    if not message_id:
+        return None
+    m = MESSAGE_ID_PATTERN.match(message_id)
+    if not m:
+        return None
+    return m.group(1) or '', int(m.group(2))
+
+
+def message_snowflake(message_id: Optional[str]) -> Optional[int]:
+    """Return the snowflake part of a message element id, or None"""
+    parsed = parse_message_id(message_id)
+    return parsed[1] if parsed else None
+
+
+# Discord snowflakes count milliseconds from 2015-01-01T00:00:00Z in their top 42 bits
+DISCORD_EPOCH_MS = 1420070400000
+
+
+def snowflake_timestamp_ms(snowflake: int) -> int:
+    """Exact UTC creation time of a snowflake, in Unix milliseconds"""
+    return (snowflake >> 22) + DISCORD_EPOCH_MS
+
+
+def message_timestamp_ms(message_id: Optional[str]) -> Optional[int]:
+    """UTC creation time (Unix ms) of a message element id, or None if it has no snowflake"""
+    snowflake = message_snowflake(message_id)
+    return snowflake_timestamp_ms(snowflake) if snowflake is not None else None
+
+
+def message_created_at(message_id: Optional[str]) -> Optional[str]:
+    """ISO-8601 UTC creation time of a message element id, millisecond precision"""
+    ms = message_timestamp_ms(message_id)
+    if ms is None:
+        return None
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).isoformat(timespec='milliseconds')
+
+
+class DedupeWindow:
+    """Constant-size record of which message ids have been seen.
+
+    Per channel it keeps the highest snowflake seen (the watermark), the
+    newest ``window_size`` snowflakes, and a floor: the largest snowflake
+    evicted from the window. An id is seen if it is at or below the floor or
+    still in the window, so rows Discord renders slightly out of order are
+    still caught while the state never grows past the window.
+
+    Supports ``message_id in window`` and ``window.add(message_id)`` so it can
+    stand in for the old ``Set[str]`` of processed ids.
+    """
+
+    def __init__(self, window_size: int = 256):
+        self.window_size = window_size
+        self.watermarks: Dict[str, int] = {}
+        self.floors: Dict[str, int] = {}
+        self._recent: Dict[str, List[int]] = {}  # min-heap per channel
+        self._recent_members: Dict[str, Set[int]] = {}
+        # Ids that do not follow the chat-messages pattern, oldest first
+        self._unparsed: 'OrderedDict[str, None]' = OrderedDict()
+
+    def __contains__(self, message_id: Optional[str]) -> bool:
+        parsed = parse_message_id(message_id)
+        if not parsed:
+            return message_id in self._unparsed
+        channel, snowflake = parsed
+        if snowflake <= self.floors.get(channel, -1):
+            return True
+        return snowflake in self._recent_members.get(channel, ())
+
+    def __len__(self) -> int:
+        return sum(len(heap) for heap in self._recent.values()) + len(self._unparsed)
+
+    def add(self, message_id: Optional[str]):
+        """Record an id as seen, evicting the oldest snowflake once the window is full"""
+        parsed = parse_message_id(message_id)
+        if not parsed:
+            if message_id:
+                self._unparsed[message_id] = None
+                self._unparsed.move_to_end(message_id)
+                while len(self._unparsed) > self.window_size:
+                    self._unparsed.popitem(last=False)
+            return
+        channel, snowflake = parsed
+        if snowflake > self.watermarks.get(channel, -1):
+            self.watermarks[channel] = snowflake
+        if message_id in self:
+            return
+        heap = self._recent.setdefault(channel, [])
+        members = self._recent_members.setdefault(channel, set())
+        heapq.heappush(heap, snowflake)
+        members.add(snowflake)
+        while len(heap) > self.window_size:
+            evicted = heapq.heappop(heap)
+            members.discard(evicted)
+            self.raise_floor(channel, evicted)
+
+    def raise_floor(self, channel: str, snowflake: int):
+        """Treat every snowflake at or below ``snowflake`` in ``channel`` as seen"""
+        if snowflake > self.floors.get(channel, -1):
+            self.floors[channel] = snowflake
+        if snowflake > self.watermarks.get(channel, -1):
+            self.watermarks[channel] = snowflake
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialise for the state file (snowflakes as strings, JSON-safe)"""
+        channels = {}
+        for channel in set(self.watermarks) | set(self.floors):
+            channels[channel] = {
+                'watermark': str(self.watermarks.get(channel, -1)),
+                'floor': str(self.floors.get(channel, -1)),
+                'recent': [str(sf) for sf in sorted(self._recent.get(channel, []))],
+            }
+        return {
+            'window_size': self.window_size,
+            'channels': channels,
+            'unparsed': list(self._unparsed),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], window_size: Optional[int] = None) -> 'DedupeWindow':
+        """Rebuild from ``to_dict`` output; ``window_size`` overrides the stored size"""
+        window = cls(window_size or int(data.get('window_size', 256)))
+        for channel, entry in (data.get('channels') or {}).items():
+            floor = int(entry.get('floor', -1))
+            if floor >= 0:
+                window.raise_floor(channel, floor)
+            for sf in entry.get('recent', []):
+                window.add(f"chat-messages-{channel}-{sf}" if channel else f"chat-messages-{sf}")
+            watermark = int(entry.get('watermark', -1))
+            if watermark > window.watermarks.get(channel, -1):
+                window.watermarks[channel] = watermark
+        for mid in data.get('unparsed', []):
+            window.add(mid)
+        return window
+
@@ -1,5 +1,6 @@
 import asyncio
 import json
+import os
 import re
 import time
 import requests
@@ -7,7 +8,8 @@ from playwright.async_api import async_playwright
 
 # 🔧 CONFIGURATION
 SOURCE_CHANNEL_URL = "https://discord.com/channels/1432250238319726664/1432380508846821496"
-WEBHOOK_URL = "https://discord.com/api/webhooks/1434226344010580011/ORais6S74LP47UkMFYORiQzc1KC9NvDVzlxmnUqWJpV9dc1ZQakEpfMuq8N4bjXGe-XI"
+# WEBHOOK_URL can point at benchmarks/fake_webhook.py for offline runs
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', "https://discord.com/api/webhooks/1434226344010580011/ORais6S74LP47UkMFYORiQzc1KC9NvDVzlxmnUqWJpV9dc1ZQakEpfMuq8N4bjXGe-XI")
 
 # optional: add regex or formatting rules
 def format_message(raw_text):
@@ -0,0 +1,209 @@
+"""
+Long-lived HTTP client for Discord webhook delivery.
+
+One aiohttp session with a keep-alive connector is shared by every post, and
+the certifi-backed SSL context is built once per process, so only the first
+post to a host pays for the TLS handshake and CA bundle load.
+
+``send`` schedules posts against Discord's rate limits. Each webhook route has
+a token bucket that is refreshed from the ``X-RateLimit-*`` headers of every
+response. A post waits (FIFO per route) only until the bucket has a token, and
+a 429 puts the post back in the queue until ``Retry-After`` has passed, so
+bursts go out at the permitted ceiling without failed posts or fixed sleeps.
+"""
+
+import asyncio
+import json
+import ssl
+import time
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+import certifi
+
+
+@lru_cache(maxsize=1)
+def default_ssl_context() -> ssl.SSLContext:
+    """SSL context with the certifi CA bundle, created once per process"""
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+def is_retryable(status: int) -> bool:
+    """Whether a failed post may succeed later: 5xx, 408 and 429 may, any other 4xx will not"""
+    return status >= 500 or status in (408, 429)
+
+
+def header_float(headers: Dict[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimitBucket:
+    """Token bucket for one route: ``tokens`` left until ``reset_at`` (monotonic), then ``limit`` again"""
+
+    def __init__(self, limit: int = 5):
+        self.limit = limit
+        self.tokens = limit
+        self.reset_at = 0.0
+        self.in_flight = 0
+        self.lock = asyncio.Lock()
+        self.answered = asyncio.Event()
+
+    def delay(self, now: float) -> Optional[float]:
+        """Seconds until a token is available (0 if one is, None to wait for a response)"""
+        if self.tokens > 0:
+            return 0.0
+        if now < self.reset_at:
+            return self.reset_at - now
+        if self.in_flight:
+            # The window may have rolled over, but only a response says when the next one ends
+            return None
+        self.tokens = self.limit
+        return 0.0
+
+    def take(self):
+        self.tokens -= 1
+        self.in_flight += 1
+
+    def finish(self):
+        """A taken post is no longer in flight (answered, failed or cancelled)"""
+        self.in_flight = max(0, self.in_flight - 1)
+        self.answered.set()
+
+    def update(self, headers: Dict[str, str], now: float):
+        """Resynchronise from a response's X-RateLimit-* headers (after ``finish``)"""
+        limit = header_float(headers, 'X-RateLimit-Limit')
+        remaining = header_float(headers, 'X-RateLimit-Remaining')
+        reset_after = header_float(headers, 'X-RateLimit-Reset-After')
+        if limit is not None:
+            self.limit = int(limit)
+        if remaining is not None:
+            # Posts still in flight were counted by the server after this one answered
+            self.tokens = max(0, int(remaining) - self.in_flight)
+        if reset_after is not None:
+            self.reset_at = now + reset_after
+        self.answered.set()
+
+    def block(self, retry_after: float, now: float):
+        """A 429: no tokens until ``retry_after`` seconds from now"""
+        self.tokens = 0
+        self.reset_at = max(self.reset_at, now + retry_after)
+
+
+class WebhookClient:
+    def __init__(self, limit_per_host: int = 10, keepalive_timeout: float = 60, timeout: float = 15,
+                 max_rate_limit_retries: int = 10):
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+        # Scheduler state for send(): one bucket per webhook route, plus the global limit
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.buckets: Dict[str, RateLimitBucket] = {}
+        self.global_reset_at = 0.0
+        self.rate_limited = 0
+        self.waited_seconds = 0.0
+
+    async def start(self):
+        """Open the pooled session (called lazily by post if needed)"""
+        if self.session and not self.session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            ssl=default_ssl_context(),
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+
+    async def post(self, url: str, payload: Dict[str, Any], params: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], str]:
+        """POST a JSON payload; returns (status, headers, body text)"""
+        await self.start()
+        async with self.session.post(url, json=payload, params=params) as response:
+            body = await response.text()
+            return response.status, dict(response.headers), body
+
+    @staticmethod
+    def route(url: str) -> str:
+        """Rate-limit route of a webhook URL (/api/webhooks/<id>/<token>, no query)"""
+        parts = urlsplit(url)
+        return f"{parts.netloc}{parts.path.rstrip('/')}"
+
+    def bucket(self, url: str) -> RateLimitBucket:
+        key = self.route(url)
+        if key not in self.buckets:
+            self.buckets[key] = RateLimitBucket()
+        return self.buckets[key]
+
+    async def _acquire(self, bucket: RateLimitBucket):
+        """Wait (in arrival order) until the route and the global limit allow one post"""
+        async with bucket.lock:
+            while True:
+                now = time.monotonic()
+                delay = bucket.delay(now)
+                if delay is None:
+                    bucket.answered.clear()
+                    await bucket.answered.wait()
+                    continue
+                wait = max(delay, self.global_reset_at - now)
+                if wait <= 0:
+                    bucket.take()
+                    return
+                self.waited_seconds += wait
+                await asyncio.sleep(wait)
+
+    async def send(self, url: str, payload: Dict[str, Any], params: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], str]:
+        """POST through the rate-limit scheduler; 429s are waited out and retried
+
+        Returns (status, headers, body text) of the final attempt. Other errors
+        are returned as-is for the caller's own retry policy.
+        """
+        bucket = self.bucket(url)
+        for _ in range(self.max_rate_limit_retries + 1):
+            await self._acquire(bucket)
+            try:
+                status, headers, body = await self.post(url, payload, params)
+            finally:
+                # Also on CancelledError, or waiters on this route would block for good
+                bucket.finish()
+            now = time.monotonic()
+            bucket.update(headers, now)
+            if status != 429:
+                return status, headers, body
+            self.rate_limited += 1
+            retry_after, is_global = self.retry_after(headers, body)
+            if is_global:
+                self.global_reset_at = max(self.global_reset_at, now + retry_after)
+            else:
+                bucket.block(retry_after, now)
+        return status, headers, body
+
+    @staticmethod
+    def retry_after(headers: Dict[str, str], body: str) -> Tuple[float, bool]:
+        """(seconds, global) from a 429; the JSON body is more precise than the header"""
+        retry_after = header_float(headers, 'Retry-After')
+        is_global = headers.get('X-RateLimit-Global', '').lower() == 'true'
+        try:
+            data = json.loads(body)
+            retry_after = float(data.get('retry_after', retry_after))
+            is_global = is_global or bool(data.get('global'))
+        except (ValueError, TypeError, AttributeError):
+            pass
+        return (retry_after if retry_after is not None else 1.0), is_global
+
+    def stats(self) -> Dict[str, Any]:
+        return {'routes': len(self.buckets), 'rate_limited': self.rate_limited,
+                'waited_seconds': round(self.waited_seconds, 3)}
+
+    async def close(self):
+        """Close the session and its pooled connections"""
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None